@@ -0,0 +1,203 @@
+# Server-side alerts for the safe ranges configured under /settings/ranges
+#
+# The ranges ({metric: {warning: {min, max}, critical: {min, max}}}) are
+# compiled into flat per-kind tables of (metric, field, bounds) tuples, so
+# checking a reading is a few float comparisons per metric. Each
+# (device, metric) pair keeps its current severity in memory:
+#   - hysteresis: leaving a level needs the value to come back inside the
+#     violated bound by ALERT_HYSTERESIS of the warning band's width
+#   - debounce: a new severity must be seen on ALERT_DEBOUNCE consecutive
+#     readings before the alert opens, escalates or closes
+# A severity change closes the old alert and opens a new one, so alert rows
+# are only ever inserted (open) and stamped with closed_at (close).
+import threading
+
+ALERT_HYSTERESIS = 0.05
+ALERT_DEBOUNCE = 2
+
+# Range key -> reading field, per reading kind
+ALERT_METRICS = {
+    'sensor': {'ph': 'ph', 'tds': 'tds', 'water_temp': 'water_temp', 'water_level': 'water_level'},
+    'room': {'room_temp': 'temp', 'humidity': 'humidity', 'co2': 'co2'},
+}
+
+# Same defaults the Settings page shows until ranges are saved
+DEFAULT_RANGES = {
+    'ph': {'warning': {'min': 5.8, 'max': 7.2}, 'critical': {'min': 5.0, 'max': 8.0}},
+    'tds': {'warning': {'min': 700, 'max': 1300}, 'critical': {'min': 500, 'max': 1500}},
+    'water_temp': {'warning': {'min': 18, 'max': 26}, 'critical': {'min': 15, 'max': 30}},
+    'water_level': {'warning': {'min': 30, 'max': 100}, 'critical': {'min': 20, 'max': 100}},
+    'room_temp': {'warning': {'min': 18, 'max': 30}, 'critical': {'min': 15, 'max': 35}},
+    'humidity': {'warning': {'min': 40, 'max': 80}, 'critical': {'min': 30, 'max': 90}},
+    'co2': {'warning': {'min': 300, 'max': 1200}, 'critical': {'min': 250, 'max': 1500}},
+}
+
+SEVERITIES = (None, 'warning', 'critical')
+
+
+def create_alerts_table(db, log=print):
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            device_id TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            side TEXT NOT NULL,
+            value REAL,
+            opened_at INTEGER NOT NULL,
+            closed_at INTEGER,
+            close_value REAL
+        )
+    ''')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_alerts_opened ON alerts(opened_at)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_alerts_open ON alerts(device_id, metric) WHERE closed_at IS NULL')
+
+
+def compile_ranges(ranges, hysteresis=ALERT_HYSTERESIS):
+    """{kind: [(metric, field, (crit_lo, warn_lo, warn_hi, crit_hi, margin))]}"""
+    tables = {}
+    for kind, metrics in ALERT_METRICS.items():
+        table = []
+        for metric, field in metrics.items():
+            limits = (ranges or {}).get(metric) or DEFAULT_RANGES[metric]
+            try:
+                warn_lo, warn_hi = float(limits['warning']['min']), float(limits['warning']['max'])
+                crit_lo, crit_hi = float(limits['critical']['min']), float(limits['critical']['max'])
+            except (KeyError, TypeError, ValueError):
+                continue  # incomplete range: no alerts for this metric
+            margin = hysteresis * (warn_hi - warn_lo)
+            table.append((metric, field, (crit_lo, warn_lo, warn_hi, crit_hi, margin)))
+        tables[kind] = table
+    return tables
+
+
+def classify(value, bounds, current=0, current_side=None):
+    """(severity level 0-2, 'low'/'high'/None) of value, sticky towards the current level"""
+    crit_lo, warn_lo, warn_hi, crit_hi, margin = bounds
+    if value < warn_lo:
+        level, side = (2 if value < crit_lo else 1), 'low'
+    elif value > warn_hi:
+        level, side = (2 if value > crit_hi else 1), 'high'
+    else:
+        level, side = 0, None
+
+    if level >= current or current_side is None:
+        return level, side
+    if current_side == 'low':
+        if current == 2 and value < crit_lo + margin:
+            return 2, 'low'
+        if value < warn_lo + margin:
+            return 1, 'low'
+    else:
+        if current == 2 and value > crit_hi - margin:
+            return 2, 'high'
+        if value > warn_hi - margin:
+            return 1, 'high'
+    return level, side
+
+
+class AlertEngine:
+    """Evaluates readings against the compiled ranges and tracks open alerts"""
+
+    def __init__(self, ranges=None, hysteresis=ALERT_HYSTERESIS, debounce=ALERT_DEBOUNCE):
+        self.hysteresis = hysteresis
+        self.debounce = max(1, debounce)
+        self._tables = compile_ranges(ranges, hysteresis)
+        self._state = {}   # (device_id, metric) -> [level, side, pending level, pending count]
+        self._active = {}  # (device_id, metric) -> open alert dict
+        self._lock = threading.Lock()
+
+    def set_ranges(self, ranges):
+        self._tables = compile_ranges(ranges, self.hysteresis)
+
+    def load(self, rows):
+        """Restore open alerts (rows from the alerts table) at startup"""
+        with self._lock:
+            for row in rows:
+                alert = dict(row)
+                key = (alert['device_id'], alert['metric'])
+                self._active[key] = alert
+                self._state[key] = [SEVERITIES.index(alert['severity']), alert['side'], None, 0]
+
+    def evaluate(self, kind, device_id, values, timestamp):
+        """Check one reading; returns [('open' | 'close', alert)] for the changes it causes"""
+        events = []
+        for metric, field, bounds in self._tables.get(kind, ()):
+            value = values.get(field)
+            if not isinstance(value, (int, float)):
+                continue
+            key = (device_id, metric)
+            state = self._state.get(key)
+            if state is None:
+                state = self._state[key] = [0, None, None, 0]
+
+            level, side = classify(value, bounds, state[0], state[1])
+            if level == state[0]:
+                state[2], state[3] = None, 0
+                continue
+            if level == state[2]:
+                state[3] += 1
+            else:
+                state[2], state[3] = level, 1
+            if state[3] < self.debounce:
+                continue
+
+            state[:] = [level, side, None, 0]
+            with self._lock:
+                closed = self._active.pop(key, None)
+                if closed is not None:
+                    closed = dict(closed, closed_at=timestamp, close_value=value)
+                    events.append(('close', closed))
+                if level:
+                    opened = {
+                        'id': None,
+                        'kind': kind,
+                        'device_id': device_id,
+                        'metric': metric,
+                        'severity': SEVERITIES[level],
+                        'side': side,
+                        'value': value,
+                        'opened_at': timestamp,
+                        'closed_at': None,
+                    }
+                    self._active[key] = opened
+                    events.append(('open', opened))
+        return events
+
+    def apply(self, events, reset=False):
+        """Mirror open/close events evaluated in another process (web workers)"""
+        with self._lock:
+            if reset:
+                self._active.clear()
+            for action, alert in events:
+                key = (alert['device_id'], alert['metric'])
+                if action == 'open':
+                    self._active[key] = dict(alert)
+                else:
+                    self._active.pop(key, None)
+
+    def revert(self, events):
+        """Undo events from evaluate() whose rows failed to commit
+
+        The next readings are then debounced again and retry the change.
+        """
+        with self._lock:
+            for action, alert in reversed(events):
+                key = (alert['device_id'], alert['metric'])
+                if action == 'open':
+                    if self._active.get(key) is alert:
+                        del self._active[key]
+                    self._state[key] = [0, None, None, 0]
+                else:
+                    restored = dict(alert, closed_at=None)
+                    restored.pop('close_value', None)
+                    self._active[key] = restored
+                    self._state[key] = [SEVERITIES.index(alert['severity']), alert['side'], None, 0]
+
+    def active(self):
+        """Open alerts, critical first"""
+        with self._lock:
+            alerts = [dict(alert) for alert in self._active.values()]
+        alerts.sort(key=lambda a: (a['severity'] != 'critical', -a['opened_at']))
+        return alerts
@@ -1,54 +1,173 @@
 # Flask + SQLite Backend for Hydroponics Monitoring System
-from flask import Flask, request, jsonify, g, Response
+from flask import Flask, request, jsonify, g, Response, make_response, has_request_context
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit, join_room, leave_room
-import sqlite3
 import json
 import time
 import os
+import shutil
 from datetime import datetime, timedelta
 import threading
-from queue import Queue
+import functools
+import itertools
+from queue import Queue, Empty, Full
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from werkzeug.utils import secure_filename
-
-# Thread-safe queue for camera uploads (handles unlimited concurrent uploads)
-camera_upload_queue = Queue()
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+from migrations import run_migrations
+from rollups import record_rollups, read_rollup, read_raw_buckets, SENSOR_METRICS, ROOM_METRICS
+from zipstream import stream_zip
+from compaction import run_compaction, merge_retention, incremental_vacuum_enabled
+import image_storage
+from upload_journal import UploadJournal
+from settings_store import SettingsStore
+from alerts import AlertEngine
+from db_pool import ConnectionPool, PoolTimeout
+from query_executor import QueryExecutor, QueryTimeout
+from offload import Offloader
+from schedule_engine import CompiledSchedule, RELAYS
+from state_bus import BusBroker, BusClient, BusManager
+
+# Bounded queue for camera uploads; when full, uploads get 503 + Retry-After
+CAMERA_QUEUE_SIZE = int(os.environ.get('CAMERA_QUEUE_SIZE', 500))  # Max uploads waiting for a DB write
+CAMERA_BATCH_SIZE = int(os.environ.get('CAMERA_BATCH_SIZE', 50))  # Max uploads written per transaction
+CAMERA_RETRY_AFTER = 5  # Seconds a camera is told to wait when the queue is full
+camera_upload_queue = Queue(maxsize=CAMERA_QUEUE_SIZE)
 QUEUE_WORKER_COUNT = 2  # Number of workers processing uploads
 
+# Thumbnail/medium derivatives are rendered in a process pool off the request path
+derivative_queue = Queue()
+DERIVATIVE_WORKERS = int(os.environ.get('DERIVATIVE_WORKERS', 2))  # Processes rendering derivatives
+DERIVATIVE_BATCH_SIZE = 16  # Images rendered and recorded per transaction
+
+# Single-writer queue for sensor and room readings (group commit)
+ingest_queue = Queue()
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 500))  # Max readings per commit
+INGEST_BATCH_WAIT = float(os.environ.get('INGEST_BATCH_WAIT_MS', 5)) / 1000  # Max wait to fill a batch
+INGEST_STRICT = os.environ.get('INGEST_STRICT', '0') == '1'  # Always wait for the commit before responding
+INGEST_STRICT_TIMEOUT = 10  # Seconds a strict request waits for its batch to commit
+
+COMPACTION_INTERVAL = int(os.environ.get('COMPACTION_INTERVAL', 3600))  # Seconds between retention runs
+
+# Online/offline tracking: a device goes offline after missing this many reporting intervals
+DEVICE_REPORT_INTERVALS = {
+    'camera': int(os.environ.get('CAMERA_REPORT_INTERVAL', 300)),  # Seconds between camera uploads
+    'unit': int(os.environ.get('UNIT_REPORT_INTERVAL', 60)),  # Seconds between unit sensor POSTs
+    'room': int(os.environ.get('ROOM_REPORT_INTERVAL', 60)),  # Seconds between room sensor POSTs
+}
+DEVICE_MISSED_INTERVALS = int(os.environ.get('DEVICE_MISSED_INTERVALS', 3))
+STATUS_SWEEP_INTERVAL = int(os.environ.get('STATUS_SWEEP_INTERVAL', 30))  # Seconds between sweeps
+
+# Socket.IO pushes are coalesced per unit/camera over this window (0 sends immediately)
+PUSH_COALESCE_INTERVAL = float(os.environ.get('PUSH_COALESCE_MS', 250)) / 1000
+MAX_SUBSCRIPTION_TOPICS = 50  # Topics a client may subscribe to in one request
+
+# Safe-range alerts: a new severity must hold for ALERT_DEBOUNCE readings, and a
+# value must come back ALERT_HYSTERESIS of the warning band inside to clear it
+ALERT_DEBOUNCE = int(os.environ.get('ALERT_DEBOUNCE', 2))
+ALERT_HYSTERESIS = float(os.environ.get('ALERT_HYSTERESIS', 0.05))
+
+# Pooled SQLite connections; background workers keep a couple of writers checked out
+DB_READ_POOL_SIZE = int(os.environ.get('DB_READ_POOL_SIZE', 8))  # Max read-only connections
+DB_WRITE_POOL_SIZE = int(os.environ.get('DB_WRITE_POOL_SIZE', 8))  # Max read/write connections
+DB_CACHE_KB = int(os.environ.get('DB_CACHE_KB', 16384))  # Page cache per connection
+DB_MMAP_MB = int(os.environ.get('DB_MMAP_MB', 256))  # Memory-mapped I/O per connection
+
+# History charts and exports run on a separate executor so long scans never delay ingest
+ANALYTICS_MAX_CONCURRENT = int(os.environ.get('ANALYTICS_MAX_CONCURRENT', 3))  # Heavy queries at once
+ANALYTICS_QUERY_TIMEOUT = int(os.environ.get('ANALYTICS_QUERY_TIMEOUT', 30))  # Seconds per query / export chunk
+ANALYTICS_QUEUE_TIMEOUT = int(os.environ.get('ANALYTICS_QUEUE_TIMEOUT', 10))  # Seconds to wait for a free slot
+ANALYTICS_RETRY_AFTER = 5  # Seconds a client is told to wait when every slot is busy
+
+# Blocking/CPU-heavy request work runs on OS threads so the single eventlet hub stays responsive
+OFFLOAD_LIMITS = {
+    'export': int(os.environ.get('OFFLOAD_EXPORT_LIMIT', 2)),  # ZIP/CSV building steps at once
+    'encode': int(os.environ.get('OFFLOAD_ENCODE_LIMIT', 2)),  # Large JSON payloads encoded at once
+    'upload': int(os.environ.get('OFFLOAD_UPLOAD_LIMIT', 8)),  # Camera uploads written to disk at once
+}
+JSON_OFFLOAD_ITEMS = 2000  # History responses with more points than this are encoded off the hub
+offloader = Offloader(OFFLOAD_LIMITS)
+
+LONG_POLL_MAX_WAIT = int(os.environ.get('LONG_POLL_MAX_WAIT', 30))  # Longest a /changes request is held
+
+# Multi-process mode: one writer process owns every write and background
+# worker, any number of web processes serve reads and Socket.IO (see DEPLOY.md)
+APP_ROLE = os.environ.get('APP_ROLE', 'all')  # all (single process), writer or web
+BUS_SOCKET = os.environ.get('BUS_SOCKET', '/tmp/hydroponics-bus.sock')  # Writer-hosted pub/sub socket
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')  # e.g. redis://...; defaults to the bus
+WRITE_FORWARD_TIMEOUT = int(os.environ.get('WRITE_FORWARD_TIMEOUT', 30))  # Seconds a web worker waits for the writer
+if APP_ROLE not in ('all', 'writer', 'web'):
+    raise ValueError(f"APP_ROLE must be all, writer or web, not {APP_ROLE!r}")
+bus = BusClient(BUS_SOCKET) if APP_ROLE != 'all' else None
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'hydroponics_secret_key_2024'
 CORS(app, origins="*")
-socketio = SocketIO(app, cors_allowed_origins="*")
+if SOCKETIO_MESSAGE_QUEUE and bus:
+    socketio = SocketIO(app, cors_allowed_origins="*", message_queue=SOCKETIO_MESSAGE_QUEUE)
+elif bus:
+    socketio = SocketIO(app, cors_allowed_origins="*",
+                        client_manager=BusManager(bus, write_only=APP_ROLE == 'writer'))
+else:
+    socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Configuration
 DATABASE = os.environ.get('DATABASE_PATH', 'hydroponics.db')
 UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'camera_images')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
+DB_PRAGMAS = {'cache_size': -DB_CACHE_KB, 'mmap_size': DB_MMAP_MB * 1024 * 1024}
+read_pool = ConnectionPool(DATABASE, 'reader', DB_READ_POOL_SIZE, pragmas=DB_PRAGMAS)
+write_pool = ConnectionPool(DATABASE, 'writer', DB_WRITE_POOL_SIZE, pragmas=DB_PRAGMAS)
+analytics = QueryExecutor(DATABASE, ANALYTICS_MAX_CONCURRENT, ANALYTICS_QUERY_TIMEOUT,
+                          pragmas=DB_PRAGMAS, queue_timeout=ANALYTICS_QUEUE_TIMEOUT)
+
 # Create required directories
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 db_dir = os.path.dirname(DATABASE)
 if db_dir:
     os.makedirs(db_dir, exist_ok=True)
 
+# Queued camera uploads are journaled next to the database so they survive a restart
+CAMERA_JOURNAL_DIR = os.environ.get('CAMERA_JOURNAL_DIR', os.path.join(db_dir, 'camera_journal'))
+CAMERA_JOURNAL_FSYNC = os.environ.get('CAMERA_JOURNAL_FSYNC', '1') == '1'  # fsync every upload before acking
+camera_journal = UploadJournal(CAMERA_JOURNAL_DIR, fsync=CAMERA_JOURNAL_FSYNC)
+
+# Settings live on the data volume; older installs kept settings.json in the CWD
+SETTINGS_PATH = os.environ.get('SETTINGS_PATH', os.path.join(db_dir, 'settings.json'))
+if not os.path.exists(SETTINGS_PATH) and os.path.exists('settings.json'):
+    shutil.copyfile('settings.json', SETTINGS_PATH)
+    print(f"Copied settings.json to {SETTINGS_PATH}")
+settings_store = SettingsStore(SETTINGS_PATH)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def image_url(image_path):
+    return image_storage.image_url(UPLOAD_FOLDER, image_path)
+
+def derivative_urls(image):
+    """thumb_url/medium_url for a camera_images row, falling back to the original"""
+    full_url = image_url(image['image_path'])
+    return {
+        'thumb_url': image_url(image['thumb_path']) if image['thumb_path'] else full_url,
+        'medium_url': image_url(image['medium_path']) if image['medium_path'] else full_url
+    }
+
 def get_db():
-    """Get database connection with timeout for concurrent access"""
+    """Pooled connection for this request - read-only for GET/HEAD requests"""
     if 'db' not in g:
-        g.db = sqlite3.connect(DATABASE, timeout=30)
-        g.db.row_factory = sqlite3.Row
+        readonly = has_request_context() and request.method in ('GET', 'HEAD')
+        g.db = get_db_direct(readonly)
     return g.db
 
-def get_db_direct():
-    """Get a direct database connection (for background workers)"""
-    conn = sqlite3.connect(DATABASE, timeout=30)
-    conn.row_factory = sqlite3.Row
-    return conn
+def get_db_direct(readonly=False):
+    """Pooled connection for background work; db.close() returns it to the pool"""
+    return (read_pool if readonly else write_pool).acquire()
 
 def close_db(error):
-    """Close database connection"""
+    """Return the request's connection to the pool"""
     db = g.pop('db', None)
     if db is not None:
         db.close()
@@ -57,6 +176,29 @@ def close_db(error):
 def close_db_handler(error):
     close_db(error)
 
+@app.before_request
+def forward_writes_from_web_workers():
+    """Web workers never write; they hand writes to the writer over the bus"""
+    if APP_ROLE == 'web' and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        return forward_write()
+
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(error):
+    response = jsonify({'error': 'Server busy, retry later'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(ANALYTICS_RETRY_AFTER)
+    return response
+
+@app.errorhandler(QueryTimeout)
+def handle_query_timeout(error):
+    return jsonify({'error': 'Query took too long, try a shorter range'}), 504
+
+def json_response(payload, items):
+    """jsonify(payload), encoding it off the hub when it holds many items"""
+    if items <= JSON_OFFLOAD_ITEMS:
+        return jsonify(payload)
+    return Response(offloader.run('encode', app.json.dumps, payload), mimetype='application/json')
+
 def init_db():
     """Initialize database with tables"""
     with app.app_context():
@@ -120,12 +262,6 @@ def init_db():
             )
         ''')
 
-        # Add control_mode column if it doesn't exist (for existing databases)
-        try:
-            db.execute('ALTER TABLE schedules ADD COLUMN control_mode TEXT DEFAULT "timer"')
-        except sqlite3.OperationalError:
-            pass
-
         # Room sensors table
         db.execute('''
             CREATE TABLE IF NOT EXISTS room_sensors (
@@ -211,54 +347,589 @@ def init_db():
 
         db.commit()
 
-# API Routes
+        # Column additions and indexes are versioned in migrations.py
+        run_migrations(db)
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint for Docker/load balancers"""
-    return jsonify({"status": "healthy", "timestamp": time.time()})
+# Latest-state cache
+# The POST handlers write through to these dicts after committing, so the
+# GET endpoints polled by dashboards and controllers never touch SQLite.
+latest_state_lock = threading.Lock()
+latest_sensors = {}  # unit_id -> /units/<unit_id>/sensors payload
+latest_relays = {}   # unit_id -> /units/<unit_id>/relays payload
+latest_rooms = {}    # ROOM_FRONT / ROOM_BACK -> /room/<room>/sensors payload
 
-@app.route('/units/<unit_id>/sensors', methods=['GET'])
-def get_unit_sensors(unit_id):
-    """Get latest sensor data for a hydro unit"""
-    db = get_db()
+def sensor_payload(unit_id, timestamp, reservoir, climate):
+    return {
+        "unit_id": unit_id,
+        "timestamp": timestamp,
+        "reservoir": {
+            "ph": reservoir.get('ph'),
+            "tds": reservoir.get('tds'),
+            "turbidity": reservoir.get('turbidity'),
+            "water_temp": reservoir.get('water_temp'),
+            "water_level": reservoir.get('water_level')
+        },
+        "climate": climate
+    }
 
-    sensor = db.execute('''
-        SELECT * FROM sensor_readings
-        WHERE unit_id = ?
-        ORDER BY timestamp DESC
-        LIMIT 1
-    ''', (unit_id,)).fetchone()
+def relay_payload(unit_id, timestamp, lights, fans, pump):
+    return {
+        "unit_id": unit_id,
+        "timestamp": timestamp,
+        "relays": {"lights": lights, "fans": fans, "pump": pump}
+    }
 
-    if not sensor:
-        return jsonify({
-            "unit_id": unit_id,
-            "timestamp": None,
-            "reservoir": {"ph": None, "tds": None, "turbidity": None, "water_temp": None, "water_level": None},
-            "climate": {},
-            "status": "no_data"
-        })
+def room_payload(unit_id, timestamp, values):
+    payload = {
+        "unit_id": unit_id,
+        "timestamp": timestamp,
+        "bme": {
+            "temp": values.get('temp'),
+            "humidity": values.get('humidity'),
+            "pressure": values.get('pressure'),
+            "iaq": values.get('iaq')
+        },
+        "co2": values.get('co2')
+    }
+    if unit_id == 'ROOM_BACK':
+        payload["ac"] = {
+            "current_set_temp": values.get('ac_temp'),
+            "mode": values.get('ac_mode')
+        }
+    return payload
+
+def no_sensor_data(unit_id):
+    return {
+        "unit_id": unit_id,
+        "timestamp": None,
+        "reservoir": {"ph": None, "tds": None, "turbidity": None, "water_temp": None, "water_level": None},
+        "climate": {},
+        "status": "no_data"
+    }
+
+def default_relays(unit_id):
+    return relay_payload(unit_id, int(time.time()), "OFF", "OFF", "OFF")
+
+def no_room_data(room_id):
+    payload = {
+        "unit_id": room_id,
+        "timestamp": None,
+        "bme": {"temp": None, "humidity": None, "pressure": None, "iaq": None},
+        "co2": None,
+        "status": "no_data"
+    }
+    if room_id == 'ROOM_BACK':
+        payload["ac"] = {"current_set_temp": None, "mode": None}
+    return payload
+
+def load_latest_state():
+    """Rebuild the latest-state cache from the database (run at startup)"""
+    db = get_db_direct(readonly=True)
+    try:
+        latest_query = '''
+            SELECT * FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY unit_id ORDER BY timestamp DESC, id DESC
+                ) AS rn
+                FROM {table}
+            ) WHERE rn = 1
+        '''
+        sensors = db.execute(latest_query.format(table='sensor_readings')).fetchall()
+        relays = db.execute(latest_query.format(table='relay_states')).fetchall()
+        rooms = db.execute(latest_query.format(table='room_sensors')).fetchall()
+    finally:
+        db.close()
+
+    with latest_state_lock:
+        latest_sensors.clear()
+        latest_relays.clear()
+        latest_rooms.clear()
+        for row in sensors:
+            climate = json.loads(row['climate_data']) if row['climate_data'] else {}
+            latest_sensors[row['unit_id']] = sensor_payload(row['unit_id'], row['timestamp'], dict(row), climate)
+        for row in relays:
+            latest_relays[row['unit_id']] = relay_payload(
+                row['unit_id'], row['timestamp'], row['lights'], row['fans'], row['pump'])
+        for row in rooms:
+            latest_rooms[row['unit_id']] = room_payload(row['unit_id'], row['timestamp'], dict(row))
+
+    print(f"Latest-state cache loaded: {len(sensors)} units, {len(relays)} relay sets, {len(rooms)} rooms")
+
+# Compiled schedules
+# Each unit's active schedule rows are merged and compiled when written, so
+# GET /units/<unit_id>/schedule and /effective_state never decode JSON.
+compiled_schedules = {}  # unit_id -> CompiledSchedule
+
+def refresh_schedule(db, unit_id):
+    """Recompile a unit's schedule after a committed write to its schedules rows"""
+    schedules = db.execute('''
+        SELECT schedule_data FROM schedules
+        WHERE unit_id = ? AND active = 1 ORDER BY id
+    ''', (unit_id,)).fetchall()
+    compiled_schedules[unit_id] = CompiledSchedule(merge_schedules(schedules))
+    replicate('schedule', (unit_id, compiled_schedules[unit_id].schedule))
+
+def load_schedules():
+    """Compile every unit's active schedule (run at startup)"""
+    db = get_db_direct(readonly=True)
+    try:
+        rows = db.execute('SELECT unit_id, schedule_data FROM schedules WHERE active = 1 ORDER BY id').fetchall()
+    finally:
+        db.close()
+
+    by_unit = {}
+    for row in rows:
+        by_unit.setdefault(row['unit_id'], []).append(row)
+    compiled_schedules.clear()
+    for unit_id, schedules in by_unit.items():
+        compiled_schedules[unit_id] = CompiledSchedule(merge_schedules(schedules))
+    print(f"Compiled schedules for {len(by_unit)} units")
+
+def unit_schedule(unit_id):
+    compiled = compiled_schedules.get(unit_id)
+    return compiled or CompiledSchedule(merge_schedules([]))
+
+# Device liveness
+# Cameras, unit controllers and room nodes each have an in-memory last-seen
+# time, bumped whenever a committed upload or reading arrives from them.
+# status_sweeper() flips a device offline once it has missed
+# DEVICE_MISSED_INTERVALS reporting intervals and pushes the changes.
+device_lock = threading.Lock()
+device_last_seen = {}  # (kind, device_id) -> unix time last heard from
+device_status = {}     # (kind, device_id) -> 'online' / 'offline' as last published
+
+def mark_device_seen(kind, device_id, timestamp=None):
+    timestamp = timestamp or time.time()
+    key = (kind, device_id)
+    with device_lock:
+        if timestamp > device_last_seen.get(key, 0):
+            device_last_seen[key] = timestamp
+    replicate('device_seen', (key, timestamp))
+
+def compute_device_status(kind, last_seen, now):
+    limit = DEVICE_REPORT_INTERVALS[kind] * DEVICE_MISSED_INTERVALS
+    return 'online' if now - last_seen <= limit else 'offline'
+
+def device_payload(key, status):
+    return {
+        'kind': key[0],
+        'device_id': key[1],
+        'status': status,
+        'last_seen': int(device_last_seen[key])
+    }
+
+def load_device_state():
+    """Seed last-seen times from the latest-state cache and camera_status (run at startup)"""
+    db = get_db_direct(readonly=True)
+    try:
+        cameras = db.execute('SELECT camera_id, last_image_timestamp, status FROM camera_status').fetchall()
+    finally:
+        db.close()
+
+    now = time.time()
+    with latest_state_lock:
+        seen = [(('unit', unit_id), payload['timestamp']) for unit_id, payload in latest_sensors.items()]
+        seen += [(('room', unit_id), payload['timestamp']) for unit_id, payload in latest_rooms.items()]
+
+    with device_lock:
+        for key, timestamp in seen:
+            device_last_seen[key] = timestamp
+            device_status[key] = compute_device_status(key[0], timestamp, now)
+        # Cameras start from their stored status so the first sweep corrects stale rows
+        for camera in cameras:
+            key = ('camera', camera['camera_id'])
+            device_last_seen[key] = camera['last_image_timestamp'] or 0
+            device_status[key] = camera['status']
+
+def sweep_device_status(now=None):
+    """Recompute every device's status; returns the ones that changed"""
+    now = now or time.time()
+    changes = []
+    with device_lock:
+        for key, last_seen in device_last_seen.items():
+            status = compute_device_status(key[0], last_seen, now)
+            if device_status.get(key) != status:
+                device_status[key] = status
+                changes.append(device_payload(key, status))
+    return changes
+
+# Push channel
+# Clients subscribe to topics (Socket.IO rooms) and get the full normalized
+# payload with every update, so nothing has to be refetched over REST:
+#   unit:<unit_id>     sensor_update and relay_update for one unit
+#   units              sensor_update and relay_update for every unit
+#   room:<room_id>     room_update for ROOM_FRONT or ROOM_BACK
+#   rooms              room_update for both rooms
+#   cameras:<unit>     camera_image_uploaded for one unit's cameras
+#   cameras            camera_image_uploaded for every camera
+#   devices            device_status changes
+#   alerts             alert_opened and alert_closed for every unit and room
+# Updates are held for PUSH_COALESCE_INTERVAL and only the newest payload
+# per (event, key) is sent, so a burst costs each subscriber one message.
+PUSH_TOPICS = {'units', 'rooms', 'cameras', 'devices', 'alerts'}
+PUSH_TOPIC_PREFIXES = ('unit:', 'room:', 'cameras:')
+push_lock = threading.Lock()
+pending_pushes = {}  # (event, key) -> (payload, topics)
+
+def valid_topic(topic):
+    return isinstance(topic, str) and (topic in PUSH_TOPICS or topic.startswith(PUSH_TOPIC_PREFIXES))
+
+def push_update(event, key, payload, topics):
+    """Queue payload for the subscribers of topics, replacing any unsent one for key"""
+    if PUSH_COALESCE_INTERVAL <= 0:
+        socketio.emit(event, payload, to=topics)
+        return
+    with push_lock:
+        pending_pushes[(event, key)] = (payload, topics)
+
+def flush_pushes():
+    with push_lock:
+        pushes = list(pending_pushes.items())
+        pending_pushes.clear()
+    for (event, _), (payload, topics) in pushes:
+        socketio.emit(event, payload, to=topics)
+
+# Conditional GETs
+# Every write bumps an in-memory version for what it touched ("relays:DWC1",
+# "ac_schedule", ...) and for its group ("relays"). Read endpoints derive
+# their ETag/Last-Modified from those versions, so answering a poll with
+# 304 Not Modified never touches SQLite. Versions start at process start,
+# which makes clients refetch once after a restart. Web workers take the
+# writer's epoch and versions over the bus instead of bumping their own.
+version_epoch = [int(time.time())]
+version_lock = threading.Lock()
+version_changed = threading.Condition(version_lock)  # Wakes long-poll requests
+version_seq = [0]
+state_versions = {}  # key -> (sequence, unix time of the write)
+
+def set_versions(seq, keys, now):
+    """Record a write to keys as sequence seq; caller holds version_lock"""
+    version_seq[0] = max(version_seq[0], seq)
+    for key in keys:
+        state_versions[key] = state_versions[key.split(':')[0]] = (seq, now)
+    version_changed.notify_all()
+
+def bump_version(*keys):
+    if APP_ROLE == 'web':
+        return  # Only the writer writes; its bumps arrive through apply_state()
+    now = int(time.time())
+    with version_lock:
+        seq = version_seq[0] + 1
+        set_versions(seq, keys, now)
+        replicate('versions', (seq, keys, now))
+
+def current_version(keys):
+    """(etag, last_modified) for the newest write to any of keys"""
+    with version_lock:
+        seq, modified = max((state_versions.get(key, (0, version_epoch[0])) for key in keys))
+    return f"{version_epoch[0]}-{seq}", max(modified, version_epoch[0])
+
+def wait_for_change(keys, since, timeout):
+    """Block until the version of keys differs from since (or timeout); returns it"""
+    deadline = time.time() + timeout
+    with version_lock:
+        while True:
+            seq, _ = max((state_versions.get(key, (0, version_epoch[0])) for key in keys))
+            version = f"{version_epoch[0]}-{seq}"
+            remaining = deadline - time.time()
+            if version != since or remaining <= 0:
+                return version
+            version_changed.wait(remaining)
+
+def change_feed(keys, build_payload):
+    """Long-poll response for GET .../changes?since=<version>&wait=<sec>
+
+    Answers at once if the client's version is stale, otherwise holds the
+    request until a write bumps one of keys or wait runs out (304).
+    """
+    since = request.args.get('since') or (request.if_none_match.as_set() or {None}).pop()
+    wait = max(0, min(request.args.get('wait', LONG_POLL_MAX_WAIT, type=int), LONG_POLL_MAX_WAIT))
+    version = wait_for_change(keys, since, wait)
+
+    if version == since:
+        response = Response(status=304)
+    else:
+        response = jsonify({**build_payload(), 'version': version})
+    response.set_etag(version)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def conditional_get(*key_templates):
+    """Answer GETs with 304 when the client's copy is current
+
+    Keys are formatted with the view's URL arguments, e.g. 'relays:{unit_id}'.
+    Only the ETag is validated: If-Modified-Since has whole-second precision
+    and would answer 304 for a second write within the same second.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            etag, modified = current_version([key.format(**kwargs) for key in key_templates])
+            not_modified = request.if_none_match.contains(etag)
+
+            response = Response(status=304) if not_modified else make_response(view(**kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                response.last_modified = modified
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+# Group-commit ingest
+# Handlers queue readings as {'kind', 'unit_id', 'timestamp', 'data'} dicts.
+# ingest_writer() drains the queue into one transaction per batch, then
+# updates the latest-state cache and broadcasts once the batch is committed.
+
+def insert_reading(db, reading):
+    """Insert one queued reading and fold it into the rollups (caller commits)"""
+    unit_id = reading['unit_id']
+    timestamp = reading['timestamp']
+    data = reading['data']
+
+    if reading['kind'] == 'sensor':
+        reservoir = data.get('reservoir', {})
+        db.execute('''
+            INSERT INTO sensor_readings
+            (unit_id, timestamp, ph, tds, turbidity, water_temp, water_level, climate_data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            unit_id, timestamp,
+            reservoir.get('ph'), reservoir.get('tds'),
+            reservoir.get('turbidity'), reservoir.get('water_temp'),
+            reservoir.get('water_level'), json.dumps(data.get('climate', {}))
+        ))
+        record_rollups(db, unit_id, timestamp, reservoir, SENSOR_METRICS)
+    else:
+        db.execute('''
+            INSERT INTO room_sensors
+            (unit_id, timestamp, temp, humidity, pressure, iaq, co2, ac_temp, ac_mode)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            unit_id, timestamp,
+            data.get('temp'), data.get('humidity'),
+            data.get('pressure'), data.get('iaq'),
+            data.get('co2'), data.get('ac_temp'),
+            data.get('ac_mode')
+        ))
+        record_rollups(db, unit_id, timestamp, data, ROOM_METRICS)
+
+def publish_reading(reading):
+    """Write a committed reading through to the cache and broadcast it
+
+    Backfilled readings older than the cached state are stored but not
+    published, so a replayed device buffer never rolls the dashboard back.
+    Returns whether the reading was published.
+    """
+    unit_id = reading['unit_id']
+    timestamp = reading['timestamp']
+    data = reading['data']
+    cache = latest_sensors if reading['kind'] == 'sensor' else latest_rooms
+
+    # A replayed buffer is still proof the device is alive right now
+    mark_device_seen('unit' if reading['kind'] == 'sensor' else 'room', unit_id)
+
+    with latest_state_lock:
+        current = cache.get(unit_id)
+        if current and current['timestamp'] > timestamp:
+            return False
+        if reading['kind'] == 'sensor':
+            payload = sensor_payload(
+                unit_id, timestamp, data.get('reservoir', {}), data.get('climate', {}))
+        else:
+            payload = room_payload(unit_id, timestamp, data)
+        cache[unit_id] = payload
+    replicate('latest', ('sensors' if reading['kind'] == 'sensor' else 'rooms', unit_id, payload))
+
+    bump_version(f"sensors:{unit_id}" if reading['kind'] == 'sensor' else f"rooms:{unit_id}")
+
+    if reading['kind'] == 'sensor':
+        push_update('sensor_update', unit_id, payload, [f'unit:{unit_id}', 'units'])
+    else:
+        push_update('room_update', unit_id, payload, [f'room:{unit_id}', 'rooms'])
+    return True
+
+def submit_readings(readings, strict=False):
+    """Queue readings for the ingest writer
+
+    Returns True straight away unless strict (or INGEST_STRICT) is set, in
+    which case it blocks until the batch commits and returns whether it did.
+    """
+    job = {'readings': readings, 'done': None, 'ok': False}
+    if strict or INGEST_STRICT:
+        job['done'] = threading.Event()
+
+    ingest_queue.put(job)
+
+    if job['done'] is None:
+        return True
+    if not job['done'].wait(INGEST_STRICT_TIMEOUT):
+        return False
+    return job['ok']
+
+# Readings the ingest writer has committed or failed to commit. Non-strict
+# POSTs are acknowledged before their batch commits, so /health is where a
+# failed commit shows up.
+ingest_stats = {'committed': 0, 'failed': 0, 'batch_errors': 0, 'last_error': None}
+
+def commit_jobs(db, jobs):
+    """Insert every reading of the given jobs in a single transaction"""
+    try:
+        for job in jobs:
+            for reading in job['readings']:
+                insert_reading(db, reading)
+        db.commit()
+        return True
+    except Exception as e:
+        print(f"Ingest writer: Error committing {len(jobs)} job(s): {e}")
+        ingest_stats['last_error'] = f"{time.strftime('%Y-%m-%d %H:%M:%S')} commit: {e}"
+        db.rollback()
+        return False
+
+def process_ingest_batch(db, jobs):
+    """Commit one batch, then publish its readings and record the alerts they raise"""
+    if commit_jobs(db, jobs):
+        committed = jobs
+    else:
+        # Retry one job per transaction so a bad reading only fails its own request
+        committed = [job for job in jobs if len(jobs) > 1 and commit_jobs(db, [job])]
+
+    for job in jobs:
+        job['ok'] = job in committed
+        ingest_stats['committed' if job['ok'] else 'failed'] += len(job['readings'])
+
+    alert_events = []
+    for job in committed:
+        for reading in job['readings']:
+            try:
+                if publish_reading(reading):
+                    alert_events.extend(check_alerts(reading))
+            except Exception as e:
+                # Stored already; only the cache/push for this reading is lost
+                print(f"Ingest writer: Error publishing {reading['kind']} reading for {reading['unit_id']}: {e}")
+
+    if alert_events:
+        record_alerts(db, alert_events)
+
+def ingest_writer():
+    """Background writer - commits queued readings in batches bounded by size or time"""
+    print("Ingest writer started")
+    db = get_db_direct()
+
+    while True:
+        jobs = [ingest_queue.get()]
+        count = len(jobs[0]['readings'])
+        deadline = time.time() + INGEST_BATCH_WAIT
+
+        while count < INGEST_BATCH_SIZE:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                job = ingest_queue.get(timeout=remaining)
+            except Empty:
+                break
+            jobs.append(job)
+            count += len(job['readings'])
+
+        try:
+            process_ingest_batch(db, jobs)
+        except Exception as e:
+            # Keep the only writer thread alive; strict waiters see job['ok'] as it stands
+            print(f"Ingest writer: Error processing batch of {len(jobs)} job(s): {e}")
+            ingest_stats['batch_errors'] += 1
+            ingest_stats['last_error'] = f"{time.strftime('%Y-%m-%d %H:%M:%S')} batch: {e}"
+            try:
+                db.rollback()
+            except Exception:
+                db = get_db_direct()  # the connection itself is broken
+        finally:
+            for job in jobs:
+                if job['done'] is not None:
+                    job['done'].set()
+
+# Safe-range alerts
+# The ingest writer checks every published reading against the compiled
+# ranges; it is the only thread that evaluates, readers just copy open alerts.
+# Open/close events are written in one transaction per batch and pushed to
+# the 'alerts' topic; /alerts/active is served from memory.
+alert_engine = AlertEngine(settings_store.get().get('ranges'), ALERT_HYSTERESIS, ALERT_DEBOUNCE)
+
+def load_alerts():
+    """Restore open alerts from the database (run at startup)"""
+    db = get_db_direct(readonly=True)
+    try:
+        rows = db.execute('SELECT * FROM alerts WHERE closed_at IS NULL ORDER BY id').fetchall()
+    finally:
+        db.close()
+    alert_engine.load(rows)
+    print(f"Alerts loaded: {len(rows)} open")
 
-    climate_data = json.loads(sensor['climate_data']) if sensor['climate_data'] else {}
+def check_alerts(reading):
+    data = reading['data']
+    values = data.get('reservoir', {}) if reading['kind'] == 'sensor' else data
+    return alert_engine.evaluate(reading['kind'], reading['unit_id'], values, reading['timestamp'])
 
+def record_alerts(db, events):
+    """Persist alert open/close events from one ingest batch, then push them
+
+    Nothing is pushed unless the rows commit; on failure the engine forgets
+    the events so the next readings retry them.
+    """
+    try:
+        for action, alert in events:
+            if action == 'open':
+                cursor = db.execute('''
+                    INSERT INTO alerts (kind, device_id, metric, severity, side, value, opened_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (alert['kind'], alert['device_id'], alert['metric'], alert['severity'],
+                      alert['side'], alert['value'], alert['opened_at']))
+                alert['id'] = cursor.lastrowid
+            elif alert['id'] is not None:
+                db.execute('UPDATE alerts SET closed_at = ?, close_value = ? WHERE id = ?',
+                           (alert['closed_at'], alert['close_value'], alert['id']))
+        db.commit()
+    except Exception as e:
+        print(f"Ingest writer: Error recording {len(events)} alert event(s): {e}")
+        db.rollback()
+        alert_engine.revert(events)
+        return
+
+    replicate('alerts', events)
+    bump_version('alerts')
+    for action, alert in events:
+        device_topic = f"unit:{alert['device_id']}" if alert['kind'] == 'sensor' else f"room:{alert['device_id']}"
+        push_update('alert_opened' if action == 'open' else 'alert_closed',
+                    (alert['device_id'], alert['metric'], alert['opened_at']),
+                    alert, ['alerts', device_topic])
+
+# API Routes
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint for Docker/load balancers"""
     return jsonify({
-        "unit_id": unit_id,
-        "timestamp": sensor['timestamp'],
-        "reservoir": {
-            "ph": sensor['ph'],
-            "tds": sensor['tds'],
-            "turbidity": sensor['turbidity'],
-            "water_temp": sensor['water_temp'],
-            "water_level": sensor['water_level']
+        "status": "healthy",
+        "role": APP_ROLE,
+        "timestamp": time.time(),
+        "db_pools": {
+            "reader": read_pool.stats(),
+            "writer": write_pool.stats(),
+            "analytics": analytics.stats()
         },
-        "climate": climate_data
+        "offload": offloader.stats(),
+        "ingest": dict(ingest_stats, queued=ingest_queue.qsize())
     })
 
+@app.route('/units/<unit_id>/sensors', methods=['GET'])
+@conditional_get('sensors:{unit_id}')
+def get_unit_sensors(unit_id):
+    """Get latest sensor data for a hydro unit (served from the latest-state cache)"""
+    return jsonify(latest_sensors.get(unit_id) or no_sensor_data(unit_id))
+
 @app.route('/units/<unit_id>/sensors/history', methods=['GET'])
 def get_sensor_history(unit_id):
-    """Get historical sensor data for charts"""
-    db = get_db()
-
+    """Get historical sensor data for charts (queried on the analytics executor)"""
     # Parameters
     sensor = request.args.get('sensor', 'ph')  # ph, tds, turbidity, water_temp, water_level
     range_type = request.args.get('range', '24h')  # 1h, 24h, 7d, 30d
@@ -292,20 +963,11 @@ def get_sensor_history(unit_id):
 
     # Get data with aggregation for smoother charts
     if interval > 60:
-        # Aggregate data by interval using SQLite's integer division
-        query = f'''
-            SELECT
-                (timestamp / ?) * ? as bucket_time,
-                AVG({sensor}) as value,
-                MIN({sensor}) as min_val,
-                MAX({sensor}) as max_val,
-                COUNT(*) as count
-            FROM sensor_readings
-            WHERE unit_id = ? AND timestamp >= ? AND {sensor} IS NOT NULL
-            GROUP BY bucket_time
-            ORDER BY bucket_time ASC
-        '''
-        readings = db.execute(query, (interval, interval, unit_id, start_time)).fetchall()
+        # Read pre-aggregated buckets from the rollup table (raw rows for other columns)
+        if sensor in SENSOR_METRICS:
+            readings = analytics.run(read_rollup, unit_id, sensor, interval, start_time)
+        else:
+            readings = analytics.run(read_raw_buckets, 'sensor_readings', unit_id, sensor, interval, start_time)
 
         data_points = []
         for row in readings:
@@ -323,7 +985,7 @@ def get_sensor_history(unit_id):
             WHERE unit_id = ? AND timestamp >= ? AND {sensor} IS NOT NULL
             ORDER BY timestamp ASC
         '''
-        readings = db.execute(query, (unit_id, start_time)).fetchall()
+        readings = analytics.query(query, (unit_id, start_time))
 
         data_points = []
         for row in readings:
@@ -332,7 +994,7 @@ def get_sensor_history(unit_id):
                 'value': round(row['value'], 2) if row['value'] else None
             })
 
-    return jsonify({
+    return json_response({
         'unit_id': unit_id,
         'sensor': sensor,
         'range': range_type,
@@ -340,14 +1002,12 @@ def get_sensor_history(unit_id):
         'end_time': now,
         'interval': interval,
         'data': data_points
-    })
+    }, len(data_points))
 
 
 @app.route('/room/<room_id>/sensors/history', methods=['GET'])
 def get_room_sensor_history(room_id):
-    """Get historical room sensor data for charts"""
-    db = get_db()
-
+    """Get historical room sensor data for charts (queried on the analytics executor)"""
     # Map room_id to unit_id
     unit_id = f"ROOM_{room_id.upper()}"
 
@@ -384,18 +1044,10 @@ def get_room_sensor_history(room_id):
 
     # Get data with aggregation
     if interval > 60:
-        query = f'''
-            SELECT
-                (timestamp / ?) * ? as bucket_time,
-                AVG({sensor}) as value,
-                MIN({sensor}) as min_val,
-                MAX({sensor}) as max_val
-            FROM room_sensors
-            WHERE unit_id = ? AND timestamp >= ? AND {sensor} IS NOT NULL
-            GROUP BY bucket_time
-            ORDER BY bucket_time ASC
-        '''
-        readings = db.execute(query, (interval, interval, unit_id, start_time)).fetchall()
+        if sensor in ROOM_METRICS:
+            readings = analytics.run(read_rollup, unit_id, sensor, interval, start_time)
+        else:
+            readings = analytics.run(read_raw_buckets, 'room_sensors', unit_id, sensor, interval, start_time)
 
         data_points = []
         for row in readings:
@@ -412,7 +1064,7 @@ def get_room_sensor_history(room_id):
             WHERE unit_id = ? AND timestamp >= ? AND {sensor} IS NOT NULL
             ORDER BY timestamp ASC
         '''
-        readings = db.execute(query, (unit_id, start_time)).fetchall()
+        readings = analytics.query(query, (unit_id, start_time))
 
         data_points = []
         for row in readings:
@@ -421,7 +1073,7 @@ def get_room_sensor_history(room_id):
                 'value': round(row['value'], 2) if row['value'] else None
             })
 
-    return jsonify({
+    return json_response({
         'room_id': room_id,
         'sensor': sensor,
         'range': range_type,
@@ -429,71 +1081,37 @@ def get_room_sensor_history(room_id):
         'end_time': now,
         'interval': interval,
         'data': data_points
-    })
+    }, len(data_points))
 
 
 @app.route('/units/<unit_id>/sensors', methods=['POST'])
 def update_unit_sensors(unit_id):
-    """Receive sensor data from ESP32 controller"""
+    """Receive sensor data from ESP32 controller (queued for the ingest writer)"""
     data = request.get_json()
-    db = get_db()
     timestamp = int(time.time())
 
-    reservoir = data.get('reservoir', {})
-    climate = data.get('climate', {})
-
-    db.execute('''
-        INSERT INTO sensor_readings
-        (unit_id, timestamp, ph, tds, turbidity, water_temp, water_level, climate_data)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        unit_id, timestamp,
-        reservoir.get('ph'), reservoir.get('tds'),
-        reservoir.get('turbidity'), reservoir.get('water_temp'),
-        reservoir.get('water_level'), json.dumps(climate)
-    ))
-    db.commit()
-
-    # Broadcast update via WebSocket
-    socketio.emit('sensor_update', {
+    reading = {
+        'kind': 'sensor',
         'unit_id': unit_id,
-        'timestamp': timestamp
-    })
+        'timestamp': timestamp,
+        'data': {'reservoir': data.get('reservoir', {}), 'climate': data.get('climate', {})}
+    }
+    if not submit_readings([reading], strict=request.args.get('strict') == '1'):
+        return jsonify({"error": "Failed to store reading"}), 500
 
     return jsonify({"status": "ok", "unit_id": unit_id, "timestamp": timestamp})
 
 @app.route('/units/<unit_id>/relays', methods=['GET'])
+@conditional_get('relays:{unit_id}')
 def get_unit_relays(unit_id):
-    """Get current relay states for a hydro unit"""
-    db = get_db()
-
-    relay = db.execute('''
-        SELECT * FROM relay_states
-        WHERE unit_id = ?
-        ORDER BY timestamp DESC
-        LIMIT 1
-    ''', (unit_id,)).fetchone()
+    """Get current relay states for a hydro unit (served from the latest-state cache)"""
+    return jsonify(latest_relays.get(unit_id) or default_relays(unit_id))
 
-    if not relay:
-        return jsonify({
-            "unit_id": unit_id,
-            "timestamp": int(time.time()),
-            "relays": {
-                "lights": "OFF",
-                "fans": "OFF",
-                "pump": "OFF"
-            }
-        })
-
-    return jsonify({
-        "unit_id": unit_id,
-        "timestamp": relay['timestamp'],
-        "relays": {
-            "lights": relay['lights'],
-            "fans": relay['fans'],
-            "pump": relay['pump']
-        }
-    })
+@app.route('/units/<unit_id>/relays/changes', methods=['GET'])
+def get_unit_relay_changes(unit_id):
+    """Long-poll for relay changes - controllers pass back the version they last saw"""
+    return change_feed([f'relays:{unit_id}'],
+                       lambda: latest_relays.get(unit_id) or default_relays(unit_id))
 
 @app.route('/units/<unit_id>/relay', methods=['POST'])
 def update_unit_relay(unit_id):
@@ -503,12 +1121,8 @@ def update_unit_relay(unit_id):
     timestamp = int(time.time())
 
     # Get current states
-    current = db.execute('''
-        SELECT * FROM relay_states
-        WHERE unit_id = ?
-        ORDER BY timestamp DESC
-        LIMIT 1
-    ''', (unit_id,)).fetchone()
+    cached = latest_relays.get(unit_id)
+    current = cached['relays'] if cached else None
 
     lights = data.get('lights', current['lights'] if current else 'OFF')
     fans = data.get('fans', current['fans'] if current else 'OFF')
@@ -547,13 +1161,17 @@ def update_unit_relay(unit_id):
             ''', (json.dumps(schedule_data), schedule['id']))
 
     db.commit()
+    if relay_changed:
+        refresh_schedule(db, unit_id)
 
-    # Broadcast update via WebSocket
-    socketio.emit('relay_update', {
-        'unit_id': unit_id,
-        'timestamp': timestamp,
-        'relays': {'lights': lights, 'fans': fans, 'pump': pump}
-    })
+    payload = relay_payload(unit_id, timestamp, lights, fans, pump)
+    with latest_state_lock:
+        latest_relays[unit_id] = payload
+    replicate('latest', ('relays', unit_id, payload))
+    bump_version(f'relays:{unit_id}', *([f'schedules:{unit_id}'] if relay_changed else []))
+
+    # Push to the unit's subscribers via WebSocket
+    push_update('relay_update', unit_id, payload, [f'unit:{unit_id}', 'units'])
 
     return jsonify({
         "unit_id": unit_id,
@@ -562,15 +1180,37 @@ def update_unit_relay(unit_id):
     })
 
 @app.route('/units/<unit_id>/schedule', methods=['GET'])
+@conditional_get('schedules:{unit_id}')
 def get_unit_schedule(unit_id):
-    """Get schedule for a hydro unit"""
-    db = get_db()
-
-    schedules = db.execute('''
-        SELECT * FROM schedules
-        WHERE unit_id = ? AND active = 1
-    ''', (unit_id,)).fetchall()
+    """Get schedule for a hydro unit (served from the compiled schedule)"""
+    return jsonify(unit_schedule(unit_id).schedule)
+
+@app.route('/units/<unit_id>/effective_state', methods=['GET'])
+def get_effective_state(unit_id):
+    """Relay states a unit should have now (or ?at=<unix time>)
+
+    Timer relays follow the compiled schedule and report when they next
+    switch; manual relays report the last commanded state.
+    """
+    at = request.args.get('at', type=int)
+    timestamp = at if at is not None else int(time.time())
+    current = (latest_relays.get(unit_id) or default_relays(unit_id))['relays']
+    compiled = unit_schedule(unit_id)
+    states = compiled.effective_state(timestamp, current)
+
+    next_transitions = {relay: states[relay][2] for relay in RELAYS}
+    upcoming = [t for t in next_transitions.values() if t is not None]
+    return jsonify({
+        "unit_id": unit_id,
+        "timestamp": timestamp,
+        "relays": {relay: states[relay][0] for relay in RELAYS},
+        "sources": {relay: states[relay][1] for relay in RELAYS},
+        "next_transitions": next_transitions,
+        "next_change": min(upcoming) if upcoming else None
+    })
 
+def merge_schedules(schedules):
+    """Fold a unit's active schedule rows into one dict with its control_modes"""
     result = {}
     control_modes = {'lights': 'timer', 'fans': 'timer', 'pump': 'timer'}
 
@@ -582,7 +1222,7 @@ def get_unit_schedule(unit_id):
         result.update(schedule_data)
 
     result['control_modes'] = control_modes
-    return jsonify(result)
+    return result
 
 @app.route('/units/<unit_id>/schedule', methods=['POST'])
 def update_unit_schedule(unit_id):
@@ -620,6 +1260,8 @@ def update_unit_schedule(unit_id):
         VALUES (?, ?, ?, ?)
     ''', (unit_id, 'time_schedule', json.dumps(schedule_data), 'timer'))
     db.commit()
+    refresh_schedule(db, unit_id)
+    bump_version(f'schedules:{unit_id}')
 
     return jsonify({**data, 'control_modes': control_modes})
 
@@ -654,6 +1296,8 @@ def update_control_mode(unit_id):
             UPDATE schedules SET schedule_data = ? WHERE id = ?
         ''', (json.dumps(schedule_data), schedule['id']))
         db.commit()
+        refresh_schedule(db, unit_id)
+        bump_version(f'schedules:{unit_id}')
 
         return jsonify({
             'unit_id': unit_id,
@@ -672,6 +1316,8 @@ def update_control_mode(unit_id):
             VALUES (?, ?, ?, ?)
         ''', (unit_id, 'time_schedule', json.dumps(schedule_data), 'timer'))
         db.commit()
+        refresh_schedule(db, unit_id)
+        bump_version(f'schedules:{unit_id}')
 
         return jsonify({
             'unit_id': unit_id,
@@ -682,132 +1328,157 @@ def update_control_mode(unit_id):
 
 
 @app.route('/room/front/sensors', methods=['GET'])
+@conditional_get('rooms:ROOM_FRONT')
 def get_front_room_sensors():
-    """Get front room sensor data"""
-    db = get_db()
-
-    sensor = db.execute('''
-        SELECT * FROM room_sensors
-        WHERE unit_id = 'ROOM_FRONT'
-        ORDER BY timestamp DESC
-        LIMIT 1
-    ''', ).fetchone()
-
-    if not sensor:
-        return jsonify({
-            "unit_id": "ROOM_FRONT",
-            "timestamp": None,
-            "bme": {"temp": None, "humidity": None, "pressure": None, "iaq": None},
-            "co2": None,
-            "status": "no_data"
-        })
-
-    return jsonify({
-        "unit_id": "ROOM_FRONT",
-        "timestamp": sensor['timestamp'],
-        "bme": {
-            "temp": sensor['temp'],
-            "humidity": sensor['humidity'],
-            "pressure": sensor['pressure'],
-            "iaq": sensor['iaq']
-        },
-        "co2": sensor['co2']
-    })
+    """Get front room sensor data (served from the latest-state cache)"""
+    return jsonify(latest_rooms.get('ROOM_FRONT') or no_room_data('ROOM_FRONT'))
 
 @app.route('/room/front/sensors', methods=['POST'])
 def update_front_room_sensors():
-    """Receive sensor data from ESP32 controller"""
+    """Receive sensor data from ESP32 controller (queued for the ingest writer)"""
     data = request.get_json()
-    db = get_db()
     timestamp = int(time.time())
 
-    db.execute('''
-        INSERT INTO room_sensors
-        (unit_id, timestamp, temp, humidity, pressure, iaq, co2, ac_temp, ac_mode)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        'ROOM_FRONT', timestamp,
-        data.get('temp'), data.get('humidity'),
-        data.get('pressure'), data.get('iaq'),
-        data.get('co2'), None, None
-    ))
-    db.commit()
-
-    socketio.emit('room_update', {
+    reading = {
+        'kind': 'room',
         'unit_id': 'ROOM_FRONT',
-        'timestamp': timestamp
-    })
+        'timestamp': timestamp,
+        'data': {
+            'temp': data.get('temp'), 'humidity': data.get('humidity'),
+            'pressure': data.get('pressure'), 'iaq': data.get('iaq'),
+            'co2': data.get('co2'), 'ac_temp': None, 'ac_mode': None
+        }
+    }
+    if not submit_readings([reading], strict=request.args.get('strict') == '1'):
+        return jsonify({"error": "Failed to store reading"}), 500
 
     return jsonify({"status": "ok", "timestamp": timestamp})
 
 @app.route('/room/back/sensors', methods=['GET'])
+@conditional_get('rooms:ROOM_BACK')
 def get_back_room_sensors():
-    """Get back room sensor data with AC info"""
-    db = get_db()
-
-    sensor = db.execute('''
-        SELECT * FROM room_sensors
-        WHERE unit_id = 'ROOM_BACK'
-        ORDER BY timestamp DESC
-        LIMIT 1
-    ''', ).fetchone()
-
-    if not sensor:
-        return jsonify({
-            "unit_id": "ROOM_BACK",
-            "timestamp": None,
-            "bme": {"temp": None, "humidity": None, "pressure": None, "iaq": None},
-            "co2": None,
-            "ac": {"current_set_temp": None, "mode": None},
-            "status": "no_data"
-        })
-
-    return jsonify({
-        "unit_id": "ROOM_BACK",
-        "timestamp": sensor['timestamp'],
-        "bme": {
-            "temp": sensor['temp'],
-            "humidity": sensor['humidity'],
-            "pressure": sensor['pressure'],
-            "iaq": sensor['iaq']
-        },
-        "co2": sensor['co2'],
-        "ac": {
-            "current_set_temp": sensor['ac_temp'],
-            "mode": sensor['ac_mode']
-        }
-    })
+    """Get back room sensor data with AC info (served from the latest-state cache)"""
+    return jsonify(latest_rooms.get('ROOM_BACK') or no_room_data('ROOM_BACK'))
 
 @app.route('/room/back/sensors', methods=['POST'])
 def update_back_room_sensors():
-    """Receive sensor data from ESP32 controller"""
+    """Receive sensor data from ESP32 controller (queued for the ingest writer)"""
     data = request.get_json()
-    db = get_db()
     timestamp = int(time.time())
 
-    db.execute('''
-        INSERT INTO room_sensors
-        (unit_id, timestamp, temp, humidity, pressure, iaq, co2, ac_temp, ac_mode)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        'ROOM_BACK', timestamp,
-        data.get('temp'), data.get('humidity'),
-        data.get('pressure'), data.get('iaq'),
-        data.get('co2'), data.get('ac_temp'),
-        data.get('ac_mode', 'COOL')
-    ))
-    db.commit()
-
-    socketio.emit('room_update', {
+    reading = {
+        'kind': 'room',
         'unit_id': 'ROOM_BACK',
-        'timestamp': timestamp
-    })
+        'timestamp': timestamp,
+        'data': {
+            'temp': data.get('temp'), 'humidity': data.get('humidity'),
+            'pressure': data.get('pressure'), 'iaq': data.get('iaq'),
+            'co2': data.get('co2'), 'ac_temp': data.get('ac_temp'),
+            'ac_mode': data.get('ac_mode', 'COOL')
+        }
+    }
+    if not submit_readings([reading], strict=request.args.get('strict') == '1'):
+        return jsonify({"error": "Failed to store reading"}), 500
 
     return jsonify({"status": "ok", "timestamp": timestamp})
 
-@app.route('/room/back/ac_schedule', methods=['GET'])
-def get_ac_schedule():
-    """Get AC hourly temperature schedule"""
+# Batch ingest for buffered device uploads
+INGEST_BATCH_MAX_ITEMS = 1000
+INGEST_MAX_CLOCK_SKEW = 300  # Seconds a device timestamp may run ahead of the server
+ROOM_UNITS = {'front': 'ROOM_FRONT', 'back': 'ROOM_BACK'}
+
+def parse_batch_item(item, now):
+    """Turn one /ingest/batch item into a queued reading, or raise ValueError"""
+    if not isinstance(item, dict):
+        raise ValueError('item must be an object')
+
+    # Device clock (epoch seconds) or age in seconds for devices without NTP
+    if item.get('timestamp') is not None:
+        timestamp = int(item['timestamp'])
+    elif item.get('age') is not None:
+        timestamp = now - int(item['age'])
+    else:
+        timestamp = now
+    if timestamp > now + INGEST_MAX_CLOCK_SKEW:
+        raise ValueError('timestamp is in the future')
+    if timestamp <= 0:
+        raise ValueError('timestamp must be positive')
+
+    if 'room' in item:
+        unit_id = ROOM_UNITS.get(str(item['room']).lower())
+        if not unit_id:
+            raise ValueError('room must be "front" or "back"')
+        is_back = unit_id == 'ROOM_BACK'
+        return {
+            'kind': 'room',
+            'unit_id': unit_id,
+            'timestamp': timestamp,
+            'data': {
+                'temp': item.get('temp'), 'humidity': item.get('humidity'),
+                'pressure': item.get('pressure'), 'iaq': item.get('iaq'),
+                'co2': item.get('co2'),
+                'ac_temp': item.get('ac_temp') if is_back else None,
+                'ac_mode': item.get('ac_mode', 'COOL') if is_back else None
+            }
+        }
+
+    unit_id = item.get('unit_id')
+    if not unit_id:
+        raise ValueError('unit_id or room is required')
+    reservoir = item.get('reservoir', {})
+    climate = item.get('climate', {})
+    if not isinstance(reservoir, dict) or not isinstance(climate, dict):
+        raise ValueError('reservoir and climate must be objects')
+    return {
+        'kind': 'sensor',
+        'unit_id': unit_id,
+        'timestamp': timestamp,
+        'data': {'reservoir': reservoir, 'climate': climate}
+    }
+
+@app.route('/ingest/batch', methods=['POST'])
+def ingest_batch():
+    """Receive buffered readings for many units and rooms in one request
+
+    Body: {"readings": [{"unit_id": "DWC1", "timestamp": 1700000000, "reservoir": {...}, "climate": {...}},
+                        {"room": "back", "age": 120, "temp": 24.1, ...}]}
+    Valid items are committed in one transaction; the response has a result per item.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('readings')
+    if not isinstance(items, list):
+        return jsonify({'error': 'readings must be a list'}), 400
+    if len(items) > INGEST_BATCH_MAX_ITEMS:
+        return jsonify({'error': f'At most {INGEST_BATCH_MAX_ITEMS} readings per batch'}), 413
+
+    now = int(time.time())
+    readings = []
+    results = []
+    for index, item in enumerate(items):
+        try:
+            reading = parse_batch_item(item, now)
+        except (ValueError, TypeError) as e:
+            results.append({'index': index, 'status': 'error', 'error': str(e)})
+            continue
+        readings.append(reading)
+        results.append({'index': index, 'status': 'ok', 'unit_id': reading['unit_id'],
+                        'timestamp': reading['timestamp']})
+
+    if readings and not submit_readings(readings, strict=True):
+        for result in results:
+            if result['status'] == 'ok':
+                result['status'] = 'error'
+                result['error'] = 'Failed to store reading'
+
+    accepted = sum(1 for result in results if result['status'] == 'ok')
+    return jsonify({
+        'status': 'ok' if accepted == len(results) else 'partial',
+        'accepted': accepted,
+        'rejected': len(results) - accepted,
+        'results': results
+    })
+
+def load_ac_schedule():
     db = get_db()
 
     schedules = db.execute('''
@@ -820,7 +1491,18 @@ def get_ac_schedule():
     for schedule in schedules:
         ac_schedule[schedule['hour']] = schedule['temperature']
 
-    return jsonify({"ac_schedule": ac_schedule})
+    return {"ac_schedule": ac_schedule}
+
+@app.route('/room/back/ac_schedule', methods=['GET'])
+@conditional_get('ac_schedule')
+def get_ac_schedule():
+    """Get AC hourly temperature schedule"""
+    return jsonify(load_ac_schedule())
+
+@app.route('/room/back/ac_schedule/changes', methods=['GET'])
+def get_ac_schedule_changes():
+    """Long-poll for AC schedule changes - the DB is only read once something changed"""
+    return change_feed(['ac_schedule'], load_ac_schedule)
 
 @app.route('/room/back/ac_schedule', methods=['POST'])
 def update_ac_schedule():
@@ -838,10 +1520,12 @@ def update_ac_schedule():
         ''', (temp, hour))
 
     db.commit()
+    bump_version('ac_schedule')
     return jsonify(data)
 
 # Camera API endpoints
 @app.route('/cameras/<unit_id>', methods=['GET'])
+@conditional_get('cameras')
 def get_unit_cameras(unit_id):
     """Get camera status for a hydro unit"""
     db = get_db()
@@ -868,13 +1552,14 @@ def get_unit_cameras(unit_id):
     })
 
 @app.route('/cameras/<camera_id>/images', methods=['GET'])
+@conditional_get('cameras')
 def get_camera_images(camera_id):
     """Get recent images from a specific camera"""
     db = get_db()
     limit = request.args.get('limit', 10, type=int)
 
     images = db.execute('''
-        SELECT id, camera_id, timestamp, image_path, file_size
+        SELECT id, camera_id, timestamp, image_path, file_size, thumb_path, medium_path
         FROM camera_images
         WHERE camera_id = ?
         ORDER BY timestamp DESC
@@ -889,7 +1574,8 @@ def get_camera_images(camera_id):
             'timestamp': image['timestamp'],
             'image_path': image['image_path'],
             'file_size': image['file_size'],
-            'url': f'/camera_images/{os.path.basename(image["image_path"])}'
+            'url': image_url(image['image_path']),
+            **derivative_urls(image)
         })
 
     return jsonify({
@@ -897,6 +1583,18 @@ def get_camera_images(camera_id):
         'images': image_list
     })
 
+def parse_camera_id(camera_id):
+    """Split UNITL<level><position> (e.g. DWCL11) into (unit_id, level, position)"""
+    unit_id = camera_id[:camera_id.index('L')]
+    level_pos = camera_id[camera_id.index('L')+1:]
+    return unit_id, int(level_pos[0]), int(level_pos[1])
+
+def camera_queue_full_response():
+    response = jsonify({'error': 'Upload queue is full, retry later'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(CAMERA_RETRY_AFTER)
+    return response
+
 @app.route('/cameras/<camera_id>/upload', methods=['POST'])
 def upload_camera_image(camera_id):
     """Upload a new camera image - uses queue for database writes to handle 20+ concurrent uploads"""
@@ -908,29 +1606,30 @@ def upload_camera_image(camera_id):
         return jsonify({'error': 'No image file selected'}), 400
 
     if file and allowed_file(file.filename):
+        # Shed load before touching the disk if the DB writers are behind
+        if camera_upload_queue.full():
+            return camera_queue_full_response()
+
         timestamp = int(time.time())
 
         # Parse camera ID to get unit, level, position
         # Format: UNITL<level><position> (e.g., DWCL11, NFTL23)
         try:
-            unit_id = camera_id[:camera_id.index('L')]
-            level_pos = camera_id[camera_id.index('L')+1:]
-            level = int(level_pos[0])
-            position = int(level_pos[1])
+            unit_id, level, position = parse_camera_id(camera_id)
         except (ValueError, IndexError):
             return jsonify({'error': 'Invalid camera_id format. Expected: UNITL<level><position>'}), 400
 
         # Generate unique filename with microseconds to prevent collisions
         unique_suffix = f"{timestamp}_{int(time.time() * 1000000) % 1000000}"
         filename = f"{camera_id}_{unique_suffix}.jpg"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        filepath = os.path.join(UPLOAD_FOLDER, image_storage.image_relpath(unit_id, camera_id, timestamp, filename))
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
-        # Save file immediately (fast, non-blocking)
-        file.save(filepath)
+        # Save file immediately, on an OS thread so a large body doesn't stall the hub
+        offloader.run('upload', file.save, filepath)
         file_size = os.path.getsize(filepath)
 
-        # Queue database write (processed async by background worker)
-        camera_upload_queue.put({
+        upload_data = {
             'camera_id': camera_id,
             'unit_id': unit_id,
             'level': level,
@@ -938,35 +1637,44 @@ def upload_camera_image(camera_id):
             'filepath': filepath,
             'timestamp': timestamp,
             'file_size': file_size
-        })
+        }
 
-        print(f"Camera {camera_id} upload queued at {timestamp} (queue size: {camera_upload_queue.qsize()})")
+        # Journal before acking so a restart can't lose the queued write (fsync, so off the hub)
+        segment = offloader.run('upload', camera_journal.append, upload_data)
+
+        # Queue database write (processed async by background worker)
+        try:
+            camera_upload_queue.put_nowait(dict(upload_data, journal_segment=segment))
+        except Full:
+            os.remove(filepath)
+            camera_journal.committed(segment)
+            return camera_queue_full_response()
 
         return jsonify({
             'message': 'Image uploaded successfully',
             'camera_id': camera_id,
             'timestamp': timestamp,
-            'image_url': f'/camera_images/{filename}',
+            'image_url': image_url(filepath),
             'queued': True
         })
 
     return jsonify({'error': 'Invalid file type'}), 400
 
 @app.route('/units/<unit_id>/cameras/latest', methods=['GET'])
+@conditional_get('cameras')
 def get_unit_latest_images(unit_id):
     """Get latest image from each camera in a unit"""
     db = get_db()
 
+    # camera_status points at each camera's newest image, so this is one
+    # indexed lookup per camera however many frames are stored
     images = db.execute('''
-        SELECT DISTINCT ci.camera_id, ci.timestamp, ci.image_path, ci.level, ci.position
-        FROM camera_images ci
-        INNER JOIN (
-            SELECT camera_id, MAX(timestamp) as max_timestamp
-            FROM camera_images
-            WHERE unit_id = ?
-            GROUP BY camera_id
-        ) latest ON ci.camera_id = latest.camera_id AND ci.timestamp = latest.max_timestamp
-        ORDER BY ci.level, ci.position
+        SELECT cs.camera_id, cs.last_image_timestamp AS timestamp, cs.last_image_path AS image_path,
+               cs.level, cs.position, ci.thumb_path, ci.medium_path
+        FROM camera_status cs
+        LEFT JOIN camera_images ci ON ci.id = cs.last_image_id
+        WHERE cs.unit_id = ? AND cs.last_image_id IS NOT NULL
+        ORDER BY cs.level, cs.position
     ''', (unit_id,)).fetchall()
 
     camera_grid = {}
@@ -978,7 +1686,8 @@ def get_unit_latest_images(unit_id):
         camera_grid[level][f"pos{image['position']}"] = {
             'camera_id': image['camera_id'],
             'timestamp': image['timestamp'],
-            'image_url': f'/camera_images/{os.path.basename(image["image_path"])}'
+            'image_url': image_url(image['image_path']),
+            **derivative_urls(image)
         }
 
     return jsonify({
@@ -987,21 +1696,32 @@ def get_unit_latest_images(unit_id):
     })
 
 # Serve camera images
-@app.route('/camera_images/<filename>')
+@app.route('/camera_images/<path:filename>')
 def serve_camera_image(filename):
-    """Serve camera images"""
-    from flask import send_from_directory
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    """Serve camera images - files are never rewritten, so they are cached as immutable"""
+    from flask import send_from_directory, redirect
+    if '/' not in filename and not os.path.exists(os.path.join(UPLOAD_FOLDER, filename)):
+        # URL from before images were sharded; the file now lives in its shard
+        relpath = image_storage.flat_to_sharded(filename, lambda camera_id: parse_camera_id(camera_id)[0])
+        if relpath and os.path.exists(os.path.join(UPLOAD_FOLDER, relpath)):
+            return redirect(f"/camera_images/{relpath}", 301)
+    response = send_from_directory(UPLOAD_FOLDER, filename, etag=True, conditional=True)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 @app.route('/cameras/latest', methods=['GET'])
+@conditional_get('cameras')
 def get_latest_camera_image():
     """Get the most recently uploaded camera image"""
     db = get_db()
 
     image = db.execute('''
-        SELECT camera_id, unit_id, level, position, image_path, timestamp, file_size
-        FROM camera_images
-        ORDER BY timestamp DESC
+        SELECT cs.camera_id, cs.unit_id, cs.level, cs.position, cs.last_image_path AS image_path,
+               cs.last_image_timestamp AS timestamp, ci.file_size, ci.thumb_path, ci.medium_path
+        FROM camera_status cs
+        LEFT JOIN camera_images ci ON ci.id = cs.last_image_id
+        WHERE cs.last_image_id IS NOT NULL
+        ORDER BY cs.last_image_timestamp DESC
         LIMIT 1
     ''').fetchone()
 
@@ -1015,11 +1735,105 @@ def get_latest_camera_image():
         'position': image['position'],
         'timestamp': image['timestamp'],
         'file_size': image['file_size'],
-        'image_url': f'/camera_images/{os.path.basename(image["image_path"])}'
+        'image_url': image_url(image['image_path']),
+        **derivative_urls(image)
+    })
+
+
+@app.route('/devices/status', methods=['GET'])
+def get_device_status():
+    """Online/offline state of every camera, unit controller and room node"""
+    now = time.time()
+    with device_lock:
+        devices = [device_payload(key, compute_device_status(key[0], device_last_seen[key], now))
+                   for key in sorted(device_last_seen)]
+
+    return jsonify({
+        'timestamp': int(time.time()),
+        'devices': devices
     })
 
+@app.route('/alerts/active', methods=['GET'])
+@conditional_get('alerts')
+def get_active_alerts():
+    """Currently open safe-range alerts (critical first), served from memory"""
+    return jsonify({
+        'timestamp': int(time.time()),
+        'alerts': alert_engine.active()
+    })
+
+SNAPSHOT_FIELDS = ('sensors', 'relays', 'control_modes', 'rooms', 'cameras')
+
+@app.route('/dashboard/snapshot', methods=['GET'])
+@conditional_get('sensors', 'relays', 'schedules', 'rooms', 'cameras')
+def get_dashboard_snapshot():
+    """Latest state of every unit, room and camera in one response
+
+    ?fields=sensors,relays,control_modes,rooms,cameras picks the sections
+    (default: all). Sensors, relays and rooms come from the latest-state
+    cache, control modes from the compiled schedules; cameras take one query.
+    """
+    requested = request.args.get('fields')
+    fields = set(requested.split(',')) if requested else set(SNAPSHOT_FIELDS)
+    unknown = fields - set(SNAPSHOT_FIELDS)
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+
+    db = get_db()
+    snapshot = {'timestamp': int(time.time())}
+
+    if fields & {'sensors', 'relays', 'control_modes'}:
+        units = db.execute('SELECT unit_id, name, type FROM hydro_units WHERE active = 1 ORDER BY unit_id').fetchall()
+
+        unit_list = {}
+        for unit in units:
+            unit_id = unit['unit_id']
+            entry = {'name': unit['name'], 'type': unit['type']}
+            if 'sensors' in fields:
+                entry['sensors'] = latest_sensors.get(unit_id) or no_sensor_data(unit_id)
+            if 'relays' in fields:
+                entry['relays'] = latest_relays.get(unit_id) or default_relays(unit_id)
+            if 'control_modes' in fields:
+                entry['control_modes'] = unit_schedule(unit_id).schedule['control_modes']
+            unit_list[unit_id] = entry
+        snapshot['units'] = unit_list
+
+    if 'rooms' in fields:
+        snapshot['rooms'] = {room_id: latest_rooms.get(room_id) or no_room_data(room_id)
+                             for room_id in ('ROOM_FRONT', 'ROOM_BACK')}
+
+    if 'cameras' in fields:
+        cameras = db.execute('''
+            SELECT cs.camera_id, cs.unit_id, cs.level, cs.position, cs.status, cs.total_images,
+                   cs.last_image_timestamp, cs.last_image_path AS image_path, ci.thumb_path, ci.medium_path
+            FROM camera_status cs
+            LEFT JOIN camera_images ci ON ci.id = cs.last_image_id
+            ORDER BY cs.unit_id, cs.camera_id
+        ''').fetchall()
+
+        camera_summary = {}
+        for camera in cameras:
+            summary = camera_summary.setdefault(camera['unit_id'], {'total': 0, 'online': 0, 'cameras': []})
+            summary['total'] += 1
+            summary['online'] += camera['status'] == 'online'
+            entry = {
+                'camera_id': camera['camera_id'],
+                'level': camera['level'],
+                'position': camera['position'],
+                'status': camera['status'],
+                'total_images': camera['total_images'],
+                'last_image_timestamp': camera['last_image_timestamp']
+            }
+            if camera['image_path']:
+                entry['image_url'] = image_url(camera['image_path'])
+                entry.update(derivative_urls(camera))
+            summary['cameras'].append(entry)
+        snapshot['cameras'] = camera_summary
+
+    return jsonify(snapshot)
 
 @app.route('/cameras/status', methods=['GET'])
+@conditional_get('cameras')
 def get_all_cameras_status():
     """Get status of all cameras across all units"""
     db = get_db()
@@ -1051,20 +1865,10 @@ def get_all_cameras_status():
     })
 
 # Export endpoints
-@app.route('/export/sensors/csv', methods=['GET'])
-def export_sensors_csv():
-    """Export sensor data as CSV"""
-    import csv
-    import io
-
-    unit = request.args.get('unit', 'ALL')
-    date_range = request.args.get('range', 'last7days')
-    start_date = request.args.get('startDate')
-    end_date = request.args.get('endDate')
-
-    db = get_db()
+EXPORT_FETCH_SIZE = 1000  # Rows per keyset-paged query while streaming an export
 
-    # Calculate date range
+def export_time_range(date_range, start_date, end_date):
+    """Resolve an export range name to (start_time, end_time)"""
     end_time = int(time.time())
     if date_range == 'today':
         start_time = end_time - 86400
@@ -1094,40 +1898,74 @@ def export_sensors_csv():
         end_time = int(datetime.strptime(end_date, '%Y-%m-%d').timestamp()) + 86399
     else:
         start_time = end_time - (7 * 86400)
+    return start_time, end_time
+
+def stream_csv(query, params, end_time, header, format_row):
+    """Yield CSV text chunk by chunk, newest first, from end_time back
+
+    Rows are read one keyset page at a time (analytics.stream) as the
+    client downloads, instead of holding the whole result set in memory.
+    """
+    import csv
+    import io
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(header)
+    yield output.getvalue()
+
+    def format_chunk(rows):
+        output.seek(0)
+        output.truncate()
+        for row in rows:
+            writer.writerow(format_row(row))
+        return output.getvalue()
+
+    for rows in analytics.stream(query, params, ('timestamp', 'id'), EXPORT_FETCH_SIZE,
+                                 descending=True, start=(end_time,)):
+        yield offloader.run('export', format_chunk, rows)
+
+def csv_response(chunks, filename):
+    return Response(
+        chunks,
+        mimetype='text/csv',
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@app.route('/export/sensors/csv', methods=['GET'])
+def export_sensors_csv():
+    """Export sensor data as CSV (streamed)"""
+    unit = request.args.get('unit', 'ALL')
+    date_range = request.args.get('range', 'last7days')
+    start_time, end_time = export_time_range(
+        date_range, request.args.get('startDate'), request.args.get('endDate'))
 
     # Build query
     if unit == 'ALL':
         query = '''
-            SELECT unit_id, timestamp, ph, tds, turbidity, water_temp, water_level, climate_data
+            SELECT id, unit_id, timestamp, ph, tds, turbidity, water_temp, water_level, climate_data
             FROM sensor_readings
-            WHERE timestamp BETWEEN ? AND ?
-            ORDER BY timestamp DESC
+            WHERE timestamp >= ? AND {after}
         '''
-        params = (start_time, end_time)
+        params = (start_time,)
     else:
         query = '''
-            SELECT unit_id, timestamp, ph, tds, turbidity, water_temp, water_level, climate_data
+            SELECT id, unit_id, timestamp, ph, tds, turbidity, water_temp, water_level, climate_data
             FROM sensor_readings
-            WHERE unit_id = ? AND timestamp BETWEEN ? AND ?
-            ORDER BY timestamp DESC
+            WHERE unit_id = ? AND timestamp >= ? AND {after}
         '''
-        params = (unit, start_time, end_time)
-
-    readings = db.execute(query, params).fetchall()
-
-    # Create CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
+        params = (unit, start_time)
 
     header = ['Unit ID', 'Timestamp', 'DateTime', 'pH', 'TDS (ppm)', 'Turbidity (NTU)',
               'Water Temp (C)', 'Water Level (%)', 'Climate Data']
-    writer.writerow(header)
 
-    for reading in readings:
+    def format_row(reading):
         timestamp = reading['timestamp']
         dt = datetime.fromtimestamp(timestamp)
-
-        row = [
+        return [
             reading['unit_id'],
             timestamp,
             dt.strftime('%Y-%m-%d %H:%M:%S'),
@@ -1138,95 +1976,42 @@ def export_sensors_csv():
             reading['water_level'],
             reading['climate_data'] or '{}'
         ]
-        writer.writerow(row)
 
-    output.seek(0)
-
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': f'attachment; filename=sensor-data-{unit}-{date_range}.csv'}
-    )
+    return csv_response(stream_csv(query, params, end_time, header, format_row),
+                        f'sensor-data-{unit}-{date_range}.csv')
 
 @app.route('/export/room/csv', methods=['GET'])
 def export_room_csv():
-    """Export room sensor data as CSV"""
-    import csv
-    import io
-
+    """Export room sensor data as CSV (streamed)"""
     room = request.args.get('room', 'ALL')
     date_range = request.args.get('range', 'last7days')
-    start_date = request.args.get('startDate')
-    end_date = request.args.get('endDate')
-
-    db = get_db()
-
-    # Calculate date range
-    end_time = int(time.time())
-    if date_range == 'today':
-        start_time = end_time - 86400
-    elif date_range == 'yesterday':
-        start_time = end_time - 172800
-        end_time = end_time - 86400
-    elif date_range == 'last7days':
-        start_time = end_time - (7 * 86400)
-    elif date_range == 'last30days':
-        start_time = end_time - (30 * 86400)
-    elif date_range == 'thismonth':
-        now = datetime.now()
-        start_of_month = datetime(now.year, now.month, 1)
-        start_time = int(start_of_month.timestamp())
-    elif date_range == 'lastmonth':
-        now = datetime.now()
-        if now.month == 1:
-            start_of_last_month = datetime(now.year - 1, 12, 1)
-            end_of_last_month = datetime(now.year, 1, 1) - timedelta(days=1)
-        else:
-            start_of_last_month = datetime(now.year, now.month - 1, 1)
-            end_of_last_month = datetime(now.year, now.month, 1) - timedelta(days=1)
-        start_time = int(start_of_last_month.timestamp())
-        end_time = int(end_of_last_month.timestamp())
-    elif date_range == 'custom' and start_date and end_date:
-        start_time = int(datetime.strptime(start_date, '%Y-%m-%d').timestamp())
-        end_time = int(datetime.strptime(end_date, '%Y-%m-%d').timestamp()) + 86399
-    else:
-        start_time = end_time - (7 * 86400)
+    start_time, end_time = export_time_range(
+        date_range, request.args.get('startDate'), request.args.get('endDate'))
 
     # Build query
     if room == 'ALL':
         query = '''
-            SELECT unit_id, timestamp, temp, humidity, pressure, iaq, co2, ac_temp, ac_mode
+            SELECT id, unit_id, timestamp, temp, humidity, pressure, iaq, co2, ac_temp, ac_mode
             FROM room_sensors
-            WHERE timestamp BETWEEN ? AND ?
-            ORDER BY timestamp DESC
+            WHERE timestamp >= ? AND {after}
         '''
-        params = (start_time, end_time)
+        params = (start_time,)
     else:
         query = '''
-            SELECT unit_id, timestamp, temp, humidity, pressure, iaq, co2, ac_temp, ac_mode
+            SELECT id, unit_id, timestamp, temp, humidity, pressure, iaq, co2, ac_temp, ac_mode
             FROM room_sensors
-            WHERE unit_id = ? AND timestamp BETWEEN ? AND ?
-            ORDER BY timestamp DESC
+            WHERE unit_id = ? AND timestamp >= ? AND {after}
         '''
-        params = (room, start_time, end_time)
-
-    readings = db.execute(query, params).fetchall()
-
-    # Create CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
+        params = (room, start_time)
 
     header = ['Room', 'Timestamp', 'DateTime', 'Temperature (C)', 'Humidity (%)',
               'Pressure (hPa)', 'IAQ', 'CO2 (ppm)', 'AC Temp (C)', 'AC Mode']
-    writer.writerow(header)
 
-    for reading in readings:
+    def format_row(reading):
         timestamp = reading['timestamp']
         dt = datetime.fromtimestamp(timestamp)
-
         room_name = 'Front Room' if reading['unit_id'] == 'ROOM_FRONT' else 'Back Room'
-
-        row = [
+        return [
             room_name,
             timestamp,
             dt.strftime('%Y-%m-%d %H:%M:%S'),
@@ -1238,147 +2023,137 @@ def export_room_csv():
             reading['ac_temp'],
             reading['ac_mode']
         ]
-        writer.writerow(row)
 
-    output.seek(0)
-
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': f'attachment; filename=room-data-{room}-{date_range}.csv'}
-    )
+    return csv_response(stream_csv(query, params, end_time, header, format_row),
+                        f'room-data-{room}-{date_range}.csv')
 
 @app.route('/export/images/zip', methods=['GET'])
 def export_images_zip():
-    """Export camera images as ZIP"""
-    import zipfile
-    import io
-
+    """Export camera images as ZIP (streamed, JPEGs stored uncompressed)"""
     unit = request.args.get('unit', 'ALL')
     date_range = request.args.get('range', 'last7days')
-    start_date = request.args.get('startDate')
-    end_date = request.args.get('endDate')
-
-    db = get_db()
-
-    # Calculate date range
-    end_time = int(time.time())
-    if date_range == 'today':
-        start_time = end_time - 86400
-    elif date_range == 'yesterday':
-        start_time = end_time - 172800
-        end_time = end_time - 86400
-    elif date_range == 'last7days':
-        start_time = end_time - (7 * 86400)
-    elif date_range == 'last30days':
-        start_time = end_time - (30 * 86400)
-    elif date_range == 'thismonth':
-        now = datetime.now()
-        start_of_month = datetime(now.year, now.month, 1)
-        start_time = int(start_of_month.timestamp())
-    elif date_range == 'lastmonth':
-        now = datetime.now()
-        if now.month == 1:
-            start_of_last_month = datetime(now.year - 1, 12, 1)
-            end_of_last_month = datetime(now.year, 1, 1) - timedelta(days=1)
-        else:
-            start_of_last_month = datetime(now.year, now.month - 1, 1)
-            end_of_last_month = datetime(now.year, now.month, 1) - timedelta(days=1)
-        start_time = int(start_of_last_month.timestamp())
-        end_time = int(end_of_last_month.timestamp())
-    elif date_range == 'custom' and start_date and end_date:
-        start_time = int(datetime.strptime(start_date, '%Y-%m-%d').timestamp())
-        end_time = int(datetime.strptime(end_date, '%Y-%m-%d').timestamp()) + 86399
-    else:
-        start_time = end_time - (7 * 86400)
+    include_manifest = request.args.get('manifest') == '1'
+    start_time, end_time = export_time_range(
+        date_range, request.args.get('startDate'), request.args.get('endDate'))
 
     # Get image records from database
     if unit == 'ALL':
-        query = '''
-            SELECT camera_id, timestamp, image_path
-            FROM camera_images
-            WHERE timestamp BETWEEN ? AND ?
-            ORDER BY camera_id, timestamp
-        '''
+        where = 'timestamp BETWEEN ? AND ?'
         params = (start_time, end_time)
     else:
-        query = '''
-            SELECT camera_id, timestamp, image_path
-            FROM camera_images
-            WHERE camera_id LIKE ? AND timestamp BETWEEN ? AND ?
-            ORDER BY camera_id, timestamp
-        '''
+        where = 'camera_id LIKE ? AND timestamp BETWEEN ? AND ?'
         params = (f'{unit}%', start_time, end_time)
 
-    images = db.execute(query, params).fetchall()
-
-    if not images:
+    db = get_db()
+    if not db.execute(f'SELECT 1 FROM camera_images WHERE {where} LIMIT 1', params).fetchone():
         return jsonify({'error': 'No images found for the specified criteria'}), 404
 
-    # Create ZIP file in memory
-    zip_buffer = io.BytesIO()
+    query = f'''
+        SELECT id, camera_id, unit_id, timestamp, image_path, file_size
+        FROM camera_images
+        WHERE {where} AND {{after}}
+    '''
 
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for image in images:
-            camera_id = image['camera_id']
-            timestamp = image['timestamp']
-            image_path = image['image_path']
+    def zip_entries():
+        import csv
+        import io
 
-            unit_id = camera_id[:camera_id.index('L')] if 'L' in camera_id else 'UNKNOWN'
+        manifest = io.StringIO()
+        manifest_writer = csv.writer(manifest)
+        manifest_writer.writerow(['path', 'camera_id', 'unit_id', 'timestamp', 'datetime', 'file_size', 'status'])
 
-            dt = datetime.fromtimestamp(timestamp)
-            date_str = dt.strftime('%Y-%m-%d')
-            time_str = dt.strftime('%H-%M-%S')
+        for images in analytics.stream(query, params, ('camera_id', 'timestamp', 'id'), EXPORT_FETCH_SIZE):
+            for image in images:
+                camera_id = image['camera_id']
+                timestamp = image['timestamp']
 
-            zip_path = f"{unit_id}/{camera_id}/{date_str}/{camera_id}_{time_str}.jpg"
+                unit_id = camera_id[:camera_id.index('L')] if 'L' in camera_id else 'UNKNOWN'
+
+                dt = datetime.fromtimestamp(timestamp)
+                date_str = dt.strftime('%Y-%m-%d')
+                time_str = dt.strftime('%H-%M-%S')
+
+                zip_path = f"{unit_id}/{camera_id}/{date_str}/{camera_id}_{time_str}.jpg"
+                full_path = os.path.join(app.root_path, image['image_path'])
 
-            try:
-                full_path = os.path.join(app.root_path, image_path)
                 if os.path.exists(full_path):
-                    zip_file.write(full_path, zip_path)
+                    status = 'ok'
+                    yield zip_path, full_path, dt.timetuple()[:6], False
                 else:
+                    status = 'missing'
                     print(f"Warning: Image file not found: {full_path}")
-            except Exception as e:
-                print(f"Error adding image to ZIP: {e}")
 
-    zip_buffer.seek(0)
+                if include_manifest:
+                    manifest_writer.writerow([
+                        zip_path, camera_id, image['unit_id'], timestamp,
+                        dt.strftime('%Y-%m-%d %H:%M:%S'), image['file_size'], status
+                    ])
+
+        if include_manifest:
+            yield 'manifest.csv', manifest.getvalue().encode(), datetime.now().timetuple()[:6], True
 
     return Response(
-        zip_buffer.read(),
+        stream_zip(zip_entries(), run=lambda fn, *args: offloader.run('export', fn, *args)),
         mimetype='application/zip',
-        headers={'Content-Disposition': f'attachment; filename=camera-images-{unit}-{date_range}.zip'}
+        headers={
+            'Content-Disposition': f'attachment; filename=camera-images-{unit}-{date_range}.zip',
+            'X-Accel-Buffering': 'no'
+        }
     )
 
 # Settings endpoints
-SETTINGS_FILE = 'settings.json'
-
-def load_settings():
-    """Load settings from file"""
-    if os.path.exists(SETTINGS_FILE):
-        with open(SETTINGS_FILE, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_settings(settings):
-    """Save settings to file"""
-    with open(SETTINGS_FILE, 'w') as f:
-        json.dump(settings, f, indent=2)
+# settings_store keeps the parsed settings in memory; subscribers run after
+# every change, including hand edits to the file on the data volume.
+compaction_wakeup = threading.Event()
+applied_retention = [merge_retention(settings_store.get().get('retention'))]
+
+def on_settings_changed(settings):
+    # Web workers re-read the file only every CHECK_INTERVAL, so send them the
+    # content ahead of the version bump; otherwise they could serve the old
+    # body under the new ETag
+    replicate('settings', settings)
+    bump_version('settings')
+    alert_engine.set_ranges(settings.get('ranges'))
+    retention = merge_retention(settings.get('retention'))
+    if retention != applied_retention[0]:
+        applied_retention[0] = retention
+        compaction_wakeup.set()  # apply a new retention policy now, not at the next interval
+
+settings_store.subscribe(on_settings_changed)
 
 @app.route('/settings/ranges', methods=['GET'])
+@conditional_get('settings')
 def get_ranges():
     """Get safe ranges for sensors"""
-    settings = load_settings()
-    return jsonify({"ranges": settings.get('ranges', {})})
+    return jsonify({"ranges": settings_store.get().get('ranges', {})})
 
 @app.route('/settings/ranges', methods=['POST'])
 def update_ranges():
     """Update safe ranges for sensors"""
     data = request.get_json()
-    settings = load_settings()
-    settings['ranges'] = data.get('ranges', {})
-    save_settings(settings)
+    settings = settings_store.update(ranges=data.get('ranges', {}))
     return jsonify({"message": "Ranges saved successfully", "ranges": settings['ranges']})
 
+@app.route('/settings/retention', methods=['GET'])
+@conditional_get('settings')
+def get_retention():
+    """Get data retention policy (days per data set, null keeps forever)"""
+    return jsonify({"retention": merge_retention(settings_store.get().get('retention'))})
+
+@app.route('/settings/retention', methods=['POST'])
+def update_retention():
+    """Update data retention policy used by the compaction worker"""
+    data = request.get_json()
+    try:
+        retention = merge_retention(data.get('retention', {}))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Retention values must be whole days or null'}), 400
+    if any(days is not None and days < 1 for days in retention.values()):
+        return jsonify({'error': 'Retention values must be at least 1 day'}), 400
+
+    settings_store.update(retention=retention)
+    return jsonify({"message": "Retention saved successfully", "retention": retention})
+
 @app.route('/settings/clear-data', methods=['POST'])
 def clear_data():
     """Clear sensor readings and historical data from the database"""
@@ -1386,9 +2161,15 @@ def clear_data():
     try:
         db.execute('DELETE FROM sensor_readings')
         db.execute('DELETE FROM room_sensors')
+        db.execute('DELETE FROM sensor_rollups')
         db.execute('DELETE FROM camera_images')
         db.execute('DELETE FROM camera_status')
         db.commit()
+        with latest_state_lock:
+            latest_sensors.clear()
+            latest_rooms.clear()
+        replicate('clear_latest', ('sensors', 'rooms'))
+        bump_version('sensors', 'rooms', 'cameras')
         return jsonify({"message": "Database cleared successfully"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1406,94 +2187,550 @@ def handle_disconnect():
 @socketio.on('join_unit')
 def handle_join_unit(data):
     unit_id = data['unit_id']
-    join_room(unit_id)
+    join_room(f'unit:{unit_id}')
     emit('joined', {'unit_id': unit_id})
 
 @socketio.on('leave_unit')
 def handle_leave_unit(data):
     unit_id = data['unit_id']
-    leave_room(unit_id)
+    leave_room(f'unit:{unit_id}')
     emit('left', {'unit_id': unit_id})
 
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """Join push topics - see the push channel notes for the names"""
+    topics = [topic for topic in (data or {}).get('topics', [])[:MAX_SUBSCRIPTION_TOPICS]
+              if valid_topic(topic)]
+    for topic in topics:
+        join_room(topic)
+    emit('subscribed', {'topics': topics})
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    topics = [topic for topic in (data or {}).get('topics', [])[:MAX_SUBSCRIPTION_TOPICS]
+              if valid_topic(topic)]
+    for topic in topics:
+        leave_room(topic)
+    emit('unsubscribed', {'topics': topics})
+
+
+def save_camera_batch(db, batch):
+    """Insert a batch of uploads and fold them into camera_status (caller commits)
+
+    Returns (latest, derivatives): the newest upload per camera and the
+    derivative jobs for the new rows.
+    """
+    latest = {}  # camera_id -> newest upload in this batch
+    counts = {}  # camera_id -> uploads in this batch
+    derivatives = []
+
+    for upload_data in batch:
+        cursor = db.execute('''
+            INSERT INTO camera_images
+            (camera_id, unit_id, level, position, image_path, timestamp, file_size)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (upload_data['camera_id'], upload_data['unit_id'], upload_data['level'],
+              upload_data['position'], upload_data['filepath'], upload_data['timestamp'],
+              upload_data['file_size']))
+        derivatives.append({'image_id': cursor.lastrowid, 'filepath': upload_data['filepath']})
+
+        camera_id = upload_data['camera_id']
+        counts[camera_id] = counts.get(camera_id, 0) + 1
+        if camera_id not in latest or upload_data['timestamp'] >= latest[camera_id]['timestamp']:
+            latest[camera_id] = dict(upload_data, image_id=cursor.lastrowid)
+
+    # The latest-image pointer only moves forward; replayed or recovered
+    # uploads older than the current one leave it alone
+    db.executemany('''
+        INSERT INTO camera_status (camera_id, unit_id, last_image_timestamp, total_images, status, updated_at,
+                                   last_image_id, last_image_path, level, position)
+        VALUES (?, ?, ?, ?, 'online', CURRENT_TIMESTAMP, ?, ?, ?, ?)
+        ON CONFLICT(camera_id) DO UPDATE SET
+            last_image_timestamp = MAX(COALESCE(last_image_timestamp, 0), excluded.last_image_timestamp),
+            total_images = total_images + excluded.total_images,
+            status = 'online',
+            updated_at = CURRENT_TIMESTAMP,
+            last_image_id = CASE WHEN last_image_id IS NULL OR excluded.last_image_timestamp >= last_image_timestamp
+                                 THEN excluded.last_image_id ELSE last_image_id END,
+            last_image_path = CASE WHEN last_image_id IS NULL OR excluded.last_image_timestamp >= last_image_timestamp
+                                   THEN excluded.last_image_path ELSE last_image_path END,
+            level = excluded.level,
+            position = excluded.position
+    ''', [(camera_id, upload_data['unit_id'], upload_data['timestamp'], counts[camera_id],
+           upload_data['image_id'], upload_data['filepath'], upload_data['level'], upload_data['position'])
+          for camera_id, upload_data in latest.items()])
+
+    return latest, derivatives
+
+def announce_camera_batch(latest, derivatives):
+    """Queue derivatives for a committed batch and emit one event per camera"""
+    if image_storage.Image is not None:
+        for job in derivatives:
+            derivative_queue.put(job)
+
+    bump_version(*{f"cameras:{upload_data['unit_id']}" for upload_data in latest.values()})
+
+    # One event per camera, carrying its newest image
+    for camera_id, upload_data in latest.items():
+        mark_device_seen('camera', camera_id, upload_data['timestamp'])
+        push_update('camera_image_uploaded', camera_id, {
+            'camera_id': camera_id,
+            'unit_id': upload_data['unit_id'],
+            'level': upload_data['level'],
+            'position': upload_data['position'],
+            'timestamp': upload_data['timestamp'],
+            'image_url': image_url(upload_data['filepath'])
+        }, [f"cameras:{upload_data['unit_id']}", 'cameras'])
 
 def camera_upload_worker(worker_id):
-    """Background worker to process camera upload queue - handles DB writes sequentially"""
+    """Background worker to process camera upload queue - writes uploads in batches"""
     print(f"Camera upload worker {worker_id} started")
 
     while True:
         try:
-            upload_data = camera_upload_queue.get()
-
-            if upload_data is None:
+            batch = [camera_upload_queue.get()]
+            if batch[0] is None:
+                camera_upload_queue.task_done()
                 break
+            while len(batch) < CAMERA_BATCH_SIZE:
+                try:
+                    upload_data = camera_upload_queue.get_nowait()
+                except Empty:
+                    break
+                if upload_data is None:
+                    camera_upload_queue.task_done()
+                    camera_upload_queue.put(None)  # leave the stop signal for this worker's next loop
+                    break
+                batch.append(upload_data)
 
             db = get_db_direct()
 
             try:
-                camera_id = upload_data['camera_id']
-                unit_id = upload_data['unit_id']
-                level = upload_data['level']
-                position = upload_data['position']
-                filepath = upload_data['filepath']
-                timestamp = upload_data['timestamp']
-                file_size = upload_data['file_size']
-
-                db.execute('''
-                    INSERT INTO camera_images
-                    (camera_id, unit_id, level, position, image_path, timestamp, file_size)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (camera_id, unit_id, level, position, filepath, timestamp, file_size))
-
-                db.execute('''
-                    INSERT INTO camera_status (camera_id, unit_id, last_image_timestamp, total_images, status, updated_at)
-                    VALUES (?, ?, ?, 1, 'online', CURRENT_TIMESTAMP)
-                    ON CONFLICT(camera_id) DO UPDATE SET
-                        last_image_timestamp = excluded.last_image_timestamp,
-                        total_images = total_images + 1,
-                        status = 'online',
-                        updated_at = CURRENT_TIMESTAMP
-                ''', (camera_id, unit_id, timestamp))
-
+                latest, derivatives = save_camera_batch(db, batch)
                 db.commit()
-                print(f"Worker {worker_id}: Saved camera {camera_id} image to DB")
+                print(f"Worker {worker_id}: Saved {len(batch)} camera images to DB")
+
+                # Rows are durable now; a failed batch stays journaled for replay on restart
+                segments = {}
+                for upload_data in batch:
+                    segment = upload_data.get('journal_segment')
+                    if segment is not None:
+                        segments[segment] = segments.get(segment, 0) + 1
+                for segment, count in segments.items():
+                    camera_journal.committed(segment, count)
 
-                socketio.emit('camera_image_uploaded', {
-                    'camera_id': camera_id,
-                    'unit_id': unit_id,
-                    'level': level,
-                    'position': position,
-                    'timestamp': timestamp,
-                    'image_url': f'/camera_images/{os.path.basename(filepath)}'
-                })
+                announce_camera_batch(latest, derivatives)
 
             except Exception as e:
-                print(f"Worker {worker_id}: Error saving to DB: {e}")
+                print(f"Worker {worker_id}: Error saving batch of {len(batch)} to DB: {e}")
                 db.rollback()
             finally:
                 db.close()
-                camera_upload_queue.task_done()
+                for _ in batch:
+                    camera_upload_queue.task_done()
 
         except Exception as e:
             print(f"Worker {worker_id}: Queue error: {e}")
 
 
-# Initialize database when module loads
-init_db()
+def derivative_worker():
+    """Background worker - renders thumbnails in a process pool and records them in batches"""
+    print(f"Derivative worker started ({DERIVATIVE_WORKERS} processes)")
+    pool = ProcessPoolExecutor(max_workers=DERIVATIVE_WORKERS)
+    db = get_db_direct()
+
+    while True:
+        jobs = [derivative_queue.get()]
+        while len(jobs) < DERIVATIVE_BATCH_SIZE:
+            try:
+                jobs.append(derivative_queue.get_nowait())
+            except Empty:
+                break
+
+        try:
+            futures = [(job, pool.submit(image_storage.make_derivatives, job['filepath'])) for job in jobs]
+        except BrokenProcessPool as e:
+            # A child died mid-render; start a fresh pool and drop this batch
+            print(f"Derivative worker: Process pool broke, restarting it: {e}")
+            pool.shutdown(wait=False)
+            pool = ProcessPoolExecutor(max_workers=DERIVATIVE_WORKERS)
+            continue
+        except RuntimeError:
+            return  # interpreter is shutting down
+        updates = []
+        for job, future in futures:
+            try:
+                paths = future.result(timeout=60)
+            except Exception as e:
+                print(f"Derivative worker: Error rendering {job['filepath']}: {e}")
+                continue
+            updates.append((paths.get('thumb'), paths.get('medium'), job['image_id']))
+
+        if updates:
+            try:
+                db.executemany('''
+                    UPDATE camera_images SET thumb_path = ?, medium_path = ? WHERE id = ?
+                ''', updates)
+                db.commit()
+                bump_version('cameras')
+            except Exception as e:
+                print(f"Derivative worker: Error saving to DB: {e}")
+                db.rollback()
+
+
+def push_flusher():
+    """Background worker - sends the coalesced Socket.IO pushes"""
+    while True:
+        time.sleep(PUSH_COALESCE_INTERVAL)
+        try:
+            flush_pushes()
+        except Exception as e:
+            print(f"Push flusher error: {e}")
 
-# Start camera upload queue workers (runs on import, needed for gunicorn)
+
+def status_sweeper():
+    """Background worker - flips stale devices offline and pushes status changes"""
+    print(f"Status sweeper started (every {STATUS_SWEEP_INTERVAL}s)")
+
+    while True:
+        time.sleep(STATUS_SWEEP_INTERVAL)
+        try:
+            changes = sweep_device_status()
+            if not changes:
+                continue
+
+            cameras = [(change['status'], change['device_id'])
+                       for change in changes if change['kind'] == 'camera']
+            if cameras:
+                db = get_db_direct()
+                try:
+                    db.executemany('''
+                        UPDATE camera_status SET status = ?, updated_at = CURRENT_TIMESTAMP
+                        WHERE camera_id = ?
+                    ''', cameras)
+                    db.commit()
+                finally:
+                    db.close()
+                bump_version('cameras')
+
+            socketio.emit('device_status', {'timestamp': int(time.time()), 'changes': changes}, to='devices')
+            print(f"Status sweeper: {len(changes)} device(s) changed status")
+        except Exception as e:
+            print(f"Status sweeper error: {e}")
+
+
+def compaction_worker():
+    """Background worker - applies the retention policy every COMPACTION_INTERVAL seconds
+
+    A saved retention change wakes it early so the new policy applies at once.
+    """
+    print(f"Compaction worker started (every {COMPACTION_INTERVAL}s)")
+    db = get_db_direct(readonly=True)
+    try:
+        if not incremental_vacuum_enabled(db):
+            print("Compaction: incremental auto-vacuum is off, freed space stays in the file; "
+                  f"run 'python compaction.py vacuum {DATABASE}' while the backend is stopped")
+    finally:
+        db.close()
+
+    while True:
+        compaction_wakeup.wait(COMPACTION_INTERVAL)
+        compaction_wakeup.clear()
+        db = get_db_direct()
+        try:
+            policy = merge_retention(settings_store.get().get('retention'))
+            results = run_compaction(db, policy, lambda path: os.path.join(app.root_path, path))
+            if results.get('camera_images'):
+                bump_version('cameras')
+        except Exception as e:
+            print(f"Compaction error: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+
+def save_camera_uploads(db, uploads):
+    """Write an iterable of uploads CAMERA_BATCH_SIZE at a time; returns the count"""
+    saved = 0
+    batch = []
+    for upload_data in uploads:
+        batch.append(upload_data)
+        if len(batch) >= CAMERA_BATCH_SIZE:
+            announce_camera_batch(*save_camera_batch(db, batch))
+            db.commit()
+            saved += len(batch)
+            batch = []
+    if batch:
+        announce_camera_batch(*save_camera_batch(db, batch))
+        db.commit()
+        saved += len(batch)
+    return saved
+
+def recover_camera_uploads(db, started_at):
+    """Replay the upload journal, then index image files that never got a row"""
+    def unsaved_journal_entries():
+        for upload_data in camera_journal.replay():
+            if not os.path.exists(upload_data['filepath']):
+                continue  # refused upload, or already expired
+            if db.execute('''
+                SELECT 1 FROM camera_images WHERE camera_id = ? AND timestamp = ? AND image_path = ?
+            ''', (upload_data['camera_id'], upload_data['timestamp'], upload_data['filepath'])).fetchone():
+                continue  # committed before the restart
+            yield upload_data
+
+    replayed = save_camera_uploads(db, unsaved_journal_entries())
+    camera_journal.discard_replayed()
+    if replayed:
+        print(f"Camera journal: replayed {replayed} uploads")
+
+    def orphan_uploads(found):
+        for path, camera_id, timestamp, file_size in found:
+            try:
+                unit_id, level, position = parse_camera_id(camera_id)
+            except (ValueError, IndexError):
+                continue
+            yield {
+                'camera_id': camera_id,
+                'unit_id': unit_id,
+                'level': level,
+                'position': position,
+                'filepath': path,
+                'timestamp': timestamp,
+                'file_size': file_size
+            }
+
+    # Move flat-layout images into shards (indexing any that never got a
+    # row) before looking for orphans
+    moved = image_storage.migrate_flat_images(
+        db, UPLOAD_FOLDER, unit_of=lambda camera_id: parse_camera_id(camera_id)[0],
+        extensions=ALLOWED_EXTENSIONS, save_orphans=lambda found: save_camera_uploads(db, orphan_uploads(found)))
+    if moved:
+        print(f"Image storage: moved {moved} images into shards")
+
+    indexed = save_camera_uploads(db, orphan_uploads(image_storage.find_orphan_images(
+        db, UPLOAD_FOLDER, started_at, ALLOWED_EXTENSIONS)))
+    if indexed:
+        print(f"Image storage: indexed {indexed} orphaned images")
+
+def camera_recovery_worker(started_at):
+    """One-shot background job - recovers camera uploads lost by a restart"""
+    db = get_db_direct()
+    try:
+        recover_camera_uploads(db, started_at)
+    except Exception as e:
+        print(f"Camera upload recovery error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+# Multi-process mode
+# The writer publishes every write-through to its in-memory state on the
+# bus 'state' channel and web workers apply it to their own copies. A web
+# worker says 'hello' whenever it (re)connects and the writer answers with
+# a full snapshot, so late starters and reconnects catch up.
+LATEST_CACHES = {'sensors': latest_sensors, 'relays': latest_relays, 'rooms': latest_rooms}
+
+def replicate(kind, data):
+    if APP_ROLE == 'writer':
+        bus.publish('state', (kind, data))
+
+def state_snapshot():
+    with latest_state_lock:
+        latest = {name: dict(cache) for name, cache in LATEST_CACHES.items()}
+    with version_lock:
+        versions = (version_epoch[0], version_seq[0], dict(state_versions))
+    with device_lock:
+        devices = dict(device_last_seen)
+    return {
+        'latest': latest,
+        'versions': versions,
+        'schedules': {unit_id: compiled.schedule for unit_id, compiled in list(compiled_schedules.items())},
+        'devices': devices,
+        'alerts': alert_engine.active(),
+        'settings': settings_store.get()
+    }
+
+def apply_snapshot(snapshot):
+    with latest_state_lock:
+        for name, cache in LATEST_CACHES.items():
+            cache.clear()
+            cache.update(snapshot['latest'][name])
+    schedules = {unit_id: CompiledSchedule(schedule) for unit_id, schedule in snapshot['schedules'].items()}
+    compiled_schedules.clear()
+    compiled_schedules.update(schedules)
+    with device_lock:
+        device_last_seen.clear()
+        device_last_seen.update(snapshot['devices'])
+    alert_engine.apply([('open', alert) for alert in snapshot['alerts']], reset=True)
+    settings_store.apply(snapshot['settings'])
+    epoch, seq, versions = snapshot['versions']
+    with version_lock:
+        version_epoch[0] = epoch
+        version_seq[0] = seq
+        state_versions.clear()
+        state_versions.update(versions)
+        version_changed.notify_all()
+    print(f"State snapshot applied: {len(versions)} versions, {len(schedules)} schedules")
+
+def apply_state(message):
+    """Web workers: mirror one change published by the writer"""
+    kind, data = message
+    if kind == 'latest':
+        name, unit_id, payload = data
+        with latest_state_lock:
+            LATEST_CACHES[name][unit_id] = payload
+    elif kind == 'clear_latest':
+        with latest_state_lock:
+            for name in data:
+                LATEST_CACHES[name].clear()
+    elif kind == 'schedule':
+        unit_id, schedule = data
+        compiled_schedules[unit_id] = CompiledSchedule(schedule)
+    elif kind == 'device_seen':
+        key, timestamp = data
+        with device_lock:
+            if timestamp > device_last_seen.get(key, 0):
+                device_last_seen[key] = timestamp
+    elif kind == 'alerts':
+        alert_engine.apply(data)
+    elif kind == 'settings':
+        settings_store.apply(data)
+    elif kind == 'versions':
+        seq, keys, now = data
+        with version_lock:
+            set_versions(seq, keys, now)
+    elif kind == 'snapshot':
+        apply_snapshot(data)
+
+# Writes that reach a web worker (nginx normally routes them to the writer
+# directly) are sent to the writer as a 'write' message, run through the
+# Flask app there, and answered with a 'write_result' for the waiting worker.
+write_ids = itertools.count(1)
+pending_writes = {}  # request id -> [threading.Event, (status, headers, body)]
+
+def forward_write():
+    request_id = f"{os.getpid()}-{next(write_ids)}"
+    slot = pending_writes[request_id] = [threading.Event(), None]
+    try:
+        bus.publish('write', {
+            'id': request_id,
+            'method': request.method,
+            'path': request.path,
+            'query_string': request.query_string.decode('latin-1'),
+            'headers': [(k, v) for k, v in request.headers.items() if k.lower() != 'content-length'],
+            'remote_addr': request.remote_addr,
+            'body': request.get_data()
+        })
+        if not slot[0].wait(WRITE_FORWARD_TIMEOUT):
+            response = jsonify({'error': 'Writer unavailable, retry later'})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(ANALYTICS_RETRY_AFTER)
+            return response
+    finally:
+        pending_writes.pop(request_id, None)
+    status, headers, body = slot[1]
+    return Response(body, status=status, headers=headers)
+
+def write_result_received(result):
+    slot = pending_writes.get(result['id'])
+    if slot is not None:
+        slot[1] = (result['status'], result['headers'], result['body'])
+        slot[0].set()
+
+def run_forwarded_write(message):
+    """Writer: handle a forwarded write like any request and publish the response"""
+    try:
+        environ = EnvironBuilder(path=message['path'], method=message['method'],
+                                 query_string=message['query_string'], headers=message['headers'],
+                                 data=message['body'],
+                                 environ_overrides={'REMOTE_ADDR': message['remote_addr'] or ''}).get_environ()
+        app_iter, status, headers = run_wsgi_app(app, environ, buffered=True)
+        try:
+            body = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        result = (int(status.split()[0]),
+                  [(k, v) for k, v in headers.items() if k.lower() != 'content-length'], body)
+    except Exception as e:
+        print(f"Forwarded write {message['method']} {message['path']} failed: {e}")
+        result = (500, [('Content-Type', 'application/json')], json.dumps({'error': str(e)}).encode())
+    bus.publish('write_result', {'id': message['id'], 'status': result[0], 'headers': result[1], 'body': result[2]})
+
+def write_received(message):
+    # Strict ingest can wait seconds for its commit, so never block the bus reader
+    thread = threading.Thread(target=run_forwarded_write, args=(message,))
+    thread.daemon = True
+    thread.start()
+
+def start_bus():
+    if APP_ROLE == 'writer':
+        BusBroker(BUS_SOCKET).start()
+        bus.subscribe('hello', lambda pid: replicate('snapshot', state_snapshot()))
+        bus.subscribe('write', write_received)
+    else:
+        bus.subscribe('state', apply_state)
+        bus.subscribe('write_result', write_result_received)
+        bus.on_connect = lambda: bus.publish('hello', os.getpid())
+    bus.start()
+    print(f"State bus started ({APP_ROLE})")
+
+
+# Initialize database when module loads (web workers leave the schema to the writer)
+if APP_ROLE != 'web':
+    init_db()
+load_latest_state()
+load_device_state()
+load_alerts()
+load_schedules()
+
+# Start camera upload workers and the ingest writer (runs on import, needed for gunicorn)
 _workers_started = False
-def start_camera_workers():
+def start_background_workers():
     global _workers_started
     if _workers_started:
         return
     _workers_started = True
+    started_at = time.time()  # files written after this are journaled uploads, not orphans
     for i in range(QUEUE_WORKER_COUNT):
         worker_thread = threading.Thread(target=camera_upload_worker, args=(i,))
         worker_thread.daemon = True
         worker_thread.start()
     print(f"Started {QUEUE_WORKER_COUNT} camera upload workers")
 
-start_camera_workers()
+    writer_thread = threading.Thread(target=ingest_writer)
+    writer_thread.daemon = True
+    writer_thread.start()
+
+    if image_storage.Image is not None:
+        derivative_thread = threading.Thread(target=derivative_worker)
+        derivative_thread.daemon = True
+        derivative_thread.start()
+    else:
+        print("Pillow not installed - camera thumbnails disabled")
+
+    recovery_thread = threading.Thread(target=camera_recovery_worker, args=(started_at,))
+    recovery_thread.daemon = True
+    recovery_thread.start()
+
+    if PUSH_COALESCE_INTERVAL > 0:
+        push_thread = threading.Thread(target=push_flusher)
+        push_thread.daemon = True
+        push_thread.start()
+
+    sweeper_thread = threading.Thread(target=status_sweeper)
+    sweeper_thread.daemon = True
+    sweeper_thread.start()
+
+    if COMPACTION_INTERVAL > 0:
+        compaction_thread = threading.Thread(target=compaction_worker)
+        compaction_thread.daemon = True
+        compaction_thread.start()
+
+if APP_ROLE != 'web':
+    start_background_workers()
+if bus:
+    start_bus()
 
 if __name__ == '__main__':
     # Run Flask app with SocketIO
@@ -0,0 +1,201 @@
+# Retention and downsampling compaction for the Hydroponics Monitoring System
+#
+# Raw readings are already folded into sensor_rollups on ingest, so aging
+# data out is a matter of deleting raw rows (and fine-grained rollups) past
+# their retention window. Deletes run in small transactions with a short
+# pause between them so the ingest writer keeps getting the write lock.
+import os
+import sqlite3
+import sys
+import time
+
+# Retention in days per data set; None keeps data forever
+DEFAULT_RETENTION = {
+    'sensor_readings': 14,
+    'room_sensors': 14,
+    'relay_states': 90,
+    'camera_images': None,
+    'rollup_1m': 30,
+    'rollup_5m': 365,
+    'rollup_1h': 730,
+    'rollup_1d': None,
+}
+
+ROLLUP_KEYS = {
+    'rollup_1m': 60,
+    'rollup_5m': 300,
+    'rollup_1h': 3600,
+    'rollup_1d': 86400,
+}
+
+DELETE_CHUNK_SIZE = 500
+ROLLUP_BUCKET_CHUNK = 10  # Buckets (across all units and metrics) per rollup delete
+DELETE_PAUSE = 0.05  # Seconds to yield the write lock between chunks
+VACUUM_PAGES = 2000  # Free pages returned to the OS per run
+INLINE_VACUUM_MAX_PAGES = 2560  # Databases up to this size (~10 MB) are vacuumed during migration
+
+
+def merge_retention(settings_retention):
+    """Overlay user retention settings on the defaults"""
+    policy = dict(DEFAULT_RETENTION)
+    for key, days in (settings_retention or {}).items():
+        if key in policy:
+            policy[key] = None if days in (None, '', 0) else int(days)
+    return policy
+
+
+def _delete_in_chunks(db, table, where, params):
+    """Delete matching rows DELETE_CHUNK_SIZE at a time; returns rows deleted"""
+    deleted = 0
+    while True:
+        cursor = db.execute(f'''
+            DELETE FROM {table} WHERE rowid IN (
+                SELECT rowid FROM {table} WHERE {where} LIMIT ?
+            )
+        ''', (*params, DELETE_CHUNK_SIZE))
+        db.commit()
+        deleted += cursor.rowcount
+        if cursor.rowcount < DELETE_CHUNK_SIZE:
+            return deleted
+        time.sleep(DELETE_PAUSE)
+
+
+def _expire_raw(db, table, cutoff):
+    # The newest row per unit is kept regardless of age so the latest-state
+    # cache can still be rebuilt for a unit that stopped reporting
+    keep = [row[0] for row in db.execute(f'''
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY unit_id ORDER BY timestamp DESC, id DESC
+            ) AS rn FROM {table}
+        ) WHERE rn = 1
+    ''')]
+    where = 'timestamp < ?'
+    if keep:
+        where += f" AND id NOT IN ({', '.join('?' * len(keep))})"
+    return _delete_in_chunks(db, table, where, (cutoff, *keep))
+
+
+def _expire_rollups(db, resolution, cutoff):
+    # sensor_rollups is WITHOUT ROWID, so chunk on a few buckets at a time
+    deleted = 0
+    while True:
+        cursor = db.execute('''
+            DELETE FROM sensor_rollups
+            WHERE resolution = ? AND bucket IN (
+                SELECT DISTINCT bucket FROM sensor_rollups
+                WHERE resolution = ? AND bucket < ?
+                ORDER BY bucket LIMIT ?
+            )
+        ''', (resolution, resolution, cutoff, ROLLUP_BUCKET_CHUNK))
+        db.commit()
+        deleted += cursor.rowcount
+        if cursor.rowcount == 0:
+            return deleted
+        time.sleep(DELETE_PAUSE)
+
+
+def _expire_images(db, cutoff, resolve_path, log):
+    deleted = 0
+    while True:
+        rows = db.execute('''
+            SELECT id, image_path, thumb_path, medium_path FROM camera_images
+            WHERE timestamp < ?
+            ORDER BY timestamp LIMIT ?
+        ''', (cutoff, DELETE_CHUNK_SIZE)).fetchall()
+        if not rows:
+            return deleted
+        ids = [(row[0],) for row in rows]
+        db.executemany('DELETE FROM camera_images WHERE id = ?', ids)
+        # A camera whose every frame expired no longer has a latest image
+        db.executemany('''
+            UPDATE camera_status SET last_image_id = NULL, last_image_path = NULL
+            WHERE last_image_id = ?
+        ''', ids)
+        db.commit()
+        for row in rows:
+            path = resolve_path(row[1])
+            for stored in row[1:]:
+                if not stored:
+                    continue
+                try:
+                    os.remove(resolve_path(stored))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    log(f"Compaction: could not remove {stored}: {e}")
+            # Drop the camera-day shard once its last image is gone
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+        deleted += len(rows)
+        time.sleep(DELETE_PAUSE)
+
+
+def run_compaction(db, policy, resolve_path, log=print):
+    """Apply the retention policy once; returns {data set: rows deleted}"""
+    now = int(time.time())
+    started = time.time()
+    results = {}
+
+    for table in ('sensor_readings', 'room_sensors', 'relay_states'):
+        if policy.get(table):
+            results[table] = _expire_raw(db, table, now - policy[table] * 86400)
+
+    for key, resolution in ROLLUP_KEYS.items():
+        if policy.get(key):
+            results[key] = _expire_rollups(db, resolution, now - policy[key] * 86400)
+
+    if policy.get('camera_images'):
+        results['camera_images'] = _expire_images(
+            db, now - policy['camera_images'] * 86400, resolve_path, log)
+
+    # Hand freed pages back to the filesystem and keep the WAL from growing
+    db.execute(f'PRAGMA incremental_vacuum({VACUUM_PAGES})').fetchall()
+    db.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+
+    total = sum(results.values())
+    if total:
+        log(f"Compaction: removed {total} rows in {time.time() - started:.1f}s {results}")
+    return results
+
+
+def incremental_vacuum_enabled(db):
+    return db.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+
+
+def enable_incremental_vacuum(db, log=print):
+    """Switch the database to auto_vacuum=INCREMENTAL (needs a full VACUUM once)"""
+    if incremental_vacuum_enabled(db):
+        return
+    log("  enabling incremental auto-vacuum (running VACUUM, this can take a while)")
+    started = time.time()
+    db.commit()
+    db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    db.execute('VACUUM')
+    log(f"  VACUUM done in {time.time() - started:.1f}s")
+
+
+def enable_incremental_vacuum_if_small(db, log=print):
+    """Migration step: VACUUM fresh, small databases now; larger ones are left to
+    the offline "python compaction.py vacuum" command so startup never blocks on it"""
+    if incremental_vacuum_enabled(db):
+        return
+    if db.execute('PRAGMA page_count').fetchone()[0] <= INLINE_VACUUM_MAX_PAGES:
+        enable_incremental_vacuum(db, log)
+    else:
+        log("  skipping incremental auto-vacuum: run 'python compaction.py vacuum <db>' "
+            "offline (needs free disk space equal to the database size)")
+
+
+if __name__ == '__main__':
+    # python compaction.py vacuum [path] - one-off VACUUM into incremental auto-vacuum
+    if len(sys.argv) < 2 or sys.argv[1] != 'vacuum':
+        sys.exit("usage: python compaction.py vacuum [path]")
+    path = sys.argv[2] if len(sys.argv) > 2 else 'hydroponics.db'
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        enable_incremental_vacuum(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,137 @@
+# Reusable SQLite connections
+#
+# Every request and background job used to sqlite3.connect() and close,
+# paying connection setup and starting from a cold page cache each time.
+# ConnectionPool keeps idle connections on a LIFO stack (the most recently
+# used one has the warmest cache) and applies the tuning pragmas once, when
+# a connection is created. Pooled connections are PooledConnection objects
+# whose close() hands them back to the pool, so existing
+# "db = ...; try: ... finally: db.close()" code works unchanged.
+#
+# Two roles share the database file:
+#   reader  opened with mode=ro and query_only, for GET handlers and exports
+#   writer  read/write, for POST handlers and background workers
+# Connections are created with check_same_thread=False so they can move
+# between worker threads and eventlet greenlets.
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+
+DEFAULT_PRAGMAS = {
+    'cache_size': -16384,        # KiB (negative) of page cache per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 30000,       # ms to wait on a locked database
+}
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """No connection became free within the pool's timeout"""
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() returns it to its pool"""
+    pool = None
+    _released = False  # set while idle in the pool; a second close() is a no-op
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+
+class ConnectionPool:
+    """Bounded pool of tuned connections for one role ('reader' or 'writer')"""
+
+    def __init__(self, path, role='writer', max_size=8, timeout=30, pragmas=None):
+        self.path = path
+        self.role = role
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        self._idle = []  # LIFO stack of idle connections
+        self._cond = threading.Condition()
+        self._open = 0   # connections created and not yet closed
+        self._stats = {'created': 0, 'acquired': 0, 'waits': 0, 'wait_ms': 0.0, 'timeouts': 0, 'discarded': 0}
+
+    def _connect(self):
+        if self.role == 'reader':
+            uri = 'file:' + quote(os.path.abspath(self.path)) + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, timeout=self.timeout,
+                                   check_same_thread=False, factory=PooledConnection)
+        else:
+            conn = sqlite3.connect(self.path, timeout=self.timeout,
+                                   check_same_thread=False, factory=PooledConnection)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name}={value}')
+        if self.role == 'reader':
+            conn.execute('PRAGMA query_only=1')
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        """Take an idle connection, open a new one, or wait for one to be released"""
+        started = None
+        with self._cond:
+            while not self._idle and self._open >= self.max_size:
+                if started is None:
+                    started = time.monotonic()
+                    self._stats['waits'] += 1
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No {self.role} connection free after {self.timeout}s")
+                self._cond.wait(remaining)
+            if started is not None:
+                self._stats['wait_ms'] += (time.monotonic() - started) * 1000
+            self._stats['acquired'] += 1
+            if self._idle:
+                conn = self._idle.pop()
+                conn._released = False
+                return conn
+            self._open += 1
+            self._stats['created'] += 1
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn):
+        """Return a connection; an open transaction is rolled back first"""
+        with self._cond:
+            if conn._released:
+                return  # already back in the pool (double close)
+            conn._released = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            sqlite3.Connection.close(conn)
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return dict(self._stats, role=self.role, max_size=self.max_size, open=self._open,
+                        idle=len(self._idle), in_use=self._open - len(self._idle),
+                        wait_ms=round(self._stats['wait_ms'], 1))
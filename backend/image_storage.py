@@ -0,0 +1,263 @@
+# Sharded camera image storage
+#
+# Frames are stored as UPLOAD_FOLDER/<unit_id>/<camera_id>/<YYYY-MM-DD>/<file>
+# so no directory grows past one camera-day of images. File names are unique
+# and never rewritten, which lets /camera_images/... be cached as immutable.
+#
+# Thumbnail and medium derivatives are written next to the original as
+# <name>.thumb.jpg and <name>.medium.jpg by make_derivatives(), which runs
+# in a worker process so decoding never happens on the request path.
+#
+# Move images from the old flat layout into shards with:
+#     python image_storage.py /app/data/hydroponics.db /app/camera_images
+# (the app also runs it at startup until it has completed once, which is
+# recorded by a .sharded marker in the upload folder). Flat files with no
+# camera_images row are moved too, but only the app can index them, so the
+# command leaves those and the marker to the app's next start. Old flat
+# URLs are mapped to their shard by flat_to_sharded().
+#
+# find_orphan_images() walks the most recent date shards for frames that
+# made it to disk but never got a camera_images row (e.g. the worker died
+# first); older shards are never rescanned.
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it clients get full-size images
+    Image = None
+
+MIGRATE_BATCH_SIZE = 500
+SHARDED_MARKER = '.sharded'  # in the upload folder once migrate_flat_images() has completed
+ORPHAN_SCAN_DAYS = 2  # Date shards (besides today's) checked for orphans at startup
+
+# Longest edge in pixels for each derivative
+DERIVATIVE_SIZES = {'thumb': 320, 'medium': 960}
+DERIVATIVE_QUALITY = 80
+
+
+def image_relpath(unit_id, camera_id, timestamp, filename):
+    """Path of an image relative to the upload folder"""
+    date_str = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d')
+    return f"{unit_id}/{camera_id}/{date_str}/{filename}"
+
+
+def image_url(upload_folder, image_path):
+    """Public /camera_images/ URL for a stored camera_images.image_path"""
+    relpath = os.path.relpath(image_path, upload_folder)
+    if relpath.startswith('..'):
+        relpath = os.path.basename(image_path)
+    return f"/camera_images/{relpath.replace(os.sep, '/')}"
+
+
+def derivative_path(image_path, kind):
+    root, _ = os.path.splitext(image_path)
+    return f"{root}.{kind}.jpg"
+
+
+def make_derivatives(image_path):
+    """Write every derivative of image_path; returns {kind: path}
+
+    Runs in a worker process. JPEG draft mode decodes straight at a reduced
+    scale, so a thumbnail never pays for a full-resolution decode.
+    """
+    results = {}
+    largest = max(DERIVATIVE_SIZES.values())
+    with Image.open(image_path) as original:
+        original.draft('RGB', (largest, largest))
+        image = original.convert('RGB')
+
+    for kind, size in sorted(DERIVATIVE_SIZES.items(), key=lambda item: -item[1]):
+        image.thumbnail((size, size))
+        path = derivative_path(image_path, kind)
+        temp_path = f"{path}.tmp"
+        image.save(temp_path, 'JPEG', quality=DERIVATIVE_QUALITY, optimize=True)
+        os.replace(temp_path, path)
+        results[kind] = path
+    return results
+
+
+def _parse_image_name(filename):
+    """(camera_id, timestamp) from <camera_id>_<timestamp>_<micros>.<ext>, or None"""
+    stem = os.path.splitext(filename)[0]
+    parts = stem.rsplit('_', 2)
+    if len(parts) != 3 or not parts[1].isdigit() or not parts[2].isdigit():
+        return None
+    return parts[0], int(parts[1])
+
+
+def flat_to_sharded(filename, unit_of):
+    """Shard path (relative to the upload folder) of an old flat-layout file, or None
+
+    unit_of maps a camera_id to its unit_id.
+    """
+    parsed = _parse_image_name(filename)
+    if parsed is None:
+        return None
+    camera_id, timestamp = parsed
+    try:
+        unit_id = unit_of(camera_id)
+    except (ValueError, IndexError):
+        return None
+    return image_relpath(unit_id, camera_id, timestamp, filename)
+
+
+def _subdirs(path):
+    try:
+        return sorted(entry.path for entry in os.scandir(path) if entry.is_dir())
+    except OSError:
+        return []
+
+
+def recent_shards(upload_folder, before, days=ORPHAN_SCAN_DAYS):
+    """<unit>/<camera>/<date> directories dated from `days` days before `before` on"""
+    cutoff = datetime.fromtimestamp(before - days * 86400).strftime('%Y-%m-%d')
+    for unit_dir in _subdirs(upload_folder):
+        for camera_dir in _subdirs(unit_dir):
+            for date_dir in _subdirs(camera_dir):
+                if os.path.basename(date_dir) >= cutoff:
+                    yield date_dir
+
+
+def find_orphan_images(db, upload_folder, before, extensions, days=ORPHAN_SCAN_DAYS):
+    """Yield (path, camera_id, timestamp, file_size) for image files with no row
+
+    Only the last `days` days of shards are walked, and only files modified
+    before `before` are considered, so frames whose upload is still queued
+    are not mistaken for orphans. Derivatives are skipped since they are
+    recorded on their original's row.
+    """
+    derivative_suffixes = tuple(f".{kind}.jpg" for kind in DERIVATIVE_SIZES)
+    for dirpath in recent_shards(upload_folder, before, days):
+        candidates = {}  # camera_id -> [(path, timestamp, size)]
+        for filename in sorted(os.listdir(dirpath)):
+            if filename.endswith(derivative_suffixes):
+                continue
+            if filename.rsplit('.', 1)[-1].lower() not in extensions:
+                continue
+            parsed = _parse_image_name(filename)
+            if parsed is None:
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if stat.st_mtime >= before:
+                continue
+            candidates.setdefault(parsed[0], []).append((path, parsed[1], stat.st_size))
+
+        # One indexed lookup per camera and directory instead of one per file
+        for camera_id, files in candidates.items():
+            timestamps = [timestamp for _, timestamp, _ in files]
+            known = {os.path.basename(row[0]) for row in db.execute('''
+                SELECT image_path FROM camera_images
+                WHERE camera_id = ? AND timestamp BETWEEN ? AND ?
+            ''', (camera_id, min(timestamps), max(timestamps)))}
+            for path, timestamp, size in files:
+                if os.path.basename(path) not in known:
+                    yield path, camera_id, timestamp, size
+
+
+def migrate_flat_images(db, upload_folder, log=print, unit_of=None, extensions=(), save_orphans=None):
+    """Move images still in the flat upload folder into shards and repoint their rows
+
+    Flat image files that never got a row are moved as well when unit_of
+    (camera_id -> unit_id) and save_orphans are given; save_orphans is
+    called with batches of (path, camera_id, timestamp, file_size) to index
+    them. Without it they stay put and the run is not marked complete.
+
+    Returns at once when a previous run completed (SHARDED_MARKER exists);
+    uploads have been written straight into shards since then.
+    """
+    marker = os.path.join(upload_folder, SHARDED_MARKER)
+    if os.path.exists(marker):
+        return 0
+    moved = 0
+    last_id = 0
+    while True:
+        rows = db.execute('''
+            SELECT id, camera_id, unit_id, timestamp, image_path
+            FROM camera_images
+            WHERE id > ?
+            ORDER BY id LIMIT ?
+        ''', (last_id, MIGRATE_BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        updates = []
+        for image_id, camera_id, unit_id, timestamp, image_path in rows:
+            if os.path.dirname(os.path.relpath(image_path, upload_folder)):
+                continue  # already sharded
+            filename = os.path.basename(image_path)
+            source = os.path.join(upload_folder, filename)
+            new_path = os.path.join(upload_folder, image_relpath(unit_id, camera_id, timestamp, filename))
+
+            if os.path.exists(source):
+                os.makedirs(os.path.dirname(new_path), exist_ok=True)
+                os.replace(source, new_path)
+            elif not os.path.exists(new_path):
+                continue  # file is gone; leave the row as it is
+            updates.append((new_path, image_id))
+
+        if updates:
+            db.executemany('UPDATE camera_images SET image_path = ? WHERE id = ?', updates)
+            db.commit()
+            moved += len(updates)
+            log(f"  moved {moved} images into shards")
+
+    if save_orphans is None:
+        log("  flat images without a row are left for the app to index")
+        return moved
+    moved += _migrate_flat_orphans(db, upload_folder, unit_of, extensions, save_orphans, log)
+
+    with open(marker, 'w') as f:
+        f.write(f"{datetime.now().isoformat()} moved {moved}\n")
+    return moved
+
+
+def _migrate_flat_orphans(db, upload_folder, unit_of, extensions, save_orphans, log):
+    """Index flat image files left after the row pass, then move them into shards
+
+    Rows are saved before the files move, so after a crash in between the
+    next run finds the row and only moves the file.
+    """
+    candidates = []  # (source, new_path, camera_id, timestamp, file_size)
+    for filename in sorted(os.listdir(upload_folder)):
+        source = os.path.join(upload_folder, filename)
+        if filename.rsplit('.', 1)[-1].lower() not in extensions or not os.path.isfile(source):
+            continue
+        relpath = flat_to_sharded(filename, unit_of)  # None for derivatives too
+        if relpath is None:
+            continue
+        camera_id, timestamp = _parse_image_name(filename)
+        candidates.append((source, os.path.join(upload_folder, relpath), camera_id, timestamp,
+                           os.path.getsize(source)))
+
+    moved = 0
+    for start in range(0, len(candidates), MIGRATE_BATCH_SIZE):
+        batch = candidates[start:start + MIGRATE_BATCH_SIZE]
+        save_orphans([(new_path, camera_id, timestamp, size)
+                      for _, new_path, camera_id, timestamp, size in batch
+                      if not db.execute('''
+                          SELECT 1 FROM camera_images WHERE camera_id = ? AND timestamp = ? AND image_path = ?
+                      ''', (camera_id, timestamp, new_path)).fetchone()])
+        for source, new_path, _, _, _ in batch:
+            os.makedirs(os.path.dirname(new_path), exist_ok=True)
+            os.replace(source, new_path)
+        moved += len(batch)
+        log(f"  moved and indexed {moved} images without a row")
+    return moved
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else 'hydroponics.db'
+    folder = sys.argv[2] if len(sys.argv) > 2 else 'camera_images'
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        print(f"Moved {migrate_flat_images(conn, folder)} images")
+    finally:
+        conn.close()
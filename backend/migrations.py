@@ -0,0 +1,174 @@
+# Versioned schema migrations for the Hydroponics Monitoring System
+#
+# Each migration runs once and is recorded in the schema_migrations table.
+# Index builds run one per transaction so device writes can get the write
+# lock in between, and long builds print progress while they run.
+#
+# Run ahead of a deploy against a production database with:
+#     python migrations.py /app/data/hydroponics.db
+import sqlite3
+import sys
+import time
+
+from rollups import create_rollup_table, backfill_rollups, backfill_ac_temp_rollups
+from compaction import enable_incremental_vacuum_if_small
+from alerts import create_alerts_table
+
+# How often (in SQLite VM steps) the progress handler is invoked
+PROGRESS_STEPS = 100000
+# Minimum seconds between progress lines during a long statement
+PROGRESS_INTERVAL = 2.0
+
+
+def _column_exists(db, table, column):
+    return any(row[1] == column for row in db.execute(f'PRAGMA table_info({table})'))
+
+
+def _add_schedule_control_mode(db, log):
+    """Add schedules.control_mode to databases created before it existed"""
+    if not _column_exists(db, 'schedules', 'control_mode'):
+        db.execute('ALTER TABLE schedules ADD COLUMN control_mode TEXT DEFAULT "timer"')
+
+
+def _column_step(table, column, declaration):
+    """Build a migration step that adds a column if it is not there yet"""
+    def step(db, log):
+        if not _column_exists(db, table, column):
+            db.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+    return step
+
+
+def _index_step(name, table, columns):
+    """Build a migration step that creates one index with progress reporting"""
+    def step(db, log):
+        rows = db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        log(f"  building {name} on {table}({', '.join(columns)}) - {rows} rows")
+        started = time.time()
+        last_report = [started]
+
+        def progress():
+            now = time.time()
+            if now - last_report[0] >= PROGRESS_INTERVAL:
+                last_report[0] = now
+                log(f"    {name}: still building ({now - started:.0f}s elapsed)")
+            return 0
+
+        db.set_progress_handler(progress, PROGRESS_STEPS)
+        try:
+            db.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+        finally:
+            db.set_progress_handler(None, 0)
+        log(f"    {name}: done in {time.time() - started:.1f}s")
+    return step
+
+
+def _backfill_latest_images(db, log):
+    """Point every camera_status row at its camera's newest image"""
+    cursor = db.execute('''
+        UPDATE camera_status
+        SET (last_image_id, last_image_path, level, position) = (
+            SELECT id, image_path, level, position FROM camera_images ci
+            WHERE ci.camera_id = camera_status.camera_id
+            ORDER BY timestamp DESC, id DESC
+            LIMIT 1
+        )
+    ''')
+    log(f"  pointed {cursor.rowcount} cameras at their latest image")
+
+
+# Ordered list of (version, name, steps). Every step runs in its own
+# transaction; the version is recorded after the last step commits.
+MIGRATIONS = [
+    (1, 'schedules control_mode column', [
+        _add_schedule_control_mode,
+    ]),
+    (2, 'time-series indexes', [
+        _index_step('idx_sensor_readings_unit_ts', 'sensor_readings', ['unit_id', 'timestamp']),
+        _index_step('idx_room_sensors_unit_ts', 'room_sensors', ['unit_id', 'timestamp']),
+        _index_step('idx_relay_states_unit_ts', 'relay_states', ['unit_id', 'timestamp']),
+        _index_step('idx_camera_images_camera_ts', 'camera_images', ['camera_id', 'timestamp']),
+        _index_step('idx_camera_images_unit_ts', 'camera_images', ['unit_id', 'timestamp']),
+        _index_step('idx_camera_images_ts', 'camera_images', ['timestamp']),
+    ]),
+    (3, 'sensor rollups', [
+        create_rollup_table,
+        backfill_rollups,
+    ]),
+    (4, 'retention compaction support', [
+        _index_step('idx_sensor_rollups_res_bucket', 'sensor_rollups', ['resolution', 'bucket']),
+        enable_incremental_vacuum_if_small,
+    ]),
+    (5, 'camera image derivatives', [
+        _column_step('camera_images', 'thumb_path', 'TEXT'),
+        _column_step('camera_images', 'medium_path', 'TEXT'),
+    ]),
+    (6, 'latest image per camera', [
+        _column_step('camera_status', 'last_image_id', 'INTEGER'),
+        _column_step('camera_status', 'last_image_path', 'TEXT'),
+        _column_step('camera_status', 'level', 'INTEGER'),
+        _column_step('camera_status', 'position', 'INTEGER'),
+        _backfill_latest_images,
+        _index_step('idx_camera_status_unit', 'camera_status', ['unit_id']),
+        _index_step('idx_camera_status_last_ts', 'camera_status', ['last_image_timestamp']),
+    ]),
+    (7, 'alerts', [
+        create_alerts_table,
+    ]),
+    (8, 'ac_temp rollups', [
+        backfill_ac_temp_rollups,
+    ]),
+    # unit=ALL exports page on (timestamp, id) with no unit_id to lead the
+    # (unit_id, timestamp) indexes; without these every page scans and sorts
+    (9, 'export paging indexes', [
+        _index_step('idx_sensor_readings_ts_id', 'sensor_readings', ['timestamp', 'id']),
+        _index_step('idx_room_sensors_ts_id', 'room_sensors', ['timestamp', 'id']),
+    ]),
+]
+
+
+def get_schema_version(db):
+    """Return the highest applied migration version (0 for a fresh database)"""
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at INTEGER NOT NULL
+        )
+    ''')
+    db.commit()
+    row = db.execute('SELECT MAX(version) FROM schema_migrations').fetchone()
+    return row[0] or 0
+
+
+def run_migrations(db, log=print):
+    """Apply every pending migration in order; returns the resulting version"""
+    current = get_schema_version(db)
+    pending = [m for m in MIGRATIONS if m[0] > current]
+    if not pending:
+        return current
+
+    log(f"Schema at version {current}, applying {len(pending)} migration(s)")
+    for version, name, steps in pending:
+        log(f"Migration {version}: {name}")
+        for step in steps:
+            step(db, log)
+            db.commit()
+        db.execute('INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)',
+                   (version, name, int(time.time())))
+        db.commit()
+        current = version
+
+    # Refresh planner statistics so the new indexes are picked up
+    db.execute('PRAGMA optimize')
+    log(f"Schema now at version {current}")
+    return current
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else 'hydroponics.db'
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    try:
+        run_migrations(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,71 @@
+# Blocking and CPU-heavy request work, moved off the eventlet hub
+#
+# gunicorn runs a single eventlet worker, so anything that holds the hub
+# thread (file I/O, CRC/deflate while building a ZIP, formatting a CSV
+# chunk, encoding a large JSON payload) stalls every other greenlet and
+# Socket.IO connection. Offloader.run() hands such a job to a real OS
+# thread (eventlet.tpool) and the calling greenlet waits cooperatively.
+# File reads, zlib and disk writes release the GIL, and pure-Python work
+# in an OS thread is preempted every sys.getswitchinterval(), so the hub
+# keeps serving device requests either way. Without eventlet (dev server,
+# plain threads) jobs simply run on the calling thread.
+#
+# Jobs belong to a class ('export', 'encode', 'upload', ...) with its own
+# concurrency limit; stats() reports queue depth, running jobs and timings.
+import threading
+import time
+
+try:
+    from eventlet import patcher, tpool
+except ImportError:
+    patcher = tpool = None
+
+
+def run_in_thread(fn, *args):
+    """Call fn(*args) on an OS thread when running under eventlet"""
+    if tpool is not None and patcher.is_monkey_patched('thread'):
+        return tpool.execute(fn, *args)
+    return fn(*args)
+
+
+class Offloader:
+    """Per-class limited offloading of blocking jobs, with metrics"""
+
+    def __init__(self, limits):
+        self._lock = threading.Lock()
+        self._slots = {name: threading.BoundedSemaphore(limit) for name, limit in limits.items()}
+        self._stats = {
+            name: {'limit': limit, 'queued': 0, 'running': 0, 'max_queued': 0,
+                   'completed': 0, 'failed': 0, 'wait_ms': 0.0, 'run_ms': 0.0}
+            for name, limit in limits.items()
+        }
+
+    def run(self, job_class, fn, *args):
+        """Return fn(*args), run off the hub once job_class has a free slot"""
+        stats = self._stats[job_class]
+        with self._lock:
+            stats['queued'] += 1
+            stats['max_queued'] = max(stats['max_queued'], stats['queued'])
+        queued_at = time.monotonic()
+
+        with self._slots[job_class]:
+            started = time.monotonic()
+            with self._lock:
+                stats['queued'] -= 1
+                stats['running'] += 1
+                stats['wait_ms'] += (started - queued_at) * 1000
+            failed = True
+            try:
+                result = run_in_thread(fn, *args)
+                failed = False
+                return result
+            finally:
+                with self._lock:
+                    stats['running'] -= 1
+                    stats['failed' if failed else 'completed'] += 1
+                    stats['run_ms'] += (time.monotonic() - started) * 1000
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(s, wait_ms=round(s['wait_ms'], 1), run_ms=round(s['run_ms'], 1))
+                    for name, s in self._stats.items()}
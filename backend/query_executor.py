@@ -0,0 +1,89 @@
+# Isolated read path for history charts and exports
+#
+# Long scans used to run on the request's own connection inside the single
+# eventlet worker, so a 30-day chart or a CSV export held up device POSTs
+# and relay toggles. QueryExecutor gives these queries:
+#   - their own read-only (query_only) connections, one per concurrent query,
+#     so max_concurrent caps how many run at once; callers wait up to
+#     queue_timeout for a free one (PoolTimeout otherwise)
+#   - a deadline, enforced by an SQLite progress handler that aborts the
+#     statement (QueryTimeout); streamed exports run one keyset-paged query
+#     per chunk, each with its own deadline, and hold nothing in between
+#   - real OS threads: under eventlet the SQLite work is handed to
+#     eventlet.tpool so the hub keeps serving other greenlets meanwhile
+import sqlite3
+import time
+
+from db_pool import ConnectionPool
+from offload import run_in_thread
+
+PROGRESS_STEPS = 10000  # SQLite VM steps between deadline checks
+
+
+class QueryTimeout(Exception):
+    """An analytics query ran past its deadline and was aborted"""
+
+
+class QueryExecutor:
+    """Runs heavy read-only queries with their own connections, limit and timeout"""
+
+    def __init__(self, path, max_concurrent=2, timeout=30, pragmas=None, queue_timeout=10):
+        self.timeout = timeout
+        self.pool = ConnectionPool(path, 'reader', max_concurrent, timeout=queue_timeout, pragmas=pragmas)
+
+    def _call(self, db, fn, timeout):
+        deadline = time.monotonic() + (timeout or self.timeout)
+        db.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_STEPS)
+        try:
+            return run_in_thread(fn, db)
+        except sqlite3.OperationalError as e:
+            if time.monotonic() > deadline:
+                raise QueryTimeout(f"Query aborted after {timeout or self.timeout}s") from e
+            raise
+        finally:
+            db.set_progress_handler(None, 0)
+
+    def run(self, fn, *args, timeout=None):
+        """Return fn(db, *args) run on an executor connection"""
+        db = self.pool.acquire()
+        try:
+            return self._call(db, lambda conn: fn(conn, *args), timeout)
+        finally:
+            db.close()
+
+    def query(self, sql, params=(), timeout=None):
+        """fetchall() of one statement"""
+        return self.run(lambda db: db.execute(sql, params).fetchall(), timeout=timeout)
+
+    def stream(self, sql, params=(), keys=('id',), size=1000, descending=False, start=None, timeout=None):
+        """Yield the rows of sql in pages of up to size rows, keyset-paginated on keys
+
+        sql is a SELECT whose columns include keys, with an "{after}"
+        placeholder in its WHERE clause and no ORDER BY or LIMIT. Every page
+        is a separate query, so no connection, slot or read transaction is
+        held while the client downloads the previous one.
+
+        start is an optional prefix of key values the first page begins at
+        (inclusive). Leave that end of the range out of sql: SQLite bounds
+        an index range with only one of two competing constraints, and if it
+        is not the keyset one every page re-walks the rows already sent.
+        """
+        order = ', '.join(f"{key} {'DESC' if descending else 'ASC'}" for key in keys)
+        if start:
+            after = (f"({', '.join(keys[:len(start)])}) {'<=' if descending else '>='} "
+                     f"({', '.join('?' * len(start))})")
+            last = tuple(start)
+        else:
+            after, last = '1', ()
+        while True:
+            rows = self.query(f"{sql.format(after=after)} ORDER BY {order} LIMIT {int(size)}",
+                              (*params, *last), timeout=timeout)
+            if rows:
+                yield rows
+            if len(rows) < size:
+                break
+            after = f"({', '.join(keys)}) {'<' if descending else '>'} ({', '.join('?' * len(keys))})"
+            last = tuple(rows[-1][key] for key in keys)
+
+    def stats(self):
+        return self.pool.stats()
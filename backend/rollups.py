@@ -0,0 +1,213 @@
+# Incrementally maintained rollups for sensor and room history charts
+#
+# sensor_rollups holds count/sum/min/max per (resolution, unit_id, metric,
+# bucket). Every ingest upserts one row per metric and resolution, so the
+# history endpoints read a handful of pre-aggregated buckets instead of
+# re-grouping raw readings on every request.
+#
+# Rebuild rollups from the raw tables with:
+#     python rollups.py /app/data/hydroponics.db
+import sqlite3
+import sys
+import time
+
+# Bucket sizes in seconds: 1m, 5m, 1h, 1d
+ROLLUP_RESOLUTIONS = [60, 300, 3600, 86400]
+
+# Numeric columns rolled up from each raw table
+SENSOR_METRICS = ['ph', 'tds', 'turbidity', 'water_temp', 'water_level']
+ROOM_METRICS = ['temp', 'humidity', 'pressure', 'iaq', 'co2', 'ac_temp']
+
+ROLLUP_SOURCES = {
+    'sensor_readings': SENSOR_METRICS,
+    'room_sensors': ROOM_METRICS,
+}
+
+
+def create_rollup_table(db, log=print):
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS sensor_rollups (
+            resolution INTEGER NOT NULL,
+            unit_id TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            value_count INTEGER NOT NULL,
+            value_sum REAL NOT NULL,
+            value_min REAL,
+            value_max REAL,
+            PRIMARY KEY (resolution, unit_id, metric, bucket)
+        ) WITHOUT ROWID
+    ''')
+
+
+def record_rollups(db, unit_id, timestamp, values, metrics):
+    """Fold one reading into every rollup resolution (caller commits)"""
+    rows = []
+    for metric in metrics:
+        value = values.get(metric)
+        if value is None:
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+        for resolution in ROLLUP_RESOLUTIONS:
+            bucket = (timestamp // resolution) * resolution
+            rows.append((resolution, unit_id, metric, bucket, value, value, value))
+
+    if rows:
+        db.executemany('''
+            INSERT INTO sensor_rollups
+            (resolution, unit_id, metric, bucket, value_count, value_sum, value_min, value_max)
+            VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+            ON CONFLICT (resolution, unit_id, metric, bucket) DO UPDATE SET
+                value_count = value_count + 1,
+                value_sum = value_sum + excluded.value_sum,
+                value_min = MIN(value_min, excluded.value_min),
+                value_max = MAX(value_max, excluded.value_max)
+        ''', rows)
+
+
+def pick_resolution(interval):
+    """Coarsest rollup resolution that evenly divides the chart interval"""
+    for resolution in sorted(ROLLUP_RESOLUTIONS, reverse=True):
+        if resolution <= interval and interval % resolution == 0:
+            return resolution
+    return None
+
+
+def read_rollup(db, unit_id, metric, interval, start_time):
+    """Return (bucket_time, value, min_val, max_val) rows for a history chart"""
+    resolution = pick_resolution(interval)
+    return db.execute('''
+        SELECT
+            (bucket / ?) * ? as bucket_time,
+            SUM(value_sum) / SUM(value_count) as value,
+            MIN(value_min) as min_val,
+            MAX(value_max) as max_val,
+            SUM(value_count) as count
+        FROM sensor_rollups
+        WHERE resolution = ? AND unit_id = ? AND metric = ? AND bucket >= ?
+        GROUP BY bucket_time
+        ORDER BY bucket_time ASC
+    ''', (interval, interval, resolution, unit_id, metric,
+          (start_time // resolution) * resolution)).fetchall()
+
+
+def read_raw_buckets(db, table, unit_id, metric, interval, start_time):
+    """read_rollup() rows grouped straight from a raw table, for metrics without rollups"""
+    return db.execute(f'''
+        SELECT
+            (timestamp / ?) * ? as bucket_time,
+            AVG({metric}) as value,
+            MIN({metric}) as min_val,
+            MAX({metric}) as max_val,
+            COUNT({metric}) as count
+        FROM {table}
+        WHERE unit_id = ? AND timestamp >= ? AND {metric} IS NOT NULL
+        GROUP BY bucket_time
+        ORDER BY bucket_time ASC
+    ''', (interval, interval, unit_id, start_time)).fetchall()
+
+
+def raw_floor(db, table):
+    """Oldest timestamp from which table still holds every raw reading
+
+    Compaction deletes raw rows past their retention but keeps each unit's
+    newest row however old it is, so those rows do not count. None when
+    there is nothing beyond them.
+    """
+    return db.execute(f'''
+        SELECT MIN(timestamp) FROM (
+            SELECT timestamp, ROW_NUMBER() OVER (
+                PARTITION BY unit_id ORDER BY timestamp DESC, id DESC
+            ) AS rn FROM {table}
+        ) WHERE rn > 1
+    ''').fetchone()[0]
+
+
+def backfill_rollups(db, log=print, only=None):
+    """Rebuild every rollup (or just the metrics in only) from the raw tables
+
+    The finest resolution is built from raw rows, each coarser one from the
+    resolution below it, so raw data is only scanned once per metric.
+    Only buckets from the raw floor on (see raw_floor) are rebuilt; older
+    buckets summarise raw rows compaction has already deleted, so they are
+    kept and only filled in where missing. Rebuilt buckets are upserted so
+    this can run while devices keep posting.
+    """
+    started = time.time()
+    resolutions = sorted(ROLLUP_RESOLUTIONS)
+    finest = resolutions[0]
+    selected = list(only or [m for metrics in ROLLUP_SOURCES.values() for m in metrics])
+    upsert = '''
+        ON CONFLICT (resolution, unit_id, metric, bucket) DO UPDATE SET
+            value_count = excluded.value_count,
+            value_sum = excluded.value_sum,
+            value_min = excluded.value_min,
+            value_max = excluded.value_max
+        WHERE excluded.bucket >= ?
+    '''
+
+    for table, metrics in ROLLUP_SOURCES.items():
+        metrics = [metric for metric in metrics if metric in selected]
+        if not metrics:
+            continue
+        in_metrics = f"metric IN ({', '.join('?' * len(metrics))})"
+        floor = raw_floor(db, table)
+        # First whole bucket at or after the floor, per resolution. With no
+        # floor the cut is NULL, so nothing is deleted or overwritten.
+        cuts = {r: None if floor is None else -(-floor // r) * r for r in resolutions}
+        log(f"  rollups: {table} raw data complete from {floor}")
+
+        for resolution in resolutions:
+            db.execute(f'DELETE FROM sensor_rollups WHERE resolution = ? AND {in_metrics} AND bucket >= ?',
+                       (resolution, *metrics, cuts[resolution]))
+        db.commit()
+
+        for metric in metrics:
+            db.execute(f'''
+                INSERT INTO sensor_rollups
+                (resolution, unit_id, metric, bucket, value_count, value_sum, value_min, value_max)
+                SELECT ?, unit_id, ?, (timestamp / ?) * ?,
+                       COUNT({metric}), SUM({metric}), MIN({metric}), MAX({metric})
+                FROM {table}
+                WHERE {metric} IS NOT NULL
+                GROUP BY unit_id, timestamp / ?
+                {upsert}
+            ''', (finest, metric, finest, finest, finest, cuts[finest]))
+            db.commit()
+            log(f"  rollups: {table}.{metric} at {finest}s done")
+
+        for previous, resolution in zip(resolutions, resolutions[1:]):
+            db.execute(f'''
+                INSERT INTO sensor_rollups
+                (resolution, unit_id, metric, bucket, value_count, value_sum, value_min, value_max)
+                SELECT ?, unit_id, metric, (bucket / ?) * ?,
+                       SUM(value_count), SUM(value_sum), MIN(value_min), MAX(value_max)
+                FROM sensor_rollups
+                WHERE resolution = ? AND {in_metrics}
+                GROUP BY unit_id, metric, bucket / ?
+                {upsert}
+            ''', (resolution, resolution, resolution, previous, *metrics, resolution, cuts[resolution]))
+            db.commit()
+            log(f"  rollups: {table} at {resolution}s done")
+
+    in_selected = f"metric IN ({', '.join('?' * len(selected))})"
+    total = db.execute(f'SELECT COUNT(*) FROM sensor_rollups WHERE {in_selected}', selected).fetchone()[0]
+    log(f"  rollups: {total} buckets in {time.time() - started:.1f}s")
+
+
+def backfill_ac_temp_rollups(db, log=print):
+    """Migration step: ac_temp joined ROOM_METRICS after the first backfill"""
+    backfill_rollups(db, log, only=['ac_temp'])
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else 'hydroponics.db'
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        create_rollup_table(conn)
+        backfill_rollups(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,116 @@
+# Compiled relay schedules
+#
+# A unit's active schedule rows (lights/fans on-off windows, pump_cycle and
+# control_modes) are merged and compiled once, when they are written, into a
+# CompiledSchedule. Asking for the effective relay state at a timestamp then
+# needs no JSON decoding: each relay keeps the segment it was last evaluated
+# in (start, next transition, state) and only recomputes once a read falls
+# outside it.
+#
+# Times are wall-clock times in the server's local timezone (set TZ in the
+# container). Pump cycles restart at local midnight.
+import threading
+from datetime import datetime, time as dtime, timedelta
+
+RELAYS = ('lights', 'fans', 'pump')
+DEFAULT_CONTROL_MODES = {'lights': 'timer', 'fans': 'timer', 'pump': 'timer'}
+
+
+def parse_clock(value):
+    """'HH:MM' -> datetime.time, or None if it isn't one"""
+    try:
+        hour, minute = str(value).split(':')[:2]
+        return dtime(int(hour), int(minute))
+    except (TypeError, ValueError):
+        return None
+
+
+def _at(day, clock):
+    return datetime.combine(day, clock).timestamp()
+
+
+def window_segment(on, off, ts):
+    """(start, end, state) of a daily on/off window around ts; windows may cross midnight"""
+    today = datetime.fromtimestamp(ts).date()
+    points = []
+    for day in (today - timedelta(days=1), today, today + timedelta(days=1)):
+        points.append((_at(day, on), 'ON'))
+        points.append((_at(day, off), 'OFF'))
+    points.sort()
+
+    for (start, state), (end, _) in zip(points, points[1:]):
+        if start <= ts < end:
+            return start, end, state
+    # ts can only miss when a DST jump reorders the points; fall back to "now"
+    return ts, ts + 60, 'OFF'
+
+
+def cycle_segment(on_duration, interval, ts):
+    """(start, end, state) of a pump cycle (on for on_duration of every interval)"""
+    today = datetime.fromtimestamp(ts).date()
+    midnight = _at(today, dtime())
+    next_midnight = _at(today + timedelta(days=1), dtime())
+
+    cycle_start = ts - (ts - midnight) % interval
+    if ts < cycle_start + on_duration:
+        return cycle_start, min(cycle_start + on_duration, next_midnight), 'ON'
+    return cycle_start + on_duration, min(cycle_start + interval, next_midnight), 'OFF'
+
+
+class CompiledSchedule:
+    """A unit's merged schedule with per-relay timelines"""
+
+    def __init__(self, schedule):
+        self.schedule = schedule  # merged dict as served by GET /units/<unit_id>/schedule
+        self.control_modes = {**DEFAULT_CONTROL_MODES, **(schedule.get('control_modes') or {})}
+        self._timelines = {}  # relay -> function(ts) -> (start, end, state)
+        self._segments = {}   # relay -> last (start, end, state) evaluated
+        self._lock = threading.Lock()
+
+        for relay in ('lights', 'fans'):
+            window = schedule.get(relay)
+            if isinstance(window, dict):
+                on, off = parse_clock(window.get('on')), parse_clock(window.get('off'))
+                if on is not None and off is not None and on != off:
+                    self._timelines[relay] = (lambda ts, on=on, off=off: window_segment(on, off, ts))
+
+        cycle = schedule.get('pump_cycle')
+        if isinstance(cycle, dict):
+            try:
+                on_duration = int(cycle.get('on_duration_sec', 0))
+                interval = int(cycle.get('interval_sec', 0))
+            except (TypeError, ValueError):
+                on_duration = interval = 0
+            if interval > 0 and on_duration > 0:
+                on_duration = min(on_duration, interval)
+                self._timelines['pump'] = (
+                    lambda ts, on=on_duration, every=interval: cycle_segment(on, every, ts))
+
+    def segment(self, relay, ts):
+        """(start, next transition, state) for a timer relay, or None if it has no timeline"""
+        timeline = self._timelines.get(relay)
+        if timeline is None:
+            return None
+        with self._lock:
+            cached = self._segments.get(relay)
+            if cached and cached[0] <= ts < cached[1]:
+                return cached
+        segment = timeline(ts)
+        with self._lock:
+            self._segments[relay] = segment
+        return segment
+
+    def effective_state(self, ts, current):
+        """Relay states at ts; current holds the last commanded states used for manual relays
+
+        Returns {relay: (state, source, next_transition)} where source is
+        'schedule' or 'manual' and next_transition is None for manual relays.
+        """
+        states = {}
+        for relay in RELAYS:
+            segment = self.segment(relay, ts) if self.control_modes.get(relay) == 'timer' else None
+            if segment is None:
+                states[relay] = (current.get(relay, 'OFF'), 'manual', None)
+            else:
+                states[relay] = (segment[2], 'schedule', int(segment[1]))
+        return states
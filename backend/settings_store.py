@@ -0,0 +1,114 @@
+# In-memory settings backed by a JSON file on the data volume
+#
+# The parsed settings are kept in memory and only re-read when the file's
+# mtime/size changes (checked at most every CHECK_INTERVAL seconds), so hot
+# paths can call get() on every reading. Writes go to a temp file that is
+# fsynced and renamed over settings.json, so a reader never sees a half
+# written file. Subscribers are called with the new settings after every
+# change, whether it came through update() or an edit to the file.
+# apply() takes settings another process wrote without waiting for the
+# next stat() to notice them.
+import json
+import os
+import tempfile
+import threading
+import time
+
+CHECK_INTERVAL = 1.0  # Seconds between stat() calls looking for outside edits
+
+
+class SettingsStore:
+    """Cached settings.json with atomic writes and change callbacks"""
+
+    def __init__(self, path, log=print):
+        self.path = path
+        self.log = log
+        self._lock = threading.Lock()
+        self._settings = {}
+        self._stamp = None  # (mtime_ns, size) of the file we last read or wrote
+        self._checked = 0
+        self._subscribers = []
+        self._reload()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _reload(self):
+        """Re-read the file if it changed; returns True when the settings changed"""
+        stamp = self._stat()
+        self._checked = time.monotonic()
+        if stamp == self._stamp:
+            return False
+        settings = {}
+        if stamp is not None:
+            try:
+                with open(self.path, 'r') as f:
+                    settings = json.load(f)
+            except ValueError as e:
+                self.log(f"Ignoring unreadable settings file {self.path}: {e}")
+                return False
+        self._stamp = stamp
+        changed = settings != self._settings
+        self._settings = settings
+        return changed
+
+    def get(self):
+        """Current settings; treat the returned dict as read-only"""
+        if time.monotonic() - self._checked >= CHECK_INTERVAL:
+            with self._lock:
+                changed = self._reload()
+                settings = self._settings
+            if changed:
+                self._notify(settings)
+        return self._settings
+
+    def update(self, **sections):
+        """Replace top-level sections (e.g. ranges=..., retention=...) and persist them"""
+        with self._lock:
+            self._reload()
+            settings = {**self._settings, **sections}
+            self._write(settings)
+            self._settings = settings
+            self._stamp = self._stat()
+        self._notify(settings)
+        return settings
+
+    def apply(self, settings):
+        """Adopt settings another process has already written to the file"""
+        with self._lock:
+            changed = settings != self._settings
+            self._settings = settings
+        if changed:
+            self._notify(settings)
+        return settings
+
+    def _write(self, settings):
+        directory = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(prefix='.settings-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(settings, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def subscribe(self, callback):
+        """Call callback(settings) after every change"""
+        self._subscribers.append(callback)
+
+    def _notify(self, settings):
+        for callback in list(self._subscribers):
+            try:
+                callback(settings)
+            except Exception as e:
+                self.log(f"Settings subscriber error: {e}")
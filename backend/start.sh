@@ -0,0 +1,38 @@
+#!/bin/bash
+# Backend entrypoint
+#
+# WEB_WORKERS=0     one eventlet process does everything (listens on 5000 and 5001)
+# WEB_WORKERS=N     a writer process on 5001 (every write, background workers,
+#                   state bus broker) plus N read/Socket.IO workers on 5000
+# WEB_WORKERS=auto  N = CPU cores - 1, at least 1
+set -e
+
+WEB_WORKERS=${WEB_WORKERS:-0}
+if [ "$WEB_WORKERS" = "auto" ]; then
+    WEB_WORKERS=$(( $(nproc) - 1 ))
+    [ "$WEB_WORKERS" -ge 1 ] || WEB_WORKERS=1
+fi
+
+GUNICORN="gunicorn --worker-class eventlet"
+
+if [ "$WEB_WORKERS" -le 0 ]; then
+    exec $GUNICORN -w 1 -b 0.0.0.0:5000 -b 0.0.0.0:5001 app:app
+fi
+
+APP_ROLE=writer $GUNICORN -w 1 -b 0.0.0.0:5001 app:app &
+writer=$!
+
+# Web workers read the schema the writer migrates, so wait until it is up
+until python -c "import urllib.request; urllib.request.urlopen('http://127.0.0.1:5001/health')" 2>/dev/null; do
+    kill -0 $writer 2>/dev/null || exit 1
+    sleep 1
+done
+
+echo "Writer up, starting $WEB_WORKERS web workers"
+APP_ROLE=web $GUNICORN -w "$WEB_WORKERS" -b 0.0.0.0:5000 app:app &
+web=$!
+
+# If either side exits, stop the other so the container restarts as a whole
+wait -n $writer $web
+kill $writer $web 2>/dev/null || true
+exit 1
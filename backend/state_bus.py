@@ -0,0 +1,226 @@
+# Cross-process pub/sub for the multi-process deployment
+#
+# With APP_ROLE=writer plus APP_ROLE=web workers, the writer owns every
+# write and background worker, while web workers serve GETs and Socket.IO
+# connections from in-memory state the writer replicates to them. Messages
+# travel over a Unix domain socket: the writer hosts a BusBroker that
+# relays each frame to the other connected processes subscribed to its
+# channel, and each process (writer included) talks to it through a
+# BusClient. LocalBus is the in-process equivalent, used by the tests.
+#
+# publish() also delivers to the publishing process's own subscribers, so
+# all three behave the same. A frame is a header (channel length, payload
+# length), the channel name and a pickled message; the broker routes on
+# the channel without unpickling. The socket file is created 0600 so only
+# this container's processes can publish.
+import os
+import pickle
+import queue
+import socket
+import struct
+import threading
+import time
+
+import socketio
+
+_HEADER = struct.Struct('>HI')
+_SUBSCRIBE = '_subscribe'  # control channel: message is a list of channel names
+
+
+def encode_frame(channel, message):
+    name = channel.encode()
+    payload = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(len(name), len(payload)) + name + payload
+
+
+def read_frame(sock):
+    """(channel, raw frame, payload bytes) or None once the peer closes"""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    name_size, payload_size = _HEADER.unpack(header)
+    body = _recv_exact(sock, name_size + payload_size)
+    if body is None:
+        return None
+    return body[:name_size].decode(), header + body, body[name_size:]
+
+
+def _recv_exact(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+class LocalBus:
+    """In-process bus: publish() calls this process's subscribers directly"""
+
+    def __init__(self):
+        self._handlers = {}
+
+    def subscribe(self, channel, handler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def publish(self, channel, message):
+        for handler in self._handlers.get(channel, ()):
+            handler(message)
+
+    def start(self):
+        pass
+
+
+class BusBroker:
+    """Relays every frame to the other clients subscribed to its channel"""
+
+    def __init__(self, path, log=print):
+        self.path = path
+        self.log = log
+        self._clients = {}  # connection -> set of subscribed channels
+        self._lock = threading.Lock()
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)  # left over from a previous run
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        os.chmod(self.path, 0o600)
+        server.listen(64)
+        thread = threading.Thread(target=self._accept, args=(server,))
+        thread.daemon = True
+        thread.start()
+        self.log(f"Bus broker listening on {self.path}")
+
+    def _accept(self, server):
+        while True:
+            conn, _ = server.accept()
+            with self._lock:
+                self._clients[conn] = set()
+            thread = threading.Thread(target=self._relay, args=(conn,))
+            thread.daemon = True
+            thread.start()
+
+    def _relay(self, conn):
+        try:
+            while True:
+                frame = read_frame(conn)
+                if frame is None:
+                    break
+                channel, data, payload = frame
+                if channel == _SUBSCRIBE:
+                    with self._lock:
+                        self._clients[conn].update(pickle.loads(payload))
+                    continue
+                with self._lock:
+                    targets = [c for c, channels in self._clients.items()
+                               if c is not conn and channel in channels]
+                for target in targets:
+                    try:
+                        target.sendall(data)
+                    except OSError:
+                        pass  # its own relay thread notices and drops it
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._clients.pop(conn, None)
+            conn.close()
+
+
+class BusClient:
+    """Connection to a BusBroker; reconnects forever and calls on_connect each time"""
+
+    def __init__(self, path, on_connect=None, log=print):
+        self.path = path
+        self.on_connect = on_connect
+        self.log = log
+        self._handlers = {}
+        self._sock = None
+        self._send_lock = threading.Lock()
+
+    def subscribe(self, channel, handler):
+        self._handlers.setdefault(channel, []).append(handler)
+        self._send(encode_frame(_SUBSCRIBE, [channel]))
+
+    def publish(self, channel, message):
+        """Send to every subscribed process; dropped while disconnected"""
+        self._send(encode_frame(channel, message))
+        self._dispatch(channel, message)
+
+    def _send(self, frame):
+        with self._send_lock:
+            if self._sock is None:
+                return False
+            try:
+                self._sock.sendall(frame)
+                return True
+            except OSError as e:
+                self.log(f"Bus: send failed, reconnecting: {e}")
+                self._sock.close()
+                self._sock = None
+                return False
+
+    def _dispatch(self, channel, message):
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(message)
+            except Exception as e:
+                self.log(f"Bus: {channel} handler error: {e}")
+
+    def start(self):
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
+
+    def _run(self):
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+                sock.sendall(encode_frame(_SUBSCRIBE, list(self._handlers)))
+            except OSError:
+                sock.close()
+                time.sleep(1)
+                continue
+
+            with self._send_lock:
+                self._sock = sock
+            self.log(f"Bus: connected to {self.path}")
+            if self.on_connect is not None:
+                self.on_connect()
+            try:
+                while True:
+                    frame = read_frame(sock)
+                    if frame is None:
+                        break
+                    channel, _, payload = frame
+                    self._dispatch(channel, pickle.loads(payload))
+            except OSError:
+                pass
+            with self._send_lock:
+                if self._sock is sock:
+                    self._sock = None
+            sock.close()
+            self.log("Bus: disconnected, retrying")
+            time.sleep(1)
+
+
+class BusManager(socketio.PubSubManager):
+    """Socket.IO client manager that fans emits out to every process over the bus"""
+    name = 'bus'
+
+    def __init__(self, bus, channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.bus = bus
+        self._inbox = queue.Queue()
+        if not write_only:
+            bus.subscribe(channel, self._inbox.put)
+
+    def _publish(self, data):
+        self.bus.publish(self.channel, data)
+
+    def _listen(self):
+        while True:
+            yield self._inbox.get()
@@ -0,0 +1,66 @@
+from alerts import AlertEngine
+
+RANGES = {'ph': {'warning': {'min': 6.0, 'max': 7.0}, 'critical': {'min': 5.0, 'max': 8.0}}}
+
+
+def feed(engine, values, start=0):
+    events = []
+    for i, value in enumerate(values):
+        events += engine.evaluate('sensor', 'DWC1', {'ph': value}, start + i)
+    return [(action, alert['severity']) for action, alert in events]
+
+
+def test_alert_opens_only_after_debounce():
+    engine = AlertEngine(RANGES, hysteresis=0.05, debounce=2)
+    assert feed(engine, [7.5]) == []
+    assert feed(engine, [7.5], start=1) == [('open', 'warning')]
+    assert engine.active()[0]['side'] == 'high'
+
+
+def test_single_spike_is_ignored():
+    engine = AlertEngine(RANGES, hysteresis=0.05, debounce=2)
+    assert feed(engine, [7.5, 6.5, 7.5, 6.5]) == []
+    assert engine.active() == []
+
+
+def test_escalation_closes_and_reopens():
+    engine = AlertEngine(RANGES, hysteresis=0.05, debounce=2)
+    feed(engine, [7.5, 7.5])
+    assert feed(engine, [8.5, 8.5], start=2) == [('close', 'warning'), ('open', 'critical')]
+
+
+def test_hysteresis_holds_alert_near_bound():
+    engine = AlertEngine(RANGES, hysteresis=0.05, debounce=1)
+    feed(engine, [7.5])
+    # Back inside the warning band, but within 0.05 * 1.0 of the bound
+    assert feed(engine, [6.98, 6.97], start=1) == []
+    assert feed(engine, [6.9], start=3) == [('close', 'warning')]
+    assert engine.active() == []
+
+
+def test_revert_lets_the_next_readings_retry():
+    engine = AlertEngine(RANGES, hysteresis=0.05, debounce=2)
+    events = []
+    for ts in (0, 1):
+        events += engine.evaluate('sensor', 'DWC1', {'ph': 7.5}, ts)
+    engine.revert(events)
+    assert engine.active() == []
+    assert feed(engine, [7.5, 7.5], start=2) == [('open', 'warning')]
+
+
+def test_revert_restores_closed_alert():
+    engine = AlertEngine(RANGES, hysteresis=0.05, debounce=1)
+    feed(engine, [7.5])
+    events = engine.evaluate('sensor', 'DWC1', {'ph': 6.5}, 1)
+    engine.revert(events)
+    active = engine.active()
+    assert [(a['severity'], a['closed_at']) for a in active] == [('warning', None)]
+
+
+def test_apply_mirrors_events():
+    writer = AlertEngine(RANGES, debounce=1)
+    mirror = AlertEngine(RANGES, debounce=1)
+    mirror.apply(writer.evaluate('sensor', 'DWC1', {'ph': 4.0}, 0))
+    assert [a['severity'] for a in mirror.active()] == ['critical']
+    mirror.apply(writer.evaluate('sensor', 'DWC1', {'ph': 6.5}, 1))
+    assert mirror.active() == []
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'test.db')
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE t (x INTEGER)')
+    db.commit()
+    db.close()
+    return path
+
+
+def test_close_returns_connection_for_reuse(db_path):
+    pool = ConnectionPool(db_path, max_size=2)
+    first = pool.acquire()
+    first.close()
+    assert pool.acquire() is first
+    assert pool.stats()['created'] == 1
+
+
+def test_release_rolls_back_open_transaction(db_path):
+    pool = ConnectionPool(db_path, max_size=1)
+    db = pool.acquire()
+    db.execute('INSERT INTO t VALUES (1)')
+    db.close()
+    db = pool.acquire()
+    assert not db.in_transaction
+    assert db.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+
+
+def test_reader_rejects_writes(db_path):
+    pool = ConnectionPool(db_path, role='reader', max_size=1)
+    db = pool.acquire()
+    with pytest.raises(sqlite3.OperationalError):
+        db.execute('INSERT INTO t VALUES (1)')
+    db.close()
+
+
+def test_acquire_times_out_when_exhausted(db_path):
+    pool = ConnectionPool(db_path, max_size=1, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+    held.close()
+    pool.acquire().close()
+
+
+def test_double_close_is_ignored(db_path):
+    pool = ConnectionPool(db_path, max_size=2)
+    db = pool.acquire()
+    db.close()
+    db.close()
+    assert pool.stats()['idle'] == 1
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not second
+    first.close()
+    second.close()
+    assert pool.stats()['open'] == 2
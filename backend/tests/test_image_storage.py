@@ -0,0 +1,77 @@
+import os
+import sqlite3
+
+import pytest
+
+from image_storage import SHARDED_MARKER, image_relpath, migrate_flat_images
+
+EXTENSIONS = {'jpg'}
+TIMESTAMP = 1700000000
+
+
+def unit_of(camera_id):
+    return camera_id[:camera_id.index('L')]
+
+
+@pytest.fixture
+def db():
+    db = sqlite3.connect(':memory:')
+    db.execute('CREATE TABLE camera_images (id INTEGER PRIMARY KEY, camera_id TEXT, unit_id TEXT, '
+               'timestamp INTEGER, image_path TEXT)')
+    yield db
+    db.close()
+
+
+def flat_file(folder, name):
+    path = os.path.join(folder, name)
+    with open(path, 'wb') as f:
+        f.write(b'\xff\xd8 frame')
+    return path
+
+
+def sharded(folder, name):
+    return os.path.join(folder, image_relpath('DWC1', 'DWC1L11', TIMESTAMP, name))
+
+
+def test_flat_images_with_and_without_rows_are_moved(db, tmp_path):
+    folder = str(tmp_path)
+    with_row = flat_file(folder, f'DWC1L11_{TIMESTAMP}_1.jpg')
+    flat_file(folder, f'DWC1L11_{TIMESTAMP}_2.jpg')
+    flat_file(folder, f'DWC1L11_{TIMESTAMP}_1.thumb.jpg')
+    db.execute('INSERT INTO camera_images (camera_id, unit_id, timestamp, image_path) VALUES (?, ?, ?, ?)',
+               ('DWC1L11', 'DWC1', TIMESTAMP, with_row))
+    saved = []
+
+    moved = migrate_flat_images(db, folder, log=lambda message: None, unit_of=unit_of,
+                                extensions=EXTENSIONS, save_orphans=saved.extend)
+
+    assert moved == 2
+    first, second = sharded(folder, f'DWC1L11_{TIMESTAMP}_1.jpg'), sharded(folder, f'DWC1L11_{TIMESTAMP}_2.jpg')
+    assert db.execute('SELECT image_path FROM camera_images').fetchone()[0] == first
+    assert saved == [(second, 'DWC1L11', TIMESTAMP, os.path.getsize(second))]
+    assert os.path.exists(first) and os.path.exists(second)
+    assert os.path.exists(os.path.join(folder, f'DWC1L11_{TIMESTAMP}_1.thumb.jpg'))
+    assert os.path.exists(os.path.join(folder, SHARDED_MARKER))
+    assert migrate_flat_images(db, folder, log=lambda message: None) == 0
+
+
+def test_without_save_orphans_files_and_marker_are_left(db, tmp_path):
+    folder = str(tmp_path)
+    orphan = flat_file(folder, f'DWC1L11_{TIMESTAMP}_2.jpg')
+    assert migrate_flat_images(db, folder, log=lambda message: None) == 0
+    assert os.path.exists(orphan)
+    assert not os.path.exists(os.path.join(folder, SHARDED_MARKER))
+
+
+def test_file_indexed_before_a_crash_is_only_moved(db, tmp_path):
+    folder = str(tmp_path)
+    flat_file(folder, f'DWC1L11_{TIMESTAMP}_2.jpg')
+    target = sharded(folder, f'DWC1L11_{TIMESTAMP}_2.jpg')
+    db.execute('INSERT INTO camera_images (camera_id, unit_id, timestamp, image_path) VALUES (?, ?, ?, ?)',
+               ('DWC1L11', 'DWC1', TIMESTAMP, target))
+    saved = []
+
+    migrate_flat_images(db, folder, log=lambda message: None, unit_of=unit_of,
+                        extensions=EXTENSIONS, save_orphans=saved.extend)
+    assert saved == []
+    assert os.path.exists(target)
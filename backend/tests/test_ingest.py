@@ -0,0 +1,64 @@
+import importlib
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    # app.py sets up its database and starts the ingest writer at import time
+    directory = tmp_path_factory.mktemp('ingest')
+    os.environ['DATABASE_PATH'] = str(directory / 'data' / 'hydroponics.db')
+    os.environ['UPLOAD_FOLDER'] = str(directory / 'camera_images')
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        yield importlib.import_module('app')
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def post_reading(client, ph):
+    return client.post('/units/DWC1/sensors?strict=1', json={'reservoir': {'ph': ph}, 'climate': {}})
+
+
+def test_strict_post_waits_for_commit(client):
+    assert post_reading(client, 6.1).status_code == 200
+    assert client.get('/units/DWC1/sensors').get_json()['reservoir']['ph'] == 6.1
+
+
+def test_publish_error_keeps_the_commit(app_module, client, monkeypatch):
+    def broken(reading):
+        raise RuntimeError('emit failed')
+    monkeypatch.setattr(app_module, 'publish_reading', broken)
+    committed = app_module.ingest_stats['committed']
+    assert post_reading(client, 6.2).status_code == 200
+    assert app_module.ingest_stats['committed'] == committed + 1
+
+
+def test_commit_error_is_reported_to_strict_waiters(app_module, client, monkeypatch):
+    def broken(db, reading):
+        raise ValueError('bad row')
+    monkeypatch.setattr(app_module, 'insert_reading', broken)
+    failed = app_module.ingest_stats['failed']
+    assert post_reading(client, 6.3).status_code == 500
+    assert app_module.ingest_stats['failed'] == failed + 1
+    assert 'bad row' in app_module.ingest_stats['last_error']
+
+
+def test_writer_survives_a_batch_error(app_module, client, monkeypatch):
+    def broken(db, jobs):
+        raise RuntimeError('batch failed')
+    monkeypatch.setattr(app_module, 'process_ingest_batch', broken)
+    errors = app_module.ingest_stats['batch_errors']
+    assert post_reading(client, 6.4).status_code == 500
+    assert app_module.ingest_stats['batch_errors'] == errors + 1
+
+    monkeypatch.undo()
+    assert post_reading(client, 6.5).status_code == 200
+    assert client.get('/units/DWC1/sensors').get_json()['reservoir']['ph'] == 6.5
@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+
+from query_executor import QueryExecutor, QueryTimeout
+
+
+@pytest.fixture
+def executor(tmp_path):
+    path = str(tmp_path / 'test.db')
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE readings (id INTEGER PRIMARY KEY, unit_id TEXT, timestamp INTEGER)')
+    # Duplicate timestamps so paging has to break ties on id
+    db.executemany('INSERT INTO readings (unit_id, timestamp) VALUES (?, ?)',
+                   [('DWC1' if i % 3 else 'DWC2', 1000 + i // 4) for i in range(103)])
+    db.commit()
+    db.close()
+    return QueryExecutor(path, max_concurrent=1, timeout=5, queue_timeout=0.1)
+
+
+def test_long_query_is_aborted_and_connection_returned(executor):
+    endless = '''
+        WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n)
+        SELECT COUNT(*) FROM n
+    '''
+    with pytest.raises(QueryTimeout):
+        executor.query(endless, timeout=0.1)
+    assert executor.stats()['in_use'] == 0
+    assert executor.query('SELECT COUNT(*) FROM readings')[0][0] == 103
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_stream_pages_through_every_row_in_order(executor, descending):
+    sql = 'SELECT id, timestamp FROM readings WHERE unit_id = ? AND {after}'
+    pages = list(executor.stream(sql, ('DWC1',), ('timestamp', 'id'), size=10, descending=descending))
+
+    rows = [(row['timestamp'], row['id']) for page in pages for row in page]
+    expected = executor.query('SELECT timestamp, id FROM readings WHERE unit_id = ? ORDER BY timestamp, id',
+                              ('DWC1',))
+    expected = [tuple(row) for row in expected]
+    assert rows == (expected[::-1] if descending else expected)
+    assert all(len(page) <= 10 for page in pages)
+
+
+def test_stream_holds_no_connection_between_pages(executor):
+    pages = executor.stream('SELECT id FROM readings WHERE {after}', size=25)
+    next(pages)
+    # max_concurrent=1, so this would time out if the stream held the slot
+    assert executor.query('SELECT COUNT(*) FROM readings')[0][0] == 103
+    assert sum(len(page) for page in pages) == 103 - 25
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_stream_start_is_an_inclusive_first_bound(executor, descending):
+    # The caller's WHERE holds only the far end of the range; start is the near end
+    if descending:
+        sql, bound, expected_range = 'SELECT id, timestamp FROM readings WHERE timestamp >= ? AND {after}', 1003, (1003, 1010)
+    else:
+        sql, bound, expected_range = 'SELECT id, timestamp FROM readings WHERE timestamp <= ? AND {after}', 1020, (1010, 1020)
+    pages = executor.stream(sql, (bound,), ('timestamp', 'id'), size=7, descending=descending, start=(1010,))
+    rows = [(row['timestamp'], row['id']) for page in pages for row in page]
+
+    expected = executor.query('SELECT timestamp, id FROM readings WHERE timestamp BETWEEN ? AND ? '
+                              'ORDER BY timestamp, id', expected_range)
+    expected = [tuple(row) for row in expected]
+    assert rows == (expected[::-1] if descending else expected)
@@ -0,0 +1,105 @@
+import random
+import sqlite3
+
+import pytest
+
+from compaction import _expire_raw
+from rollups import (ROLLUP_SOURCES, create_rollup_table, record_rollups, read_rollup,
+                     read_raw_buckets, backfill_rollups)
+
+START = 1700000000 - 1700000000 % 86400
+
+
+def empty_db():
+    db = sqlite3.connect(':memory:')
+    db.row_factory = sqlite3.Row
+    create_rollup_table(db)
+    for table, metrics in ROLLUP_SOURCES.items():
+        db.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, unit_id TEXT, timestamp INTEGER, "
+                   f"{', '.join(m + ' REAL' for m in metrics)})")
+    return db
+
+
+def all_rollups(db):
+    # Sums are rounded: a rebuild adds the same values in a different order
+    return [tuple(row) for row in db.execute('''
+        SELECT resolution, unit_id, metric, bucket, value_count, ROUND(value_sum, 6), value_min, value_max
+        FROM sensor_rollups ORDER BY resolution, unit_id, metric, bucket
+    ''')]
+
+
+@pytest.fixture
+def db():
+    db = empty_db()
+    rng = random.Random(7)
+    for i in range(2000):
+        timestamp = START + i * 37
+        values = {'temp': round(rng.uniform(18, 32), 2), 'ac_temp': rng.choice([None, 22, 24])}
+        db.execute('INSERT INTO room_sensors (unit_id, timestamp, temp, ac_temp) VALUES (?, ?, ?, ?)',
+                   ('ROOM_FRONT', timestamp, values['temp'], values['ac_temp']))
+        record_rollups(db, 'ROOM_FRONT', timestamp, values, ['temp', 'ac_temp'])
+    db.commit()
+    yield db
+    db.close()
+
+
+def assert_same(rollup_rows, raw_rows):
+    assert [r['bucket_time'] for r in rollup_rows] == [r['bucket_time'] for r in raw_rows]
+    for rolled, raw in zip(rollup_rows, raw_rows):
+        assert rolled['count'] == raw['count']
+        assert rolled['value'] == pytest.approx(raw['value'])
+        assert rolled['min_val'] == raw['min_val']
+        assert rolled['max_val'] == raw['max_val']
+
+
+@pytest.mark.parametrize('interval', [60, 300, 900, 3600, 21600])
+@pytest.mark.parametrize('metric', ['temp', 'ac_temp'])
+def test_rollups_match_raw_buckets(db, interval, metric):
+    start_time = START + 21600  # on a bucket boundary for every interval
+    rollup_rows = read_rollup(db, 'ROOM_FRONT', metric, interval, start_time)
+    raw_rows = read_raw_buckets(db, 'room_sensors', 'ROOM_FRONT', metric, interval, start_time)
+    assert rollup_rows
+    assert_same(rollup_rows, raw_rows)
+
+
+def test_backfill_matches_incremental(db):
+    incremental = read_rollup(db, 'ROOM_FRONT', 'temp', 3600, START)
+    backfill_rollups(db, log=lambda message: None)
+    assert_same(read_rollup(db, 'ROOM_FRONT', 'temp', 3600, START), incremental)
+
+
+def test_backfill_only_rebuilds_selected_metrics(db):
+    db.execute("DELETE FROM sensor_rollups WHERE metric = 'ac_temp'")
+    temp_rows = db.execute("SELECT COUNT(*) FROM sensor_rollups WHERE metric = 'temp'").fetchone()[0]
+    backfill_rollups(db, log=lambda message: None, only=['ac_temp'])
+    assert db.execute("SELECT COUNT(*) FROM sensor_rollups WHERE metric = 'temp'").fetchone()[0] == temp_rows
+    assert_same(read_rollup(db, 'ROOM_FRONT', 'ac_temp', 300, START),
+                read_raw_buckets(db, 'room_sensors', 'ROOM_FRONT', 'ac_temp', 300, START))
+
+
+def test_rebuild_from_scratch_matches_incremental(db):
+    incremental = all_rollups(db)
+    db.execute('DELETE FROM sensor_rollups')
+    backfill_rollups(db, log=lambda message: None)
+    assert all_rollups(db) == incremental
+
+
+def test_backfill_keeps_history_older_than_compacted_raw_rows():
+    db = empty_db()
+    # ROOM_FRONT reports every 10 minutes for 40 days; ROOM_BACK stops after 5
+    for i in range(40 * 144):
+        timestamp = START + i * 600 + 7
+        for unit_id in ('ROOM_FRONT', 'ROOM_BACK') if i < 5 * 144 else ('ROOM_FRONT',):
+            temp = 20 + (i * 7 % 13) / 2
+            db.execute('INSERT INTO room_sensors (unit_id, timestamp, temp) VALUES (?, ?, ?)',
+                       (unit_id, timestamp, temp))
+            record_rollups(db, unit_id, timestamp, {'temp': temp}, ['temp'])
+    db.commit()
+    before = all_rollups(db)
+
+    # 14-day raw retention; ROOM_BACK keeps only its newest row
+    _expire_raw(db, 'room_sensors', START + 26 * 86400 + 1234)
+    assert db.execute("SELECT COUNT(*) FROM room_sensors WHERE unit_id = 'ROOM_BACK'").fetchone()[0] == 1
+
+    backfill_rollups(db, log=lambda message: None)
+    assert all_rollups(db) == before
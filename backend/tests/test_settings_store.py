@@ -0,0 +1,21 @@
+import settings_store
+from settings_store import SettingsStore
+
+
+def test_apply_takes_effect_before_the_next_file_check(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_store, 'CHECK_INTERVAL', 3600)
+    path = str(tmp_path / 'settings.json')
+    writer, web = SettingsStore(path), SettingsStore(path)
+    notified = []
+    web.subscribe(notified.append)
+    assert web.get() == {}
+
+    settings = writer.update(ranges={'ph': {'warning': {'min': 6, 'max': 7}}})
+    # The web copy has not looked at the file again yet
+    assert web.get() == {}
+    web.apply(settings)
+    assert web.get() == settings
+    assert notified == [settings]
+
+    web.apply(settings)
+    assert notified == [settings]
@@ -0,0 +1,81 @@
+import os
+import queue
+import socket
+import tempfile
+import threading
+
+import pytest
+
+from state_bus import BusBroker, BusClient, LocalBus, encode_frame, read_frame
+
+
+def test_frame_round_trip():
+    left, right = socket.socketpair()
+    message = {'unit_id': 'DWC1', 'data': {'ph': 6.2}, 'blob': b'\x00' * 70000}
+    left.sendall(encode_frame('state', message) + encode_frame('écho', [1, 2]))
+    left.close()
+
+    channel, raw, payload = read_frame(right)
+    assert channel == 'state'
+    assert raw == encode_frame('state', message)
+    assert read_frame(right)[0] == 'écho'
+    assert read_frame(right) is None
+    right.close()
+
+
+def test_local_bus_delivers_to_subscribers():
+    bus = LocalBus()
+    received = []
+    bus.subscribe('state', received.append)
+    bus.publish('state', 1)
+    bus.publish('other', 2)
+    assert received == [1]
+
+
+@pytest.fixture
+def broker_path():
+    # AF_UNIX paths are limited to ~100 bytes, so stay out of pytest's tmp_path
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bus.sock')
+    BusBroker(path, log=lambda message: None).start()
+    yield path
+    os.remove(path)
+    os.rmdir(directory)
+
+
+def connected_client(path):
+    ready = threading.Event()
+    client = BusClient(path, on_connect=ready.set, log=lambda message: None)
+    return client, ready
+
+
+def test_broker_relays_to_subscribed_clients_only(broker_path):
+    writer, writer_ready = connected_client(broker_path)
+    web, web_ready = connected_client(broker_path)
+    other, other_ready = connected_client(broker_path)
+    inbox, other_inbox, local = queue.Queue(), queue.Queue(), []
+    web.subscribe('state', inbox.put)
+    other.subscribe('write', other_inbox.put)
+    writer.subscribe('state', local.append)
+    for client, ready in ((writer, writer_ready), (web, web_ready), (other, other_ready)):
+        client.start()
+        assert ready.wait(5)
+
+    # The broker applies each client's subscriptions on its own thread, so
+    # publish until the first message makes it through
+    for attempt in range(50):
+        writer.publish('state', attempt)
+        try:
+            inbox.get(timeout=0.1)
+            break
+        except queue.Empty:
+            continue
+    else:
+        pytest.fail('web client never received a state message')
+
+    writer.publish('state', 'last')
+    while inbox.get(timeout=2) != 'last':
+        pass
+    # publish() also reaches the publishing process's own subscribers
+    assert local == list(range(attempt + 1)) + ['last']
+    assert other_inbox.empty()
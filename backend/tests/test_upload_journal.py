@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from upload_journal import UploadJournal
+
+
+def test_replay_returns_uncommitted_records_after_restart(tmp_path):
+    journal = UploadJournal(str(tmp_path), fsync=False)
+    for i in range(3):
+        journal.append({'n': i})
+
+    restarted = UploadJournal(str(tmp_path), fsync=False)
+    assert [r['n'] for r in restarted.replay()] == [0, 1, 2]
+    restarted.discard_replayed()
+    assert list(UploadJournal(str(tmp_path), fsync=False).replay()) == []
+
+
+def test_replay_skips_torn_last_line(tmp_path):
+    journal = UploadJournal(str(tmp_path), fsync=False)
+    segment = journal.append({'n': 1})
+    with open(journal._path(segment), 'ab') as f:
+        f.write(b'{"n": 2')
+
+    assert [r['n'] for r in UploadJournal(str(tmp_path), fsync=False).replay()] == [1]
+
+
+def test_open_segment_is_truncated_once_caught_up(tmp_path):
+    journal = UploadJournal(str(tmp_path), fsync=False)
+    segment = journal.append({'n': 1})
+    journal.append({'n': 2})
+    journal.committed(segment)
+    assert os.path.getsize(journal._path(segment)) > 0
+
+    journal.committed(segment)
+    assert os.path.getsize(journal._path(segment)) == 0
+    assert list(UploadJournal(str(tmp_path), fsync=False).replay()) == []
+
+
+def test_full_segments_roll_over_and_are_removed(tmp_path):
+    journal = UploadJournal(str(tmp_path), segment_bytes=1, fsync=False)
+    first = journal.append({'n': 1})
+    second = journal.append({'n': 2})
+    assert second == first + 1
+
+    journal.committed(first)
+    assert not os.path.exists(journal._path(first))
+    assert [r['n'] for r in UploadJournal(str(tmp_path), fsync=False).replay()] == [2]
+
+
+def test_concurrent_appends_from_tpool_threads_under_eventlet(tmp_path):
+    pytest.importorskip('eventlet')
+    # Monkey patching is process-wide, so run the gunicorn-like setup in a child
+    script = textwrap.dedent(f"""
+        import eventlet
+        eventlet.monkey_patch()
+        from offload import Offloader
+        from upload_journal import UploadJournal
+
+        journal = UploadJournal({str(tmp_path)!r})
+        offloader = Offloader({{'upload': 8}})
+        done = []
+        pool = eventlet.GreenPool()
+        for i in range(50):
+            pool.spawn(lambda i: done.append(offloader.run('upload', journal.append, {{'n': i}})), i)
+        pool.waitall()
+        print(len(done))
+    """)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True,
+                            text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-1] == '50'
+    assert len(list(UploadJournal(str(tmp_path), fsync=False).replay())) == 50
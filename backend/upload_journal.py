@@ -0,0 +1,111 @@
+# Append-only journal for camera uploads waiting on a DB write
+#
+# upload_camera_image acknowledges as soon as the JPEG is on disk and its
+# metadata is queued. Every queued record is first appended to a journal
+# segment (one JSON object per line), so uploads still sitting in the
+# in-memory queue survive a worker restart or crash. Segments roll over at
+# JOURNAL_SEGMENT_BYTES and are deleted once every record in them has been
+# committed; the open segment is truncated instead whenever the queue has
+# caught up with it. Segments left on disk at startup are replayed.
+#
+# append() blocks on fsync, so callers on the eventlet hub should run it
+# on an OS thread (Offloader.run). The journal lock is therefore a native
+# one: a monkey-patched (green) lock taken from tpool threads fails with
+# "Cannot switch to a different thread" as soon as two appends contend.
+import json
+import os
+import threading
+
+try:
+    from eventlet import patcher
+    _native_threading = patcher.original('threading')
+except ImportError:
+    _native_threading = threading
+
+JOURNAL_SEGMENT_BYTES = 4 * 1024 * 1024
+
+
+class UploadJournal:
+    """Segmented JSON-lines journal of uploads not yet committed to the DB"""
+
+    def __init__(self, directory, segment_bytes=JOURNAL_SEGMENT_BYTES, fsync=True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self._lock = _native_threading.Lock()
+        self._pending = {}  # segment -> records appended but not yet committed
+        self._file = None
+        os.makedirs(directory, exist_ok=True)
+        # Segments from a previous run; new records never go into them
+        self._leftover = self._segments()
+        self._segment = self._leftover[-1] + 1 if self._leftover else 1
+
+    def _segments(self):
+        segments = []
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if ext == '.log' and stem.isdigit():
+                segments.append(int(stem))
+        return sorted(segments)
+
+    def _path(self, segment):
+        return os.path.join(self.directory, f"{segment:08d}.log")
+
+    def _remove(self, segment):
+        self._pending.pop(segment, None)
+        try:
+            os.remove(self._path(segment))
+        except FileNotFoundError:
+            pass
+
+    def append(self, record):
+        """Durably record an upload; returns the segment to pass to committed()"""
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+        with self._lock:
+            if self._file is not None and self._file.tell() >= self.segment_bytes:
+                self._file.close()
+                self._file = None
+                if not self._pending.get(self._segment):
+                    self._remove(self._segment)
+                self._segment += 1
+            if self._file is None:
+                self._file = open(self._path(self._segment), 'ab')
+
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._pending[self._segment] = self._pending.get(self._segment, 0) + 1
+            return self._segment
+
+    def committed(self, segment, count=1):
+        """Mark records from segment as written; drops the segment once it is done"""
+        with self._lock:
+            remaining = self._pending.get(segment, 0) - count
+            if remaining > 0:
+                self._pending[segment] = remaining
+            elif segment != self._segment:
+                self._remove(segment)
+            else:
+                # Everything written to the open segment is in the DB; start it over
+                self._pending[segment] = 0
+                if self._file is not None:
+                    self._file.seek(0)
+                    self._file.truncate()
+
+    def replay(self):
+        """Yield every record left over from the previous run, oldest first"""
+        for segment in self._leftover:
+            with open(self._path(segment), 'rb') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # torn write from a crash mid-append
+
+    def discard_replayed(self):
+        """Delete the previous run's segments once their records are in the DB"""
+        with self._lock:
+            for segment in self._leftover:
+                self._remove(segment)
+            self._leftover = []
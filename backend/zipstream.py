@@ -0,0 +1,91 @@
+# Streaming ZIP writer for camera image exports
+#
+# zipfile can write to an unseekable stream: it then emits data descriptors
+# after each member instead of seeking back to patch the local header.
+# _ZipSink collects whatever zipfile writes and stream_zip() yields it as
+# soon as it is produced, so an archive of any size is sent in bounded
+# memory and the download starts with the first file.
+import io
+import os
+import zipfile
+
+ZIP_CHUNK_SIZE = 64 * 1024
+ZIP_CHUNKS_PER_STEP = 16  # Chunks copied per run() call (1 MiB)
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable buffer that zipfile writes into"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        # Makes zipfile treat the output as unseekable (uses data descriptors)
+        raise OSError('unseekable')
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _copy_chunks(src, dest, sink):
+    """Copy up to ZIP_CHUNKS_PER_STEP chunks into the archive; None once src is done"""
+    for _ in range(ZIP_CHUNKS_PER_STEP):
+        chunk = src.read(ZIP_CHUNK_SIZE)
+        if not chunk:
+            return sink.drain() or None
+        dest.write(chunk)
+    return sink.drain()
+
+
+def stream_zip(entries, run=None):
+    """Yield a ZIP archive built from (arcname, source, date_time, compress) entries
+
+    source is a file path (copied in ZIP_CHUNK_SIZE pieces) or bytes;
+    paths that cannot be opened are skipped.
+    compress=False stores the member as-is, which is what already
+    compressed JPEGs want.
+    run(fn, *args), if given, executes the file reads and CRC/deflate work
+    (e.g. on an OS thread); by default it happens inline.
+    """
+    run = run or (lambda fn, *args: fn(*args))
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', allowZip64=True) as zf:
+        for arcname, source, date_time, compress in entries:
+            info = zipfile.ZipInfo(arcname, date_time=date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+
+            if isinstance(source, bytes):
+                info.file_size = len(source)
+                with zf.open(info, 'w') as dest:
+                    run(dest.write, source)
+            else:
+                try:
+                    src = open(source, 'rb')
+                except OSError as e:
+                    print(f"Skipping {arcname} in ZIP export: {e}")
+                    continue
+                info.file_size = os.fstat(src.fileno()).st_size
+                with src, zf.open(info, 'w', force_zip64=info.file_size > 0x7fffffff) as dest:
+                    while True:
+                        data = run(_copy_chunks, src, dest, sink)
+                        if data is None:
+                            break
+                        if data:
+                            yield data
+
+            data = sink.drain()
+            if data:
+                yield data
+
+    # Central directory is written when the archive closes
+    yield sink.drain()
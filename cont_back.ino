@@ -286,7 +286,8 @@ int tempSchedule[24] = {
 };
 
 // Function declarations
-void fetchACSchedule();
+void fetchACSchedule(int waitSec);
+void acScheduleWatchTask(void *param);
 void sendSensorData(float temp, float humidity, int pressure, int iaq, int co2, int acTemp);
 void sendIRSignalForTemperature(int temp);
 void sendIRSignal(uint16_t *rawTimings);
@@ -334,8 +335,9 @@ void setup() {
 
     Serial.println("IR sender and receiver ready...");
 
-    // Fetch AC schedule from backend
-    fetchACSchedule();
+    // Fetch AC schedule from backend, then keep watching it for edits
+    fetchACSchedule(0);
+    xTaskCreatePinnedToCore(acScheduleWatchTask, "acScheduleWatch", 8192, NULL, 1, NULL, 0);
 
     // Send initial IR signal at boot
     int initialTemp = tempSchedule[timeClient.getHours()];
@@ -353,15 +355,12 @@ void loop() {
     int currentHour = timeClient.getHours();
     int currentTemp = tempSchedule[currentHour];
 
-    // On hour change: fetch new schedule and send IR if temp changed
+    // On hour change: send IR for the new hour's temperature
+    // (acScheduleWatchTask keeps tempSchedule up to date)
     if (currentHour != lastHour) {
         Serial.print("Hour changed: ");
         Serial.println(currentHour);
 
-        // Fetch latest schedule from backend
-        fetchACSchedule();
-        currentTemp = tempSchedule[currentHour];
-
         Serial.print("Sending IR for scheduled temp: ");
         Serial.println(currentTemp);
 
@@ -369,6 +368,13 @@ void loop() {
 
         lastHour = currentHour;
         lastTemp = currentTemp;
+    } else if (currentTemp != lastTemp) {
+        // Schedule for this hour was edited on the dashboard
+        Serial.print("Schedule changed, sending IR for temp: ");
+        Serial.println(currentTemp);
+
+        sendIRSignalForTemperature(currentTemp);
+        lastTemp = currentTemp;
     }
 
     // ---------- CO2 + BME ----------
@@ -491,24 +497,48 @@ void sendIRSignal(uint16_t *rawTimings) {
     return;
 }
 
-// Fetch AC schedule from backend
-void fetchACSchedule() {
+// ETag of the last schedule response; the backend answers 304 with no body while it still matches
+String acScheduleETag = "";
+const int AC_SCHEDULE_WAIT_SEC = 25;
+
+// Long-polls the schedule on core 0 so dashboard edits apply within seconds
+void acScheduleWatchTask(void *param) {
+    for (;;) {
+        if (WiFi.status() != WL_CONNECTED) {
+            delay(1000);
+            continue;
+        }
+        fetchACSchedule(AC_SCHEDULE_WAIT_SEC);
+    }
+}
+
+// Fetch AC schedule from backend; the backend holds the request up to
+// waitSec seconds until the schedule differs from acScheduleETag
+void fetchACSchedule(int waitSec) {
     if (WiFi.status() != WL_CONNECTED) {
         Serial.println("WiFi not connected, skipping schedule fetch");
         return;
     }
 
     HTTPClient http;
-    String url = String(backendURL) + "/room/back/ac_schedule";
+    String url = String(backendURL) + "/room/back/ac_schedule/changes?wait=" + waitSec;
 
     Serial.print("Fetching AC schedule from: ");
     Serial.println(url);
 
     http.begin(url);
-    http.setTimeout(10000);
+    http.setTimeout((waitSec + 10) * 1000);
+    const char* headerKeys[] = {"ETag"};
+    http.collectHeaders(headerKeys, 1);
+    if (acScheduleETag.length() > 0) {
+        http.addHeader("If-None-Match", acScheduleETag);
+    }
     int httpCode = http.GET();
 
-    if (httpCode == 200) {
+    if (httpCode == 304) {
+        Serial.println("AC schedule unchanged");
+    } else if (httpCode == 200) {
+        acScheduleETag = http.header("ETag");
         String payload = http.getString();
         Serial.println("Schedule response: " + payload);
 
@@ -532,6 +562,7 @@ void fetchACSchedule() {
     } else {
         Serial.print("HTTP error fetching schedule: ");
         Serial.println(httpCode);
+        delay(2000);  // don't hammer the backend while it is unreachable
     }
 
     http.end();
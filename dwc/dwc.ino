@@ -51,8 +51,6 @@ long  stm_water = -1;
 
 // ---------- Serial parsing ----------
 String lineBuf = "";
-unsigned long lastCmdPoll = 0;
-const unsigned long CMD_INTERVAL = 10000; // every 10 sec
 
 // ---------- Helpers ----------
 float avgTempAir() {
@@ -149,44 +147,77 @@ bool lastLights = false;
 bool lastFans = false;
 bool lastPump = false;
 
+// Wanted relay states, written by relayWatchTask and applied from loop()
+// so only loop() ever talks to the STM over Serial
+volatile bool wantLights = false;
+volatile bool wantFans = false;
+volatile bool wantPump = false;
+
+// Relay version last seen; the backend holds the request until it changes
+String relayVersion = "";
+const int RELAY_WAIT_SEC = 25;
+
 void fetchRelayCommands() {
-  if (WiFi.status() != WL_CONNECTED) return;
+  if (WiFi.status() != WL_CONNECTED) {
+    delay(1000);
+    return;
+  }
 
   HTTPClient http;
-  String url = String(SERVER_URL) + "/units/" + UNIT_ID + "/relays";
+  String url = String(SERVER_URL) + "/units/" + UNIT_ID + "/relays/changes?wait=" + RELAY_WAIT_SEC;
+  if (relayVersion.length() > 0) {
+    url += "&since=" + relayVersion;
+  }
 
   http.begin(url);
-  http.setTimeout(8000);
+  http.setTimeout((RELAY_WAIT_SEC + 10) * 1000);
 
   int code = http.GET();
-  if (code != 200) {
+  if (code != 200) {  // 304: nothing changed while the request was held
     http.end();
+    if (code < 0) delay(2000);  // network error, don't hammer the backend
     return;
   }
 
   String payload = http.getString();
   http.end();
 
-  // Backend returns: {"relays": {"lights": "ON", "fans": "OFF", "pump": "OFF"}}
-  bool newLights = (payload.indexOf("\"lights\":\"ON\"") > 0 || payload.indexOf("\"lights\": \"ON\"") > 0);
-  bool newFans = (payload.indexOf("\"fans\":\"ON\"") > 0 || payload.indexOf("\"fans\": \"ON\"") > 0);
-  bool newPump = (payload.indexOf("\"pump\":\"ON\"") > 0 || payload.indexOf("\"pump\": \"ON\"") > 0);
+  // Backend returns: {"relays": {"lights": "ON", "fans": "OFF", "pump": "OFF"}, "version": "..."}
+  int versionKey = payload.indexOf("\"version\"");
+  if (versionKey >= 0) {
+    int start = payload.indexOf('"', payload.indexOf(':', versionKey)) + 1;
+    int end = payload.indexOf('"', start);
+    relayVersion = payload.substring(start, end);
+  }
+
+  wantLights = (payload.indexOf("\"lights\":\"ON\"") > 0 || payload.indexOf("\"lights\": \"ON\"") > 0);
+  wantFans = (payload.indexOf("\"fans\":\"ON\"") > 0 || payload.indexOf("\"fans\": \"ON\"") > 0);
+  wantPump = (payload.indexOf("\"pump\":\"ON\"") > 0 || payload.indexOf("\"pump\": \"ON\"") > 0);
+}
 
+// Long-polls relay changes on core 0 so a toggle reaches the relays within a second
+void relayWatchTask(void *param) {
+  for (;;) {
+    fetchRelayCommands();
+  }
+}
+
+void applyRelayCommands() {
   // Only send command when state changes
-  if (newLights != lastLights) {
+  if (wantLights != lastLights) {
+    lastLights = wantLights;
     Serial.print("RELAY LIGHT ");
-    Serial.println(newLights ? "1" : "0");
-    lastLights = newLights;
+    Serial.println(lastLights ? "1" : "0");
   }
-  if (newFans != lastFans) {
+  if (wantFans != lastFans) {
+    lastFans = wantFans;
     Serial.print("RELAY FAN ");
-    Serial.println(newFans ? "1" : "0");
-    lastFans = newFans;
+    Serial.println(lastFans ? "1" : "0");
   }
-  if (newPump != lastPump) {
+  if (wantPump != lastPump) {
+    lastPump = wantPump;
     Serial.print("RELAY PUMP ");
-    Serial.println(newPump ? "1" : "0");
-    lastPump = newPump;
+    Serial.println(lastPump ? "1" : "0");
   }
 }
 
@@ -211,14 +242,13 @@ void setup() {
   Serial.println();
   Serial.print("ESP32 IP: ");
   Serial.println(WiFi.localIP());
+
+  xTaskCreatePinnedToCore(relayWatchTask, "relayWatch", 8192, NULL, 1, NULL, 0);
 }
 
 void loop() {
   handleDHTSpreadRead();
-if (millis() - lastCmdPoll > CMD_INTERVAL) {
-  lastCmdPoll = millis();
-  fetchRelayCommands();
-}
+  applyRelayCommands();
   while (Serial.available()) {
     char c = Serial.read();
     if (c == '\r') continue;
@@ -116,7 +116,7 @@ const AlertsBanner = ({ alerts = [], warnings = [] }) => {
           </Header>
           <AlertsList>
             {alerts.map((alert, index) => (
-              <AlertItem key={index} to={`/hydro-units/${alert.unitId}`}>
+              <AlertItem key={index} to={alert.to || `/hydro-units/${alert.unitId}`}>
                 <AlertText>
                   <AlertUnit>{alert.unitId}</AlertUnit>
                   <span>{alert.message}</span>
@@ -137,7 +137,7 @@ const AlertsBanner = ({ alerts = [], warnings = [] }) => {
           </Header>
           <AlertsList>
             {warnings.map((warning, index) => (
-              <WarningItem key={index} to={`/hydro-units/${warning.unitId}`}>
+              <WarningItem key={index} to={warning.to || `/hydro-units/${warning.unitId}`}>
                 <AlertText>
                   <WarningUnit>{warning.unitId}</WarningUnit>
                   <span>{warning.message}</span>
@@ -295,6 +295,7 @@ const CameraGridComponent = ({ unitId }) => {
                 <IoTStatusIndicator
                   unitId={camera.camera_id}
                   timestamp={camera.timestamp}
+                  deviceKind="camera"
                   compact={true}
                 />
               </CameraCardHeader>
@@ -303,7 +304,7 @@ const CameraGridComponent = ({ unitId }) => {
                 {camera.image_url ? (
                   <>
                     <CameraImage
-                      src={camera.image_url}
+                      src={camera.thumb_url || camera.image_url}
                       alt={`Camera ${camera.camera_id}`}
                       onError={(e) => {
                         e.target.style.display = 'none';
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import styled from 'styled-components';
+import { useSocket } from '../contexts/SocketContext';
 
 const StatusContainer = styled.div`
   display: flex;
@@ -99,20 +100,30 @@ function formatLastSeen(timestamp) {
 const IoTStatusIndicator = ({
   unitId,
   timestamp,
+  deviceKind = 'unit',
   showLastSeen = false,
   compact = false
 }) => {
   const [currentTime, setCurrentTime] = useState(Date.now());
-  const deviceStatus = getDeviceStatus(timestamp);
+  const { deviceStatus: serverStatus } = useSocket();
+  const pushed = serverStatus[`${deviceKind}:${unitId}`];
+
+  // The backend sweeper pushes online/offline changes; only fall back to
+  // the local timestamp check for devices it has not reported yet
+  const deviceStatus = pushed
+    ? { status: pushed.status, text: pushed.status === 'online' ? 'Online' : 'Offline' }
+    : getDeviceStatus(timestamp);
+  const lastSeen = pushed ? Math.max(pushed.last_seen, timestamp || 0) : timestamp;
 
   // Update current time every 30 seconds to refresh status
   useEffect(() => {
+    if (pushed) return undefined;
     const interval = setInterval(() => {
       setCurrentTime(Date.now());
     }, 30000);
 
     return () => clearInterval(interval);
-  }, []);
+  }, [pushed]);
 
   if (compact) {
     return (
@@ -130,7 +141,7 @@ const IoTStatusIndicator = ({
       </StatusContainer>
       {showLastSeen && (
         <LastSeen>
-          Last seen: {formatLastSeen(timestamp)}
+          Last seen: {formatLastSeen(lastSeen)}
         </LastSeen>
       )}
     </div>
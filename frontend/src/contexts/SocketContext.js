@@ -1,5 +1,6 @@
-import React, { createContext, useContext, useEffect, useState } from 'react';
+import React, { createContext, useCallback, useContext, useEffect, useRef, useState } from 'react';
 import io from 'socket.io-client';
+import { alertsAPI, deviceAPI } from '../services/api';
 
 const SocketContext = createContext();
 
@@ -11,12 +12,38 @@ export const useSocket = () => {
   return context;
 };
 
+// Subscribe to push topics (e.g. 'units', 'unit:DWC1', 'room:ROOM_FRONT')
+// for as long as the calling component is mounted
+export const useSubscription = (...topics) => {
+  const { subscribe, unsubscribe } = useSocket();
+  const key = topics.join(',');
+
+  useEffect(() => {
+    const list = key.split(',').filter(Boolean);
+    subscribe(list);
+    return () => unsubscribe(list);
+  }, [key, subscribe, unsubscribe]);
+};
+
+// Pick whichever of a fetched and a pushed payload is newer. Pages get
+// readings pushed as they arrive and only fetch over REST on (re)connect.
+export const newest = (fetched, pushed) => {
+  if (!pushed) return fetched;
+  if (!fetched) return pushed;
+  return (pushed.timestamp || 0) >= (fetched.timestamp || 0) ? pushed : fetched;
+};
+
 export const SocketProvider = ({ children }) => {
   const [socket, setSocket] = useState(null);
   const [connected, setConnected] = useState(false);
   const [sensorData, setSensorData] = useState({});
   const [relayData, setRelayData] = useState({});
+  const [roomData, setRoomData] = useState({});
   const [latestCameraImage, setLatestCameraImage] = useState(null);
+  const [deviceStatus, setDeviceStatus] = useState({});
+  const [activeAlerts, setActiveAlerts] = useState({});
+  const socketRef = useRef(null);
+  const topicCounts = useRef({ devices: 1, alerts: 1 });
 
   useEffect(() => {
     // Connect to Socket.IO server
@@ -30,10 +57,37 @@ export const SocketProvider = ({ children }) => {
       transports: ['websocket', 'polling'],
       path: '/socket.io/'
     });
+    socketRef.current = newSocket;
+
+    const applyDeviceStatus = (devices) => {
+      setDeviceStatus(prev => {
+        const next = { ...prev };
+        devices.forEach(device => {
+          next[`${device.kind}:${device.device_id}`] = device;
+        });
+        return next;
+      });
+    };
 
     newSocket.on('connect', () => {
       console.log('Connected to server');
       setConnected(true);
+      // Rooms do not survive a reconnect, so resubscribe to everything in use
+      const topics = Object.keys(topicCounts.current).filter(topic => topicCounts.current[topic] > 0);
+      newSocket.emit('subscribe', { topics });
+      // Start from the server's view; device_status events keep it current
+      deviceAPI.getStatus()
+        .then(response => applyDeviceStatus(response.data.devices))
+        .catch(error => console.error('Error fetching device status:', error));
+      alertsAPI.getActive()
+        .then(response => {
+          const alerts = {};
+          response.data.alerts.forEach(alert => {
+            alerts[`${alert.device_id}:${alert.metric}`] = alert;
+          });
+          setActiveAlerts(alerts);
+        })
+        .catch(error => console.error('Error fetching alerts:', error));
     });
 
     newSocket.on('disconnect', () => {
@@ -41,23 +95,55 @@ export const SocketProvider = ({ children }) => {
       setConnected(false);
     });
 
+    // Pushes carry the same payload as the matching GET endpoint
     newSocket.on('sensor_update', (data) => {
-      console.log('Sensor update received:', data);
-      // Trigger re-fetch of sensor data in components
+      setSensorData(prev => ({
+        ...prev,
+        [data.unit_id]: data
+      }));
     });
 
     newSocket.on('relay_update', (data) => {
-      console.log('Relay update received:', data);
       setRelayData(prev => ({
         ...prev,
         [data.unit_id]: data
       }));
     });
 
+    newSocket.on('room_update', (data) => {
+      setRoomData(prev => ({
+        ...prev,
+        [data.unit_id]: data
+      }));
+    });
+
     newSocket.on('connected', (data) => {
       console.log('Server message:', data);
     });
 
+    newSocket.on('device_status', (data) => {
+      console.log('Device status changed:', data);
+      applyDeviceStatus(data.changes);
+    });
+
+    newSocket.on('alert_opened', (data) => {
+      setActiveAlerts(prev => ({
+        ...prev,
+        [`${data.device_id}:${data.metric}`]: data
+      }));
+    });
+
+    newSocket.on('alert_closed', (data) => {
+      setActiveAlerts(prev => {
+        const key = `${data.device_id}:${data.metric}`;
+        // A severity change closes the old alert and opens a new one
+        if (prev[key]?.opened_at !== data.opened_at) return prev;
+        const next = { ...prev };
+        delete next[key];
+        return next;
+      });
+    });
+
     newSocket.on('camera_image_uploaded', (data) => {
       console.log('Camera image uploaded:', data);
       setLatestCameraImage(data);
@@ -66,28 +152,46 @@ export const SocketProvider = ({ children }) => {
     setSocket(newSocket);
 
     return () => {
+      socketRef.current = null;
       newSocket.close();
     };
   }, []);
 
-  const joinUnit = (unitId) => {
-    if (socket) {
-      socket.emit('join_unit', { unit_id: unitId });
+  // Topics are reference counted so two components can share one subscription
+  const subscribe = useCallback((topics) => {
+    const added = topics.filter(topic => {
+      topicCounts.current[topic] = (topicCounts.current[topic] || 0) + 1;
+      return topicCounts.current[topic] === 1;
+    });
+    if (added.length && socketRef.current?.connected) {
+      socketRef.current.emit('subscribe', { topics: added });
     }
-  };
+  }, []);
 
-  const leaveUnit = (unitId) => {
-    if (socket) {
-      socket.emit('leave_unit', { unit_id: unitId });
+  const unsubscribe = useCallback((topics) => {
+    const removed = topics.filter(topic => {
+      topicCounts.current[topic] = Math.max((topicCounts.current[topic] || 0) - 1, 0);
+      return topicCounts.current[topic] === 0;
+    });
+    if (removed.length && socketRef.current?.connected) {
+      socketRef.current.emit('unsubscribe', { topics: removed });
     }
-  };
+  }, []);
+
+  const joinUnit = useCallback((unitId) => subscribe([`unit:${unitId}`]), [subscribe]);
+  const leaveUnit = useCallback((unitId) => unsubscribe([`unit:${unitId}`]), [unsubscribe]);
 
   const value = {
     socket,
     connected,
     sensorData,
     relayData,
+    roomData,
     latestCameraImage,
+    deviceStatus,
+    activeAlerts,
+    subscribe,
+    unsubscribe,
     joinUnit,
     leaveUnit
   };
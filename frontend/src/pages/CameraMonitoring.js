@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import styled from 'styled-components';
 import CameraGrid from '../components/CameraGrid';
 import api from '../services/api';
-import { useSocket } from '../contexts/SocketContext';
+import { useSocket, useSubscription } from '../contexts/SocketContext';
 
 const Container = styled.div`
   display: flex;
@@ -229,6 +229,7 @@ const CameraMonitoring = () => {
   });
   const { latestCameraImage } = useSocket();
   const [displayedImage, setDisplayedImage] = useState(null);
+  useSubscription('cameras');
 
   // Fetch initial latest image on mount
   useEffect(() => {
@@ -301,7 +302,7 @@ const CameraMonitoring = () => {
           <LatestImageContainer>
             {displayedImage ? (
               <img
-                src={getImageUrl(displayedImage.image_url)}
+                src={getImageUrl(displayedImage.medium_url || displayedImage.image_url)}
                 alt={`Camera ${displayedImage.camera_id}`}
                 onError={(e) => {
                   e.target.style.display = 'none';
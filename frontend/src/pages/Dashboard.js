@@ -1,8 +1,9 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import styled, { keyframes } from 'styled-components';
-import { useSocket } from '../contexts/SocketContext';
+import { useSocket, useSubscription, newest } from '../contexts/SocketContext';
 import CircularProgress from '../components/CircularProgress';
+import AlertsBanner from '../components/AlertsBanner';
 import api from '../services/api';
 
 const pulse = keyframes`
@@ -401,6 +402,26 @@ function getUnitStatus(data) {
   return 'normal';
 }
 
+const alertLabels = {
+  ph: 'pH',
+  tds: 'TDS',
+  water_temp: 'Water temp',
+  water_level: 'Water level',
+  room_temp: 'Room temp',
+  humidity: 'Humidity',
+  co2: 'CO2'
+};
+
+// Server-side alert -> AlertsBanner item
+function bannerItem(alert) {
+  return {
+    unitId: alert.device_id,
+    message: `${alertLabels[alert.metric] || alert.metric} ${alert.side === 'low' ? 'too low' : 'too high'}`,
+    value: alert.value,
+    to: alert.kind === 'room' ? '/rooms' : `/hydro-units/${alert.device_id}`
+  };
+}
+
 function formatTimestampAge(timestamp) {
   if (!timestamp) return 'No data';
   const now = Math.floor(Date.now() / 1000);
@@ -412,34 +433,29 @@ function formatTimestampAge(timestamp) {
 }
 
 const Dashboard = () => {
-  const [hydroUnitsData, setHydroUnitsData] = useState({});
-  const [roomData, setRoomData] = useState({ front: null, back: null });
+  const [fetchedUnits, setFetchedUnits] = useState({});
+  const [fetchedRooms, setFetchedRooms] = useState({ front: null, back: null });
   const [loading, setLoading] = useState(true);
-  const { connected } = useSocket();
+  const { connected, sensorData, roomData: pushedRooms, activeAlerts } = useSocket();
+
+  useSubscription('units', 'rooms');
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const hydroPromises = hydroUnits.map(async (unit) => {
-          const response = await api.get(`/units/${unit.id}/sensors`);
-          return { unitId: unit.id, data: response.data };
-        });
-
-        const [hydroResults, frontResponse, backResponse] = await Promise.all([
-          Promise.all(hydroPromises),
-          api.get('/room/front/sensors'),
-          api.get('/room/back/sensors')
-        ]);
+        // One snapshot request instead of one per unit and room
+        const response = await api.get('/dashboard/snapshot?fields=sensors,rooms');
+        const { units, rooms } = response.data;
 
         const hydroData = {};
-        hydroResults.forEach(({ unitId, data }) => {
-          hydroData[unitId] = data;
+        hydroUnits.forEach(unit => {
+          hydroData[unit.id] = units[unit.id]?.sensors;
         });
-        setHydroUnitsData(hydroData);
+        setFetchedUnits(hydroData);
 
-        setRoomData({
-          front: frontResponse.data,
-          back: backResponse.data
+        setFetchedRooms({
+          front: rooms.ROOM_FRONT,
+          back: rooms.ROOM_BACK
         });
 
       } catch (error) {
@@ -450,9 +466,16 @@ const Dashboard = () => {
     };
 
     fetchData();
-    const interval = setInterval(fetchData, 30000);
-    return () => clearInterval(interval);
-  }, []);
+  }, [connected]);
+
+  const hydroUnitsData = {};
+  hydroUnits.forEach(unit => {
+    hydroUnitsData[unit.id] = newest(fetchedUnits[unit.id], sensorData[unit.id]);
+  });
+  const roomData = {
+    front: newest(fetchedRooms.front, pushedRooms.ROOM_FRONT),
+    back: newest(fetchedRooms.back, pushedRooms.ROOM_BACK)
+  };
 
   if (loading) {
     return <LoadingContainer>Loading dashboard...</LoadingContainer>;
@@ -526,6 +549,12 @@ const Dashboard = () => {
         </HeroContent>
       </HeroSection>
 
+      {/* Safe-range alerts, evaluated on the server as readings arrive */}
+      <AlertsBanner
+        alerts={Object.values(activeAlerts).filter(a => a.severity === 'critical').map(bannerItem)}
+        warnings={Object.values(activeAlerts).filter(a => a.severity === 'warning').map(bannerItem)}
+      />
+
       {/* Quick Stats with Circular Progress */}
       <QuickStatsRow>
         <QuickStatCard>
@@ -7,7 +7,7 @@ import DHT22Card from '../components/DHT22Card';
 import RelayControl from '../components/RelayControl';
 import PumpControl from '../components/PumpControl';
 import { hydroUnitsAPI, apiUtils } from '../services/api';
-import { useSocket } from '../contexts/SocketContext';
+import { useSocket, newest } from '../contexts/SocketContext';
 
 const Container = styled.div`
   display: flex;
@@ -202,10 +202,13 @@ const ErrorMessage = styled.div`
 
 const HydroUnitDetail = () => {
   const { unitId } = useParams();
-  const { joinUnit, leaveUnit } = useSocket();
+  const { connected, joinUnit, leaveUnit, sensorData: pushedSensors, relayData: pushedRelays } = useSocket();
 
-  const [sensorData, setSensorData] = useState(null);
-  const [relayData, setRelayData] = useState(null);
+  const [fetchedSensors, setFetchedSensors] = useState(null);
+  const [fetchedRelays, setFetchedRelays] = useState(null);
+  // The unit:<id> subscription pushes readings and relay changes as they happen
+  const sensorData = newest(fetchedSensors, pushedSensors[unitId]);
+  const relayData = newest(fetchedRelays, pushedRelays[unitId]);
   const [scheduleData, setScheduleData] = useState({});
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -240,8 +243,8 @@ const HydroUnitDetail = () => {
         hydroUnitsAPI.getSchedule(unitId)
       ]);
 
-      setSensorData(sensorsResponse.data);
-      setRelayData(relaysResponse.data);
+      setFetchedSensors(sensorsResponse.data);
+      setFetchedRelays(relaysResponse.data);
       setScheduleData(scheduleResponse.data);
     } catch (err) {
       setError(apiUtils.handleError(err, `Failed to load data for ${unitId}`));
@@ -251,16 +254,14 @@ const HydroUnitDetail = () => {
   };
 
   useEffect(() => {
-    fetchData();
-    const interval = setInterval(fetchData, 30000); // Refresh every 30 seconds
-    return () => clearInterval(interval);
-  }, [unitId]);
+    fetchData(); // Pushes keep it current; refetch only on (re)connect
+  }, [unitId, connected]);
 
   const handleRelayUpdate = async (relayType, newState) => {
     try {
       const updateData = { [relayType]: newState };
       const response = await hydroUnitsAPI.updateRelay(unitId, updateData);
-      setRelayData(response.data);
+      setFetchedRelays(response.data);
 
       // Refresh schedule data to get updated control mode (manual)
       const scheduleResponse = await hydroUnitsAPI.getSchedule(unitId);
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import styled from 'styled-components';
 import api from '../services/api';
+import { useSocket, useSubscription, newest } from '../contexts/SocketContext';
 
 const Container = styled.div`
   display: flex;
@@ -146,23 +147,23 @@ function getUnitStatus(data) {
 }
 
 const HydroUnits = () => {
-  const [unitsData, setUnitsData] = useState({});
+  const [fetchedUnits, setFetchedUnits] = useState({});
   const [loading, setLoading] = useState(true);
+  const { connected, sensorData } = useSocket();
+
+  useSubscription('units');
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const promises = hydroUnits.map(async (unit) => {
-          const response = await api.get(`/units/${unit.id}/sensors`);
-          return { unitId: unit.id, data: response.data };
-        });
-
-        const results = await Promise.all(promises);
+        // One snapshot request instead of one per unit
+        const response = await api.get('/dashboard/snapshot?fields=sensors');
+        const { units } = response.data;
         const data = {};
-        results.forEach(({ unitId, data: unitData }) => {
-          data[unitId] = unitData;
+        hydroUnits.forEach(unit => {
+          data[unit.id] = units[unit.id]?.sensors;
         });
-        setUnitsData(data);
+        setFetchedUnits(data);
       } catch (error) {
         console.error('Error fetching units data:', error);
       } finally {
@@ -171,9 +172,12 @@ const HydroUnits = () => {
     };
 
     fetchData();
-    const interval = setInterval(fetchData, 30000);
-    return () => clearInterval(interval);
-  }, []);
+  }, [connected]);
+
+  const unitsData = {};
+  hydroUnits.forEach(unit => {
+    unitsData[unit.id] = newest(fetchedUnits[unit.id], sensorData[unit.id]);
+  });
 
   if (loading) {
     return <LoadingContainer>Loading units...</LoadingContainer>;
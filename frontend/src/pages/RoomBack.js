@@ -1,7 +1,9 @@
 import React, { useState, useEffect } from 'react';
 import styled from 'styled-components';
 import SensorCard from '../components/SensorCard';
+import IoTStatusIndicator from '../components/IoTStatusIndicator';
 import { roomAPI, apiUtils } from '../services/api';
+import { useSocket, useSubscription, newest } from '../contexts/SocketContext';
 
 const Container = styled.div`
   display: flex;
@@ -25,6 +27,17 @@ const SectionTitle = styled.h2`
   letter-spacing: 0.03em;
 `;
 
+const SectionHeader = styled.div`
+  display: flex;
+  justify-content: space-between;
+  align-items: center;
+  margin-bottom: ${props => props.theme.spacing.sm};
+
+  h2 {
+    margin-bottom: 0;
+  }
+`;
+
 const ACScheduleTable = styled.div`
   background: ${props => props.theme.colors.background};
   border-radius: ${props => props.theme.borderRadius.md};
@@ -114,7 +127,7 @@ const ErrorMessage = styled.div`
 `;
 
 const RoomBack = () => {
-  const [sensorData, setSensorData] = useState(null);
+  const [fetchedData, setFetchedData] = useState(null);
   const [acSchedule, setAcSchedule] = useState({});
   const [localSchedule, setLocalSchedule] = useState({});
   const [loading, setLoading] = useState(true);
@@ -131,7 +144,7 @@ const RoomBack = () => {
         roomAPI.getACSchedule()
       ]);
 
-      setSensorData(sensorsResponse.data);
+      setFetchedData(sensorsResponse.data);
       setAcSchedule(scheduleResponse.data.ac_schedule || {});
       setLocalSchedule(scheduleResponse.data.ac_schedule || {});
     } catch (err) {
@@ -141,11 +154,14 @@ const RoomBack = () => {
     }
   };
 
+  const { connected, roomData } = useSocket();
+  const sensorData = newest(fetchedData, roomData.ROOM_BACK);
+
+  useSubscription('room:ROOM_BACK');
+
   useEffect(() => {
     fetchData();
-    const interval = setInterval(fetchData, 30000);
-    return () => clearInterval(interval);
-  }, []);
+  }, [connected]);
 
   const handleScheduleChange = (hour, temperature) => {
     setLocalSchedule(prev => ({
@@ -180,7 +196,14 @@ const RoomBack = () => {
   return (
     <Container>
       <Section>
-        <SectionTitle>🌡️ Environmental Monitoring</SectionTitle>
+        <SectionHeader>
+          <SectionTitle>🌡️ Environmental Monitoring</SectionTitle>
+          <IoTStatusIndicator
+            unitId="ROOM_BACK"
+            timestamp={sensorData?.timestamp}
+            deviceKind="room"
+          />
+        </SectionHeader>
         {sensorData && (
           <div className="sensor-grid">
             <SensorCard
@@ -1,7 +1,9 @@
 import React, { useState, useEffect } from 'react';
 import styled from 'styled-components';
 import SensorCard from '../components/SensorCard';
+import IoTStatusIndicator from '../components/IoTStatusIndicator';
 import { roomAPI, apiUtils } from '../services/api';
+import { useSocket, useSubscription, newest } from '../contexts/SocketContext';
 
 const Container = styled.div`
   display: flex;
@@ -65,7 +67,7 @@ const ErrorMessage = styled.div`
 `;
 
 const RoomFront = () => {
-  const [sensorData, setSensorData] = useState(null);
+  const [fetchedData, setFetchedData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -75,7 +77,7 @@ const RoomFront = () => {
       setError(null);
 
       const response = await roomAPI.getFrontSensors();
-      setSensorData(response.data);
+      setFetchedData(response.data);
     } catch (err) {
       setError(apiUtils.handleError(err, 'Failed to load front room data'));
     } finally {
@@ -83,11 +85,14 @@ const RoomFront = () => {
     }
   };
 
+  const { connected, roomData } = useSocket();
+  const sensorData = newest(fetchedData, roomData.ROOM_FRONT);
+
+  useSubscription('room:ROOM_FRONT');
+
   useEffect(() => {
     fetchData();
-    const interval = setInterval(fetchData, 30000);
-    return () => clearInterval(interval);
-  }, []);
+  }, [connected]);
 
   if (loading) {
     return <LoadingMessage>Loading front room data...</LoadingMessage>;
@@ -177,7 +182,11 @@ const RoomFront = () => {
           </StatusItem>
           <StatusItem>
             <StatusLabel>Status:</StatusLabel>
-            <StatusValue style={{ color: '#10b981' }}>● Active</StatusValue>
+            <IoTStatusIndicator
+              unitId="ROOM_FRONT"
+              timestamp={sensorData?.timestamp}
+              deviceKind="room"
+            />
           </StatusItem>
         </StatusRow>
       </Section>
@@ -95,6 +95,18 @@ export const cameraAPI = {
   getLatestImages: (unitId) => api.get(`/units/${unitId}/cameras/latest`),
 };
 
+// Device status API
+export const deviceAPI = {
+  // Get online/offline state of every camera, unit and room
+  getStatus: () => api.get('/devices/status'),
+};
+
+// Alerts API
+export const alertsAPI = {
+  // Get open safe-range alerts (critical first)
+  getActive: () => api.get('/alerts/active'),
+};
+
 // Settings API
 export const settingsAPI = {
   // Get safe ranges